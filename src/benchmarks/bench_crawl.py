@@ -0,0 +1,58 @@
+# bench_crawl.py
+"""End-to-end crawl of the corpus with the asyncio engine, served by a local HTTP
+server that delays every response by BENCH_LATENCY seconds to mimic fbref."""
+import asyncio
+import os
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import src.scraper.dead_letter as dead_letter
+from src.benchmarks.conftest import CORPUS
+from src.scraper.async_crawler import crawl_async
+from src.scraper.rate_limit import set_limiter
+
+# Latency injected in every response, in seconds
+LATENCY = float(os.getenv("BENCH_LATENCY", "0.05"))
+
+LEAGUE = "/en/comps/12/La-Liga-Stats"
+
+TABLES = ["stats_standard_dom_lg", "stats_shooting_dom_lg"]
+
+
+def corpus_handler(name: str):
+    async def handler(request):
+        await asyncio.sleep(LATENCY)
+        return web.FileResponse(os.path.join(CORPUS, name))
+
+    return handler
+
+
+async def crawl(concurrency: int):
+    app = web.Application()
+    app.router.add_get(LEAGUE, corpus_handler("league.html"))
+    app.router.add_get("/en/squads/{id}/{name}", corpus_handler("squad.html"))
+    app.router.add_get("/en/players/{id}/{name}", corpus_handler("player.html"))
+
+    async with TestServer(app) as server:
+        return await crawl_async(
+            [LEAGUE],
+            TABLES,
+            base_url=str(server.make_url("")).rstrip("/"),
+            concurrency=concurrency,
+            processes=2,
+            store=False,
+        )
+
+
+@pytest.mark.parametrize("concurrency", [1, 8])
+def test_crawl_async(benchmark, tmp_path, monkeypatch, concurrency):
+    set_limiter(None)
+    monkeypatch.setattr(dead_letter, "DEAD_LETTER_FILE", str(tmp_path / "dead_letter.jsonl"))
+
+    players = benchmark.pedantic(lambda: asyncio.run(crawl(concurrency)), rounds=3)
+
+    benchmark.extra_info["latency"] = LATENCY
+    benchmark.extra_info["players"] = len(players)
+    assert sorted(players) == ["0d9b2d31", "1840e36d"]
@@ -0,0 +1,58 @@
+# bench_parse.py
+"""Parse time per page of the corpus: tree building, links and player extraction."""
+import src.scraper.player_stats as player_stats
+from src.scraper.parsing import LINKS_STRAINER, make_soup, player_strainer
+from src.scraper.player_info import scrape_info
+from src.scraper.player_stats import get_stats_headers, scrape_stats
+from src.scraper.requests import parse_players, parse_squads
+
+PLAYER = "/en/players/0d9b2d31/Pedri"
+
+TABLES = ["stats_standard_dom_lg", "stats_shooting_dom_lg"]
+
+
+def test_make_soup_full(benchmark, corpus):
+    benchmark(make_soup, corpus["player"])
+
+
+def test_make_soup_strained(benchmark, corpus):
+    strainer = player_strainer(TABLES)
+
+    benchmark(make_soup, corpus["player"], strainer)
+
+
+def test_parse_squads(benchmark, corpus):
+    squads = benchmark(lambda: parse_squads(make_soup(corpus["league"], LINKS_STRAINER)))
+
+    assert squads
+
+
+def test_parse_players(benchmark, corpus):
+    players = benchmark(lambda: parse_players(make_soup(corpus["squad"], LINKS_STRAINER)))
+
+    assert players
+
+
+def test_scrape_info(benchmark, corpus):
+    strainer = player_strainer(TABLES)
+
+    info = benchmark(lambda: scrape_info(PLAYER, make_soup(corpus["player"], strainer)))
+
+    assert info["id"] == "0d9b2d31"
+
+
+def test_scrape_stats(benchmark, corpus):
+    strainer = player_strainer(TABLES)
+
+    stats = benchmark(lambda: scrape_stats(PLAYER, make_soup(corpus["player"], strainer), TABLES))
+
+    benchmark.extra_info["rows"] = len(stats)
+    assert stats
+
+
+def test_get_stats_headers(benchmark, corpus, monkeypatch):
+    monkeypatch.setattr(player_stats, "get_soup", lambda url, parse_only=None: make_soup(corpus["player"], parse_only))
+
+    headers = benchmark(get_stats_headers, PLAYER, TABLES)
+
+    assert [header[0] for header in headers] == ["standard", "shooting"]
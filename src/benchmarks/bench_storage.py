@@ -0,0 +1,79 @@
+# bench_storage.py
+"""Rows per second of the database write path, with the player of the corpus copied
+under many ids. Runs against SQLite, and against the MySQL database configured in
+.env.test when BENCH_MYSQL=1."""
+import os
+
+import pytest
+
+import src.scraper.player_stats as player_stats
+from src.scraper.parsing import make_soup, player_strainer
+from src.scraper.player_info import scrape_info
+from src.scraper.player_stats import get_stats_headers, scrape_stats
+from src.scraper.storage import MySQLStorage, SQLiteStorage
+
+PLAYER = "/en/players/0d9b2d31/Pedri"
+
+TABLES = ["stats_standard_dom_lg", "stats_shooting_dom_lg"]
+
+# Number of copies of the corpus player written per round
+PLAYERS = int(os.getenv("BENCH_PLAYERS", "200"))
+
+
+@pytest.fixture(scope="module")
+def headers(corpus):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(player_stats, "get_soup", lambda url, parse_only=None: make_soup(corpus["player"], parse_only))
+        return get_stats_headers(PLAYER, TABLES)
+
+
+@pytest.fixture(scope="module")
+def players(corpus, headers):
+    """The corpus player under PLAYERS distinct ids, as (info, stats) tuples."""
+    soup = make_soup(corpus["player"], player_strainer(TABLES))
+    info, stats = scrape_info(PLAYER, soup), scrape_stats(PLAYER, soup, TABLES)
+
+    copies = []
+    for i in range(PLAYERS):
+        player_id = f"{i:08x}"
+        copies.append(({**info, "id": player_id}, [row.replace(id=player_id) for row in stats]))
+
+    return copies
+
+
+def record_rate(benchmark, players) -> None:
+    """Store the rows written per second in the benchmark's extra info."""
+    rows = sum(1 + len(stats) for _, stats in players)
+
+    benchmark.extra_info["rows"] = rows
+    benchmark.extra_info["rows_per_sec"] = round(rows / benchmark.stats.stats.mean)
+
+
+def write(storage, players, batch_size: int) -> None:
+    for i in range(0, len(players), batch_size):
+        assert storage.add_players(players[i : i + batch_size])
+
+
+@pytest.mark.parametrize("batch_size", [1, 50])
+def test_sqlite_add_players(benchmark, tmp_path, headers, players, batch_size):
+    databases = iter(range(1000))
+
+    def setup():
+        # Every round inserts into empty tables
+        storage = SQLiteStorage(str(tmp_path / f"bench{next(databases)}.sqlite"))
+        assert storage.create_schema(headers)
+        return (storage, players, batch_size), {}
+
+    benchmark.pedantic(write, setup=setup, rounds=5)
+    record_rate(benchmark, players)
+
+
+@pytest.mark.skipif(os.getenv("BENCH_MYSQL") != "1", reason="set BENCH_MYSQL=1 to benchmark MySQL")
+@pytest.mark.parametrize("batch_size", [1, 50])
+def test_mysql_add_players(benchmark, headers, players, batch_size):
+    storage = MySQLStorage()
+    assert storage.create_schema(headers)
+
+    # The first round inserts the players, the next ones update them
+    benchmark.pedantic(write, args=(storage, players, batch_size), rounds=5)
+    record_rate(benchmark, players)
@@ -0,0 +1,37 @@
+# conftest.py
+"""Benchmarks of the parsing, storage and crawl paths, run offline against the saved
+fbref pages of src/test/fixtures. Collected from the bench_*.py files."""
+import os
+
+import pytest
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+try:
+    import pytest_benchmark
+
+    HAS_BENCHMARK = True
+except ImportError:
+    HAS_BENCHMARK = False
+
+# Saved league, squad and player pages
+CORPUS = os.path.join(os.path.dirname(__file__), os.pardir, "test", "fixtures")
+
+
+def pytest_collect_file(file_path, parent):
+    # The benchmarks need the pytest-benchmark plugin
+    if HAS_BENCHMARK and file_path.name.startswith("bench_") and file_path.suffix == ".py":
+        return pytest.Module.from_parent(parent, path=file_path)
+
+
+def read_page(name: str) -> bytes:
+    """Content of a page of the corpus."""
+    with open(os.path.join(CORPUS, name), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    """Pages of the corpus by kind: league, squad and player."""
+    return {kind: read_page(f"{kind}.html") for kind in ["league", "squad", "player"]}
@@ -0,0 +1,381 @@
+# async_crawler.py
+"""Asynchronous crawl engine. Downloads league, squad and player pages over a single
+aiohttp session and hands the HTML parsing to a process pool."""
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from typing import List, Optional
+
+import aiohttp
+
+import src.scraper.database as db
+import src.scraper.dead_letter as dead_letter
+import src.scraper.metrics as metrics
+import src.scraper.schemas as schemas
+import src.scraper.storage as storage
+from src.scraper.cache import get_cache
+from src.scraper.fingerprint import FingerprintIndex
+from src.scraper.http_client import DEFAULT_HEADERS
+from src.scraper.logger import get_logger
+from src.scraper.parsing import LINKS_STRAINER, make_soup, player_strainer
+from src.scraper.pipeline import player_id
+from src.scraper.player_info import scrape_info
+from src.scraper.player_stats import scrape_stats
+from src.scraper.rate_limit import get_limiter, parse_retry_after
+from src.scraper.requests import (
+    RETRIES,
+    TRANSIENT_STATUSES,
+    backoff_delay,
+    parse_players,
+    parse_squads,
+)
+
+my_logger = get_logger(__name__)
+
+BASE_URL = "https://fbref.com"
+
+# Maximum number of requests in flight at the same time
+CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "8"))
+
+# Database writer of the current parser process (see init_parser)
+writer = None
+
+# Fingerprint index of the current parser process, only set by an incremental crawl
+index = None
+
+# Deltas of the players waiting in the writer's buffer, recorded in the index once committed
+pending = {}
+
+
+def init_parser(store: bool) -> None:
+    """
+    Initializer of the parser processes.
+    Creates the process' batch writer when the scraped players should be stored.
+    In an incremental crawl (CRAWL_INCREMENTAL=1) also opens the fingerprint index.
+    """
+    global writer, index
+
+    if store:
+        writer = db.BatchWriter(
+            int(os.getenv("DB_BATCH_SIZE", "1")),
+            on_error=forget_deltas,
+            on_commit=record_fingerprints,
+            write=storage.get_storage().add_players,
+        )
+        Finalize(writer, writer.flush, exitpriority=10)
+
+        if os.getenv("CRAWL_INCREMENTAL") == "1":
+            index = FingerprintIndex()
+            Finalize(index, index.close, exitpriority=1)
+
+    Finalize(None, metrics.publish, kwargs={"force": True}, exitpriority=1)
+
+
+def record_fingerprints(players: List[str]) -> None:
+    """Record in the fingerprint index the players of a batch that was stored."""
+    for player in players:
+        delta = pending.pop(player, None)
+
+        if delta is not None:
+            index.record(delta)
+
+
+def forget_deltas(players: List[str]) -> None:
+    """Drop the deltas of a batch that couldn't be stored, its players are written again by the next crawl."""
+    for player in players:
+        pending.pop(player, None)
+
+
+def parse_links(html: str, kind: str) -> List[str]:
+    """
+    Parse a league or a squad page and collect the links it points to.
+    Runs in a parser process.
+
+    Arguments:
+        html -- the page's HTML
+        kind -- "squads" for a league page, "players" for a squad page
+    """
+    with metrics.timer("parse"):
+        soup = make_soup(html, LINKS_STRAINER)
+
+    if kind == "squads":
+        return parse_squads(soup)
+
+    return parse_players(soup)
+
+
+def parse_player(player: str, html: str, tables: List[str]) -> str:
+    """
+    Parse a player page, extract the info and stats and store them.
+    Runs in a parser process.
+
+    Arguments:
+        player -- unique player URL path
+        html   -- the player page's HTML
+        tables -- list of strings each of which is the name of a table to scrape
+    Returns:
+        The id of the scraped player.
+    """
+    with metrics.timer("parse"):
+        soup = make_soup(html, player_strainer(tables))
+
+    with metrics.timer("extract"):
+        player_info = scrape_info(player, soup)
+        player_stats = scrape_stats(player, soup, tables)
+
+    if writer is not None and index is not None:
+        # Only the info and the stats rows that changed since the last crawl are written
+        delta = index.delta(player_info, player_stats)
+
+        if not delta.unchanged():
+            schemas.get_registry().observe(delta.stats)
+            pending[player] = delta
+            writer.add(delta.info, delta.stats, key=player)
+    elif writer is not None:
+        schemas.get_registry().observe(player_stats)
+        writer.add(player_info, player_stats, key=player)
+
+    metrics.publish()
+
+    return player_info["id"]
+
+
+async def fetch_html(
+    session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str
+) -> Optional[str]:
+    """
+    Download a page, holding the semaphore for the duration of the request.
+    Requests wait for the rate limiter shared with the other crawler processes,
+    and transient errors are retried with a jittered exponential backoff.
+    The page cache is used like requests.fetch does: fresh cached pages are returned without a request,
+    stale ones are revalidated, and in offline mode only cached pages are returned.
+
+    Arguments:
+        session   -- shared aiohttp session
+        semaphore -- semaphore capping the number of requests in flight
+        url       -- absolute URL of the page
+    Returns:
+        The page's HTML, or None if the request failed.
+    """
+    cache = get_cache()
+    page = cache.get(url) if cache is not None else None
+
+    if page is not None and (cache.offline or cache.is_fresh(page)):
+        return page.body.decode("utf-8", errors="replace")
+
+    if cache is not None and cache.offline:
+        my_logger.error(f"async_crawler: fetch_html: offline mode: {url} is not cached")
+        metrics.inc("errors.fetch")
+        return None
+
+    headers = {}
+    if page is not None:
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+
+    for attempt in range(RETRIES + 1):
+        async with semaphore:
+            limiter = get_limiter()
+            if limiter is not None:
+                with metrics.timer("fetch.wait"):
+                    await asyncio.get_running_loop().run_in_executor(None, limiter.acquire)
+
+            try:
+                # DNS, connection and time to first byte are recorded by the session's trace hooks
+                async with session.get(url, headers=headers) as response:
+                    metrics.inc("requests")
+                    if response.status == 429:
+                        metrics.inc("throttled")
+
+                    if limiter is not None:
+                        if response.status == 429:
+                            limiter.throttled(parse_retry_after(response.headers.get("Retry-After")))
+                        elif response.status < 400:
+                            limiter.success()
+
+                    if response.status == 304 and page is not None:
+                        cache.revalidated(url, response.headers)
+                        return page.body.decode("utf-8", errors="replace")
+
+                    response.raise_for_status()
+
+                    with metrics.timer("http.body"):
+                        body = await response.read()
+
+                    if cache is not None:
+                        cache.put(url, body, response.headers)
+
+                    return body.decode(response.get_encoding(), errors="replace")
+            except aiohttp.ClientResponseError as e:
+                error, transient = e, e.status in TRANSIENT_STATUSES
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error, transient = e, True
+
+        if attempt == RETRIES or not transient:
+            my_logger.error(f"async_crawler: fetch_html: {url}: {error!r}")
+            metrics.inc("errors.fetch")
+            return None
+
+        # Wait outside of the semaphore so that other requests can go on
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+def trace_config() -> aiohttp.TraceConfig:
+    """
+    Trace hooks of the session recording the stages http_client records for the process pool engine:
+    DNS resolution (http.dns), new connection including DNS and TLS (http.connect), and the time
+    from the request being sent to the response headers (http.ttfb).
+    """
+    config = aiohttp.TraceConfig()
+
+    async def dns_start(session, context, params):
+        context.dns_start = time.perf_counter()
+
+    async def dns_end(session, context, params):
+        metrics.observe("http.dns", time.perf_counter() - context.dns_start)
+
+    async def connect_start(session, context, params):
+        context.connect_start = time.perf_counter()
+
+    async def connect_end(session, context, params):
+        metrics.observe("http.connect", time.perf_counter() - context.connect_start)
+
+    async def headers_sent(session, context, params):
+        context.sent = time.perf_counter()
+
+    async def request_end(session, context, params):
+        # Sent once the response headers are received, before the body is read
+        metrics.observe("http.ttfb", time.perf_counter() - context.sent)
+
+    config.on_dns_resolvehost_start.append(dns_start)
+    config.on_dns_resolvehost_end.append(dns_end)
+    config.on_connection_create_start.append(connect_start)
+    config.on_connection_create_end.append(connect_end)
+    config.on_request_headers_sent.append(headers_sent)
+    config.on_request_end.append(request_end)
+
+    return config
+
+
+class AsyncCrawler:
+    """
+    Crawls leagues, squads and players concurrently.
+    Network I/O runs on the event loop, parsing and storing in a process pool.
+    """
+
+    def __init__(
+        self,
+        tables: List[str],
+        base_url: str = BASE_URL,
+        concurrency: int = CONCURRENCY,
+        processes: Optional[int] = None,
+        store: bool = True,
+    ):
+        self.tables = tables
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.processes = processes
+        self.store = store
+
+    async def crawl(self, leagues: List[str]) -> List[str]:
+        """
+        Crawl a list of soccer leagues and scrape player data.
+
+        Arguments:
+            leagues -- list of URL paths of soccer leagues to scrape
+        Returns:
+            The ids of the scraped players.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+
+        # Ids of the players already scheduled, a player can appear in several squads
+        self.seen = set()
+
+        # Keep-alive connections, no more than the requests allowed in flight
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+
+        metrics.reset()
+        reporter = metrics.Reporter().start()
+
+        with ProcessPoolExecutor(
+            max_workers=self.processes, initializer=init_parser, initargs=(self.store,)
+        ) as self.executor:
+            async with aiohttp.ClientSession(
+                connector=connector, headers=DEFAULT_HEADERS, trace_configs=[trace_config()]
+            ) as self.session:
+                results = await asyncio.gather(*(self.crawl_league(league) for league in leagues))
+
+        reporter.stop()
+
+        return [player for players in results for player in players]
+
+    async def crawl_league(self, league: str) -> List[str]:
+        squads = await self.get_links(league, "squads")
+        results = await asyncio.gather(*(self.crawl_squad(squad) for squad in squads))
+
+        return [player for players in results for player in players]
+
+    async def crawl_squad(self, squad: str) -> List[str]:
+        players = []
+        for player in await self.get_links(squad, "players"):
+            if player_id(player) not in self.seen:
+                self.seen.add(player_id(player))
+                players.append(player)
+
+        results = await asyncio.gather(*(self.scrape(player) for player in players))
+
+        return [player for player in results if player is not None]
+
+    async def get_links(self, path: str, kind: str) -> List[str]:
+        """Async version of get_squads/get_players."""
+        html = await fetch_html(self.session, self.semaphore, f"{self.base_url}{path}")
+
+        if html is None:
+            page = "league" if kind == "squads" else "squad"
+            dead_letter.add(path, page, f"{page} page couldn't be downloaded")
+            return []
+
+        return await self.loop.run_in_executor(self.executor, parse_links, html, kind)
+
+    async def scrape(self, player: str) -> Optional[str]:
+        """Async version of crawler.scrape."""
+        player_start = time.time()
+
+        html = await fetch_html(self.session, self.semaphore, f"{self.base_url}{player}")
+
+        if html is None:
+            dead_letter.add(player, "player", "player page couldn't be downloaded")
+            return None
+
+        try:
+            player_id = await self.loop.run_in_executor(
+                self.executor, parse_player, player, html, self.tables
+            )
+        except Exception as e:
+            my_logger.error(f"async_crawler: scrape: {player}: {e!r}")
+            metrics.inc("errors.scrape")
+            dead_letter.add(player, "player", repr(e))
+            return None
+
+        metrics.observe("player", time.time() - player_start)
+        metrics.inc("players")
+
+        my_logger.info(
+            f"Scraped player data for Id: {player_id}."
+            f" Elapsed time = {time.time() - player_start:.2f}s."
+        )
+
+        return player_id
+
+
+async def crawl_async(leagues: List[str], tables: List[str], **kwargs) -> List[str]:
+    """
+    Crawl a list of soccer leagues with the asynchronous engine.
+    See AsyncCrawler for the keyword arguments.
+    """
+    return await AsyncCrawler(tables, **kwargs).crawl(leagues)
@@ -0,0 +1,191 @@
+# bulk_load.py
+"""Bulk load path for full rebuilds: the workers append the scraped rows to per-table
+staging files, loaded at the end of the crawl with one LOAD DATA LOCAL INFILE per file."""
+import glob
+import os
+from typing import Callable, Dict, List
+
+import src.scraper.database as db
+from src.scraper.logger import get_logger
+from src.scraper.rows import StatsRow, metric_columns
+
+my_logger = get_logger(__name__)
+
+# Directory of the staging files
+BULK_DIR = os.getenv("BULK_DIR", "bulk")
+
+
+def format_field(value) -> str:
+    """
+    Format a value as a field of a staging file:
+    NULL for missing values, numbers as is and strings enclosed in double quotes.
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)):
+        return repr(value)
+
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def format_line(values: List) -> str:
+    return ",".join(format_field(value) for value in values) + "\n"
+
+
+class StagingWriter:
+    """
+    Appends scraped players to this process' staging files, one file per table.
+    Has the interface of database.BatchWriter, so that the crawler can use either.
+    """
+
+    def __init__(
+        self,
+        tables: List[List[str]],
+        directory: str = BULK_DIR,
+        on_error: Callable[[List[str]], None] = None,
+        on_commit: Callable[[List[str]], None] = None,
+        mark_done: bool = False,
+    ):
+        """
+        Arguments:
+            tables    -- stats table headers as returned by get_stats_headers
+            directory -- directory of the staging files
+            on_error  -- called with the keys of the players that couldn't be written
+            on_commit -- called with the keys of the players once they are written to disk
+            mark_done -- the keys are frontier URLs, marked as done once written to disk
+        """
+        self.directory = directory
+        self.on_error = on_error
+        self.on_commit = on_commit
+        self.mark_done = mark_done
+        self.keys = []
+        self.files = {}
+
+        # Metric columns of each stats table, the leading columns are written separately
+        self.columns = {
+            table[0]: metric_columns(table[1:])
+            for table in tables
+        }
+
+        os.makedirs(directory, exist_ok=True)
+
+    def file(self, table: str, columns: List[str]):
+        """Open file of a table, created with a header line holding its columns."""
+        if table not in self.files:
+            path = os.path.join(self.directory, f"{table}.{os.getpid()}.csv")
+            f = open(path, "a", encoding="utf-8", newline="")
+
+            if f.tell() == 0:
+                f.write(",".join(columns) + "\n")
+
+            self.files[table] = f
+
+        return self.files[table]
+
+    def add(self, info: Dict, stats: List[StatsRow], key: str = None) -> bool:
+        """
+        Append a player's info and stats rows to the staging files.
+
+        Arguments:
+            info  -- dictionary of general player information
+            stats -- list of StatsRow, each representing a row of a stats table
+            key   -- identifies the player for on_error and on_commit (for example the player's URL)
+        """
+        try:
+            if info:
+                self.file("info", db.INFO_COLUMNS).write(
+                    format_line([info.get(column) for column in db.INFO_COLUMNS])
+                )
+
+            for row in stats:
+                columns = self.columns.get(row.table)
+
+                # Rows of tables that aren't created can't be stored
+                if columns is None:
+                    continue
+
+                self.file(row.table, db.STATS_BASE_COLUMNS + columns).write(
+                    format_line(db._stats_row_values(row, columns))
+                )
+        except Exception as e:
+            my_logger.error(f"bulk_load: add: {key}: {e!r}")
+
+            if self.on_error is not None and key is not None:
+                self.on_error([key])
+            return False
+
+        self.keys.append(key)
+
+        return True
+
+    def flush(self) -> bool:
+        """Flush the staging files to disk."""
+        res = True
+        keys = [key for key in self.keys if key is not None]
+
+        try:
+            for f in self.files.values():
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            res = False
+            my_logger.error(f"bulk_load: flush: {e!r}")
+
+        if res and keys:
+            if self.mark_done:
+                db.set_frontier_status(keys, db.DONE)
+            if self.on_commit is not None:
+                self.on_commit(keys)
+        elif not res and self.on_error is not None:
+            self.on_error(keys)
+
+        self.keys = []
+
+        return res
+
+
+def reset(directory: str = BULK_DIR) -> None:
+    """Delete the staging files of a previous rebuild."""
+    for path in glob.glob(os.path.join(directory, "*.csv")):
+        os.remove(path)
+
+
+def staging_files(directory: str = BULK_DIR) -> Dict[str, List[str]]:
+    """Map each table to the paths of its staging files."""
+    files = {}
+
+    for path in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+        table = os.path.basename(path).split(".")[0]
+        files.setdefault(table, []).append(path)
+
+    return files
+
+
+def load(directory: str = BULK_DIR) -> bool:
+    """
+    Load the staging files into staging copies of the tables, then swap them with the tables.
+    The tables are left untouched if any of the loads fails.
+
+    Arguments:
+        directory -- directory of the staging files
+    Returns:
+        True if the tables were replaced.
+    """
+    files = staging_files(directory)
+
+    if "info" not in files:
+        my_logger.error(f"bulk_load: load: no staging files in {directory}.")
+        return False
+
+    for table, paths in files.items():
+        columns = []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                columns.append(f.readline().strip().split(","))
+
+        if not db.load_staging_table(table, paths, columns):
+            return False
+
+        my_logger.info(f"Loaded {len(paths)} staging file(s) into {table}_staging.")
+
+    return db.swap_staging_tables([table for table in files if table != "info"])
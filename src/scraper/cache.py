@@ -0,0 +1,199 @@
+# cache.py
+"""On-disk cache of downloaded pages, keyed by URL."""
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Dict, NamedTuple, Optional
+
+# Directory of the cache, the cache is disabled when it isn't set
+CACHE_DIR = os.getenv("CACHE_DIR")
+
+# Seconds during which a cached page is used without revalidating it
+CACHE_TTL = float(os.getenv("CACHE_TTL", "86400"))
+
+# Size bound of the cache directory in bytes, least recently used pages are evicted first
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(2 * 1024**3)))
+
+# Cache of the current process (see get_cache)
+_cache = None
+_cache_pid = None
+
+
+class CachedPage(NamedTuple):
+    url: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched: float
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of response bodies.
+    Every page is stored gzip compressed next to a JSON file with its validators
+    (ETag/Last-Modified) and the time it was fetched.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        ttl: float = CACHE_TTL,
+        max_bytes: int = CACHE_MAX_BYTES,
+        offline: bool = False,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+
+        # Estimate of the cache size, computed on the first write
+        self.size = None
+
+    def paths(self, url: str):
+        """Return the body and metadata paths of a URL."""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+
+        return f"{base}.html.gz", f"{base}.json"
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Return the cached page of a URL, or None if it isn't cached."""
+        if self.directory is None:
+            return None
+
+        body_path, meta_path = self.paths(url)
+
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = gzip.decompress(f.read())
+
+            # The body's modification time records the last access for the LRU eviction
+            os.utime(body_path)
+        except (OSError, ValueError):
+            return None
+
+        return CachedPage(url, body, meta.get("etag"), meta.get("last_modified"), meta["fetched"])
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.fetched < self.ttl
+
+    def put(self, url: str, body: bytes, headers: Dict) -> None:
+        """
+        Store a downloaded page along with its validators.
+
+        Arguments:
+            url     -- absolute URL of the page
+            body    -- decoded response body
+            headers -- response headers
+        """
+        body_path, meta_path = self.paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+
+        compressed = gzip.compress(body)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched": time.time(),
+        }
+
+        # Write to temporary files and rename them so that readers never see partial files
+        for path, data in ((body_path, compressed), (meta_path, json.dumps(meta).encode("utf-8"))):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        if self.size is None:
+            self.size = self.disk_usage()
+        else:
+            self.size += len(compressed)
+
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def revalidated(self, url: str, headers: Dict) -> None:
+        """Mark a cached page as fresh after the server answered 304 Not Modified."""
+        _, meta_path = self.paths(url)
+
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+
+            meta["fetched"] = time.time()
+            meta["etag"] = headers.get("ETag") or meta.get("etag")
+            meta["last_modified"] = headers.get("Last-Modified") or meta.get("last_modified")
+
+            tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+        except (OSError, ValueError):
+            pass
+
+    def entries(self):
+        """Return (last access, size, body path) for every cached page."""
+        entries = []
+
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".html.gz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def disk_usage(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> None:
+        """Delete the least recently used pages until the cache is below 90% of its size bound."""
+        entries = sorted(self.entries())
+        self.size = sum(size for _, size, _ in entries)
+
+        for _, size, body_path in entries:
+            if self.size <= 0.9 * self.max_bytes:
+                break
+
+            for path in (body_path, body_path[: -len(".html.gz")] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+            self.size -= size
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """
+    Return the page cache of the current process, configured from the environment
+    (CACHE_DIR, CACHE_TTL, CACHE_MAX_BYTES and CACHE_OFFLINE), or None if caching is disabled.
+    In offline mode without CACHE_DIR, the cache misses every page so that nothing is downloaded.
+    """
+    global _cache, _cache_pid
+
+    if _cache_pid != os.getpid():
+        directory = os.getenv("CACHE_DIR", CACHE_DIR)
+        offline = os.getenv("CACHE_OFFLINE", "0") == "1"
+
+        _cache = ResponseCache(directory, offline=offline) if directory or offline else None
+        _cache_pid = os.getpid()
+
+    return _cache
+
+
+def set_cache(cache: Optional[ResponseCache]) -> None:
+    """Replace the page cache of the current process (None disables caching)."""
+    global _cache, _cache_pid
+
+    _cache = cache
+    _cache_pid = os.getpid()
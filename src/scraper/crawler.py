@@ -1,20 +1,42 @@
 # crawler.py
 """Driver program. Iterates over Leagues, Squads, and Players
  and stores their information into a database."""
+import argparse
+import asyncio
+import itertools
 import os
+import socket
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Pool
-from typing import List
+from multiprocessing.util import Finalize
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 from dotenv import load_dotenv
 
 # Config
 load_dotenv()
 
-import database as db
+import src.scraper.bulk_load as bulk_load
+import src.scraper.database as db
+import src.scraper.rows as rows
+import src.scraper.storage as storage
+import src.scraper.dead_letter as dead_letter
+import src.scraper.derived as derived
+import src.scraper.metrics as metrics
+import src.scraper.profiling as profiling
+import src.scraper.schemas as schemas
+import src.scraper.seasons as seasons
+import src.scraper.task_queue as task_queue
+from src.scraper.fingerprint import FingerprintIndex
+from src.scraper.http_client import transfer_summary
 from src.scraper.logger import get_logger
-from requests import get_players, get_squads
-from player_info import scrape_info
-from player_stats import get_stats_headers, scrape_stats
+from src.scraper.pipeline import DISCOVERY_THREADS, QUEUE_SIZE, discover_players
+from src.scraper.player import scrape_player
+from src.scraper.async_crawler import crawl_async
+from src.scraper.player_stats import get_stats_headers
+from src.scraper.rate_limit import reset_limiter
+from src.scraper.requests import get_players, get_squads
 
 my_logger = get_logger(__name__)
 
@@ -42,32 +64,325 @@ TABLES = [
     # "stats_keeper_adv_dom_lg",
 ]
 
+# Players whose pages give the headers of the tables the schema registry doesn't know yet before the crawl,
+# an outfield player first since the goalkeeper's page lacks the outfield-only tables. Only a warm-up:
+# a table they don't give is created from the first scraped page that has it (see SchemaRegistry.observe)
+SCHEMA_PLAYERS = [
+    "/en/players/0d9b2d31/Pedri",
+    "/en/players/1840e36d/Thibaut-Courtois",
+]
+
+# Number of players written per database transaction by each worker
+BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "1"))
+
+# Number of tasks a node of a distributed crawl leases at a time
+LEASE_BATCH = int(os.getenv("TASK_LEASE_BATCH", "16"))
+
+# Seconds between two polls of the task queue by an idle node or by the coordinator
+TASK_POLL = float(os.getenv("TASK_POLL", "5"))
+
+# Database writer of the current worker process (see init_worker)
+writer = None
+
+# Fingerprint index of the current worker process, only set by an incremental crawl
+index = None
+
+# Deltas of the players waiting in the writer's buffer, recorded in the index once committed
+pending = {}
+
+# Profiler of the current worker process, only set when profiling (CRAWL_PROFILE=N)
+profiler = None
+
+
+def init_worker(tables: List[List[str]] = ()) -> None:
+    """
+    Initializer of the pool worker processes.
+    Creates the worker's batch writer and makes sure its buffer is flushed when the worker exits.
+    In a bulk rebuild (CRAWL_BULK=1) the writer appends the players to staging files instead.
+    In an incremental crawl (CRAWL_INCREMENTAL=1) also opens the fingerprint index.
+    When profiling (CRAWL_PROFILE=N) one scrape call out of N is profiled, the profile is dumped when the worker exits.
+
+    Arguments:
+        tables -- stats table headers as returned by get_stats_headers
+    """
+    global writer, index, profiler
+
+    # Rows of all the workers share the schemas of the database tables
+    rows.register_schemas(tables)
+
+    if os.getenv("CRAWL_BULK") == "1":
+        writer = bulk_load.StagingWriter(
+            tables, on_error=record_failed_writes, on_commit=record_fingerprints, mark_done=True
+        )
+    else:
+        # Players are marked as done in the crawl frontier in the transaction that stores them
+        writer = db.BatchWriter(
+            BATCH_SIZE,
+            on_error=record_failed_writes,
+            on_commit=record_fingerprints,
+            mark_done=True,
+            write=storage.get_storage().add_players,
+        )
 
-def scrape(player: str) -> None:
+    if os.getenv("CRAWL_INCREMENTAL") == "1":
+        index = FingerprintIndex()
+        Finalize(index, index.close, exitpriority=1)
+
+    if os.getenv("CRAWL_PROFILE"):
+        profiler = profiling.SampledProfiler(int(os.getenv("CRAWL_PROFILE")))
+        Finalize(profiler, profiler.dump, exitpriority=1)
+
+    Finalize(writer, writer.flush, exitpriority=10)
+    Finalize(writer, log_transfer_summary, exitpriority=5)
+    # Last snapshot of the worker's metrics, once its buffer is written
+    Finalize(writer, metrics.publish, kwargs={"force": True}, exitpriority=1)
+
+
+def record_failed_writes(players: List[str]) -> None:
+    """Send the players of a batch that couldn't be stored to the dead letter file."""
+    for player in players:
+        pending.pop(player, None)
+        dead_letter.add(player, "player", "database write failed")
+
+    storage.get_storage().set_frontier_status(players, db.FAILED)
+
+
+def record_fingerprints(players: List[str]) -> None:
+    """Record in the fingerprint index the players of a batch that was stored."""
+    for player in players:
+        delta = pending.pop(player, None)
+
+        if delta is not None:
+            index.record(delta)
+
+
+def log_transfer_summary() -> None:
+    """Log how many bytes the process' HTTP client downloaded and decoded."""
+    my_logger.info(f"HTTP transfer (pid {os.getpid()}): {transfer_summary()}")
+
+
+def scrape(player: str) -> bool:
     """
     Function to be run by a process from the process pool.
+    Scrapes and stores a single players' data, see scrape_and_store.
+    The call is profiled when it is sampled by the worker's profiler.
+    """
+    if profiler is not None:
+        return profiler.run(scrape_and_store, player)
+
+    return scrape_and_store(player)
+
+
+def scrape_and_store(player: str) -> bool:
+    """
     Scrapes and stores a single players' data.
+    Players that can't be scraped are sent to the dead letter file.
 
     Arguments:
         player -- Unique player url path.
+    Returns:
+        True if the player was scraped.
     """
 
-    # time.sleep(0.5)
     player_start = time.time()
 
-    player_info = scrape_info(player)
+    try:
+        # Download and parse the player page once for both info and stats
+        scraped = scrape_player(player, TABLES)
+    except Exception as e:
+        my_logger.error(f"crawler: scrape: {player}: {e!r}")
+        metrics.inc("errors.scrape")
+        dead_letter.add(player, "player", repr(e))
+        storage.get_storage().set_frontier_status([player], db.FAILED)
+        metrics.publish()
+        return False
+
+    if scraped is None:
+        dead_letter.add(player, "player", "player page couldn't be downloaded")
+        storage.get_storage().set_frontier_status([player], db.FAILED)
+        metrics.publish()
+        return False
+
+    player_info, player_stats = scraped
     my_logger.debug(f'Id: {player_info["id"]}, Name: {player_info["name"]}')
 
-    db.add_info(player_info)
-    db.add_stats(scrape_stats(player, TABLES))
+    # Columns fbref added since the tables were created are added before the rows are written
+    schemas.get_registry().observe(player_stats)
+
+    if index is None:
+        writer.add(player_info, player_stats, key=player)
+    else:
+        # Only the info and the stats rows that changed since the last crawl are written
+        delta = index.delta(player_info, player_stats)
+
+        if delta.unchanged():
+            my_logger.info(f'Player unchanged, skipped Id: {player_info["id"]}, Name: {player_info["name"]}.')
+            # Nothing to store, the batch only marks the player as done
+            writer.add(None, [], key=player)
+            metrics.inc("players")
+            metrics.publish()
+            return True
+
+        pending[player] = delta
+        writer.add(delta.info, delta.stats, key=player)
 
     player_end = time.time()
 
+    metrics.observe("player", player_end - player_start)
+    metrics.inc("players")
+    # The crawler process reads the snapshots for its summary line and Prometheus endpoint
+    metrics.publish()
+
     my_logger.info(
         f'Scraped and stored player data for Id: {player_info["id"]}, Name: {player_info["name"]}.'
         f" Elapsed time = {player_end - player_start:.2f}s."
     )
 
+    return True
+
+
+def prepare_database() -> List[List[str]]:
+    """
+    Create the database and the tables, their format is read from the schema registry.
+    The tables the registry doesn't know yet are looked up on the pages of the seed players, on a best-effort
+    basis: the ones that can't be found there are created once the crawl scrapes a page that has them.
+
+    Returns:
+        The stats table headers, as returned by get_stats_headers.
+    """
+    registry = schemas.get_registry()
+    missing = [table for table in TABLES if table[6:-7] not in registry.schemas]
+
+    for player in SCHEMA_PLAYERS:
+        if not missing:
+            break
+
+        # A table missing from the page only has its name as header
+        for header in get_stats_headers(player, missing):
+            if len(header) > 1:
+                registry.merge(header[0], header[1:])
+
+        missing = [table for table in missing if table[6:-7] not in registry.schemas]
+
+    if missing:
+        my_logger.warning(
+            f"crawler: prepare_database: no header found for the tables {', '.join(missing)},"
+            " they are created from the first scraped page that has them."
+        )
+
+    headers = registry.headers(table[6:-7] for table in TABLES)
+
+    # Creates the tables, those created by an earlier version of their schema get the columns added since
+    registry.migrate(headers)
+    registry.save()
+
+    return headers
+
+
+def expanding(urls_of: Callable[[str], Optional[List[str]]], kind: str) -> Callable[[str], List[str]]:
+    """
+    Wrap a function returning the squads of a league, or the players of a squad,
+    so that its results are added to the crawl frontier and the page is marked as done.
+    A page that couldn't be downloaded is marked as failed instead.
+
+    Arguments:
+        urls_of -- get_squads or get_players, returning None if the page couldn't be downloaded
+        kind    -- kind of the URLs returned by urls_of: "squad" or "player"
+    """
+
+    def expand(url: str) -> List[str]:
+        urls = urls_of(url)
+
+        if urls is None:
+            storage.get_storage().set_frontier_status([url], db.FAILED)
+            return []
+
+        storage.get_storage().expand_frontier(url, urls, kind)
+        return urls
+
+    return expand
+
+
+def frontier_players() -> Iterator[str]:
+    """
+    Yield the players left to scrape in the crawl frontier: the pending players,
+    then the players of the pending squads and leagues. Players already done are skipped.
+    """
+    pending = storage.get_storage().select_frontier(db.PENDING)
+    seen = set(storage.get_storage().select_frontier(db.DONE)["player"])
+
+    my_logger.info(
+        f"Crawl frontier: {len(pending['league'])} leagues, {len(pending['squad'])} squads"
+        f" and {len(pending['player'])} players pending, {len(seen)} players done."
+    )
+
+    players = itertools.chain(
+        pending["player"],
+        discover_players(
+            pending["league"],
+            pending["squad"],
+            squads_of=expanding(get_squads, "squad"),
+            players_of=expanding(get_players, "player"),
+        ),
+    )
+
+    for player in players:
+        if player not in seen:
+            seen.add(player)
+            yield player
+
+
+def scrape_all(players: Iterable[str], tables: List[List[str]] = ()) -> None:
+    """
+    Scrape and store players with a pool of worker processes.
+    Players are submitted as they are produced, at most QUEUE_SIZE of them waiting at a time.
+
+    Arguments:
+        players -- iterable of player URLs
+        tables  -- stats table headers, as returned by prepare_database
+    """
+    results = {"scraped": 0, "failed": 0}
+
+    # Caps the players waiting in the pool so that discovery doesn't run ahead of scraping
+    in_flight = threading.BoundedSemaphore(QUEUE_SIZE)
+
+    def done(scraped: bool) -> None:
+        results["scraped" if scraped else "failed"] += 1
+        in_flight.release()
+
+    def error(e: BaseException) -> None:
+        my_logger.error(f"crawler: scrape_all: worker error: {e!r}")
+        results["failed"] += 1
+        in_flight.release()
+
+    # Periodic summary of the metrics of this process and of the workers
+    metrics.reset()
+    reporter = metrics.Reporter().start()
+
+    if os.getenv("CRAWL_PROFILE"):
+        profiling.reset()
+
+    pool = Pool(processes=None, initializer=init_worker, initargs=(tables,))
+
+    for player in players:
+        in_flight.acquire()
+        pool.apply_async(scrape, args=(player,), callback=done, error_callback=error)
+    pool.close()
+    pool.join()
+
+    reporter.stop()
+    log_transfer_summary()
+
+    if os.getenv("CRAWL_PROFILE"):
+        # The workers dumped their profiles when they exited
+        report = profiling.merge()
+        my_logger.info(f"Profile of the sampled scrape calls: {report or 'no call was sampled'}.")
+
+    my_logger.info(
+        f"Scraped {results['scraped']} players, {results['failed']} failed"
+        f" (see {dead_letter.DEAD_LETTER_FILE})."
+    )
+
 
 def crawl(leagues: List[str]) -> None:
     """
@@ -80,22 +395,102 @@ def crawl(leagues: List[str]) -> None:
 
     start = time.time()
 
-    # A single player will be used to determine the table format
-    PLAYER = "/en/players/1840e36d/Thibaut-Courtois"
-    player_tables = get_stats_headers(PLAYER, TABLES)
+    tables = prepare_database()
+    storage.get_storage().reset_frontier(leagues)
 
-    db.create_db(os.getenv("DATABASE"))
-    db.create_info_table()
-    db.create_stats_tables(player_tables)
+    if os.getenv("CRAWL_BULK") == "1":
+        bulk_load.reset()
 
-    pool = Pool(processes=None)
+    # Players are scraped as soon as their squad is discovered
+    scrape_all(frontier_players(), tables)
 
-    for league in leagues:
-        for squad in get_squads(league):
-            for index, player in enumerate(get_players(squad)):
-                pool.apply_async(scrape, args=(player,))
-    pool.close()
-    pool.join()
+    if os.getenv("CRAWL_BULK") == "1":
+        bulk_load.load()
+
+    end = time.time()
+
+    my_logger.info(
+        f" Total elapsed time = {end - start:.2f}s."
+    )
+
+
+def backfill(leagues: List[str]) -> None:
+    """
+    Crawl the leagues of several past seasons. The players of all the seasons are discovered first,
+    then every unique player is scraped once: his page holds the stats of all his seasons.
+
+    Arguments:
+         leagues -- list of URLs of season-specific league pages (see seasons.season_leagues)
+    """
+
+    start = time.time()
+
+    tables = prepare_database()
+    storage.get_storage().reset_frontier(leagues)
+
+    if os.getenv("CRAWL_BULK") == "1":
+        bulk_load.reset()
+
+    # A player appearing in several seasons (or squads) is only kept once
+    players = list(frontier_players())
+
+    my_logger.info(
+        f"Backfill: {len(players)} unique players in {len(leagues)} league seasons."
+        f" Discovery elapsed time = {time.time() - start:.2f}s."
+    )
+
+    scrape_all(players, tables)
+
+    if os.getenv("CRAWL_BULK") == "1":
+        bulk_load.load()
+
+    end = time.time()
+
+    my_logger.info(
+        f" Total elapsed time = {end - start:.2f}s."
+    )
+
+
+def resume() -> None:
+    """
+    Continue an interrupted crawl from its frontier: leagues, squads and players
+    still pending are crawled, the ones already done are not scraped again.
+    """
+
+    start = time.time()
+
+    tables = prepare_database()
+
+    scrape_all(frontier_players(), tables)
+
+    if os.getenv("CRAWL_BULK") == "1":
+        bulk_load.load()
+
+    end = time.time()
+
+    my_logger.info(
+        f" Total elapsed time = {end - start:.2f}s."
+    )
+
+
+def crawl_dead_letters() -> None:
+    """
+    Re-process only the leagues, squads and players of the dead letter file.
+    Once done, the file only holds the URLs that failed again.
+    """
+
+    start = time.time()
+
+    entries = dead_letter.load()
+    my_logger.info(f"Re-processing {len(entries)} dead letters.")
+
+    urls = {kind: [e["url"] for e in entries if e["kind"] == kind] for kind in ("league", "squad", "player")}
+
+    tables = prepare_database()
+
+    scrape_all(itertools.chain(urls["player"], discover_players(urls["league"], urls["squad"])), tables)
+
+    dead_letter.prune(before=start)
 
     end = time.time()
 
@@ -104,5 +499,341 @@ def crawl(leagues: List[str]) -> None:
     )
 
 
+def crawl_concurrently(leagues: List[str]) -> None:
+    """
+    Crawl a list of soccer leagues with the asynchronous engine:
+    pages are downloaded over a single HTTP session and parsed in a process pool.
+
+    Arguments:
+         leagues -- list of URLs of soccer leagues to scrape
+    """
+
+    start = time.time()
+
+    prepare_database()
+
+    players = asyncio.run(crawl_async(leagues, TABLES))
+
+    end = time.time()
+
+    my_logger.info(
+        f" Scraped {len(players)} players. Total elapsed time = {end - start:.2f}s."
+    )
+
+
+def requeue_expired(tasks: task_queue.TaskQueue) -> None:
+    """Re-queue the tasks of the nodes that stopped heartbeating, dead letter the ones given up on."""
+    requeued, given_up = tasks.requeue_expired()
+
+    for task in given_up:
+        dead_letter.add(task.url, task.kind, f"lease expired {task.attempts} times")
+
+    if requeued or given_up:
+        my_logger.warning(f"Re-queued {requeued} expired tasks, gave up on {len(given_up)}.")
+
+
+def coordinate(leagues: List[str]) -> None:
+    """
+    Coordinator of a distributed crawl: publish the leagues to the task queue (TASK_QUEUE),
+    then re-queue the expired leases until the nodes have processed every task.
+
+    Arguments:
+         leagues -- list of URLs of soccer leagues to scrape
+    """
+
+    start = time.time()
+
+    prepare_database()
+
+    tasks = task_queue.get_queue()
+    tasks.reset(leagues)
+
+    while not tasks.finished():
+        time.sleep(TASK_POLL)
+        requeue_expired(tasks)
+        my_logger.info(f"Crawl tasks: {tasks.counts()}.")
+
+    end = time.time()
+
+    my_logger.info(
+        f" Crawl tasks: {tasks.counts()}. Total elapsed time = {end - start:.2f}s."
+    )
+
+
+def run_node(
+    tables: List[List[str]] = (),
+    node: str = None,
+    squads_of: Callable[[str], Optional[List[str]]] = get_squads,
+    players_of: Callable[[str], Optional[List[str]]] = get_players,
+    scrape_task: Callable[[str], bool] = scrape,
+    processes: int = None,
+) -> Dict[str, int]:
+    """
+    Node of a distributed crawl. Leases tasks from the task queue until the crawl is finished:
+    league and squad pages are fetched by threads and their links published back as tasks,
+    players are scraped and stored by a pool of worker processes.
+    The leases of the tasks in progress are renewed every third of TASK_LEASE.
+
+    Arguments:
+        tables      -- stats table headers, as returned by prepare_database
+        node        -- unique name of the node, NODE_ID or <host>:<pid> by default
+        squads_of   -- function returning the team URLs of a league, None if the page couldn't be downloaded
+        players_of  -- function returning the player URLs of a team, None if the page couldn't be downloaded
+        scrape_task -- function scraping and storing a player in a worker process
+        processes   -- number of worker processes, one per CPU by default
+    Returns:
+        The number of tasks processed by the node, by status ("done" or "failed").
+    """
+    node = node or os.getenv("NODE_ID") or f"{socket.gethostname()}:{os.getpid()}"
+    tasks = task_queue.get_queue()
+    results = {task_queue.DONE: 0, task_queue.FAILED: 0}
+
+    # URLs of the tasks leased and not finished yet, their leases are renewed by the heartbeat
+    held = set()
+    held_lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(QUEUE_SIZE)
+    stopped = threading.Event()
+
+    def finish(task: task_queue.Task, done: bool, children: List[str] = (), kind: str = None) -> None:
+        if done:
+            recorded = tasks.complete(node, task.url, children, kind)
+        else:
+            recorded = tasks.fail(node, task.url)
+
+        if not recorded:
+            # The lease expired and the task was re-queued, another node owns its result
+            my_logger.warning(f"crawler: run_node: {task.url}: the lease was lost, the result is dropped.")
+
+        with held_lock:
+            if recorded:
+                results[task_queue.DONE if done else task_queue.FAILED] += 1
+            held.discard(task.url)
+        in_flight.release()
+
+    def heartbeat() -> None:
+        while not stopped.wait(task_queue.LEASE_SECONDS / 3):
+            with held_lock:
+                urls = list(held)
+            tasks.heartbeat(node, urls)
+
+    def discover(task: task_queue.Task) -> None:
+        try:
+            if task.kind == "league":
+                urls, kind = squads_of(task.url), "squad"
+            else:
+                urls, kind = players_of(task.url), "player"
+
+            # None: the page couldn't be downloaded (already dead lettered), the task fails
+            finish(task, urls is not None, urls or [], kind)
+        except Exception as e:
+            my_logger.error(f"crawler: run_node: {task.url}: {e!r}")
+            dead_letter.add(task.url, task.kind, repr(e))
+            finish(task, False)
+
+    def scraped(task: task_queue.Task) -> Callable[[bool], None]:
+        def done(res: bool) -> None:
+            finish(task, res)
+
+        return done
+
+    def error(task: task_queue.Task) -> Callable[[BaseException], None]:
+        def failed(e: BaseException) -> None:
+            my_logger.error(f"crawler: run_node: worker error: {task.url}: {e!r}")
+            finish(task, False)
+
+        return failed
+
+    my_logger.info(f"Node {node} leasing tasks from {type(tasks).__name__}.")
+
+    metrics.reset()
+    reporter = metrics.Reporter().start()
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    pool = Pool(processes=processes, initializer=init_worker, initargs=(tables,))
+    discovery = ThreadPoolExecutor(max_workers=DISCOVERY_THREADS)
+
+    while True:
+        leased = tasks.lease(node, LEASE_BATCH)
+
+        if not leased:
+            with held_lock:
+                busy = bool(held)
+
+            if not busy and tasks.finished():
+                break
+
+            requeue_expired(tasks)
+            time.sleep(TASK_POLL)
+            continue
+
+        with held_lock:
+            held.update(task.url for task in leased)
+
+        for task in leased:
+            in_flight.acquire()
+
+            if task.kind == "player":
+                pool.apply_async(
+                    scrape_task, args=(task.url,), callback=scraped(task), error_callback=error(task)
+                )
+            else:
+                discovery.submit(discover, task)
+
+    stopped.set()
+    discovery.shutdown()
+    pool.close()
+    pool.join()
+
+    reporter.stop()
+    log_transfer_summary()
+
+    my_logger.info(f"Node {node} processed {results[task_queue.DONE]} tasks, {results[task_queue.FAILED]} failed.")
+
+    return results
+
+
+def derive_metrics(since: float) -> None:
+    """
+    Compute the derived metrics tables once the crawl is done. After an incremental crawl
+    only the players whose rows changed are recomputed.
+
+    Arguments:
+        since -- start time of the crawl
+    """
+    start = time.time()
+    players = None
+
+    if os.getenv("CRAWL_INCREMENTAL") == "1":
+        index = FingerprintIndex()
+        players = index.touched(since)
+        index.close()
+
+    derived.derive([table[6:-7] for table in TABLES], players)
+
+    my_logger.info(
+        f" Derived metrics of {'all' if players is None else len(players)} players."
+        f" Elapsed time = {time.time() - start:.2f}s."
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Crawl fbref.com and store player data.")
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="use the asyncio/aiohttp crawl engine instead of the process pool",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="only read pages from the page cache (CACHE_DIR), never from the network",
+    )
+    parser.add_argument(
+        "--dead-letter",
+        action="store_true",
+        help="only re-process the URLs of the dead letter file (DEAD_LETTER_FILE)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted crawl from the pending URLs of its crawl frontier",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only write the players and stats rows that changed since the last crawl (FINGERPRINT_INDEX)",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="rebuild the tables: stage the scraped rows in files (BULK_DIR) and bulk load them at the end",
+    )
+    parser.add_argument(
+        "--derive",
+        action="store_true",
+        help="compute the derived metrics tables (per 90, rolling form, career, age curves) after the crawl",
+    )
+    parser.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="publish the leagues to the task queue of a distributed crawl (TASK_QUEUE) and wait for the nodes",
+    )
+    parser.add_argument(
+        "--node",
+        action="store_true",
+        help="process tasks of the task queue of a distributed crawl until it is finished",
+    )
+    parser.add_argument(
+        "--backfill",
+        type=int,
+        nargs=2,
+        metavar=("FIRST", "LAST"),
+        help="crawl the seasons starting from year FIRST to year LAST, scraping every unique player once",
+    )
+    parser.add_argument(
+        "--profile",
+        type=int,
+        metavar="N",
+        help="profile one scrape call out of N in every worker with cProfile, merged into PROFILE_DIR/report.txt",
+    )
+    args = parser.parse_args()
+
+    if args.bulk and (args.incremental or args.dead_letter or args.use_async):
+        parser.error("--bulk rebuilds all the tables, it can only be combined with --resume and --offline")
+    if (args.coordinator or args.node) and (args.bulk or args.resume or args.dead_letter or args.use_async):
+        parser.error("--coordinator and --node can only be combined with --incremental, --offline and --derive")
+    if args.backfill and (args.resume or args.dead_letter):
+        parser.error("--backfill starts a new crawl, use --resume alone to continue an interrupted backfill")
+    if args.backfill and args.backfill[0] > args.backfill[1]:
+        parser.error("--backfill FIRST LAST: the first season is after the last one")
+    if args.profile and args.use_async:
+        parser.error("--profile samples the process pool workers, it can't be combined with --async")
+    if args.bulk and not isinstance(storage.get_storage(), storage.MySQLStorage):
+        parser.error("--bulk loads the tables with LOAD DATA, it needs the MySQL storage backend")
+    if args.offline and not os.getenv("CACHE_DIR"):
+        parser.error("--offline reads the pages from the page cache, it needs CACHE_DIR")
+
+    if args.offline:
+        # Set in the environment so that the worker processes pick it up too
+        os.environ["CACHE_OFFLINE"] = "1"
+
+    if args.incremental:
+        os.environ["CRAWL_INCREMENTAL"] = "1"
+
+    if args.bulk:
+        os.environ["CRAWL_BULK"] = "1"
+
+    if args.profile:
+        os.environ["CRAWL_PROFILE"] = str(args.profile)
+
+    # The rate adapted by the previous crawl isn't inherited
+    reset_limiter()
+
+    leagues = LEAGUES
+    if args.backfill:
+        leagues = seasons.season_leagues(LEAGUES, *args.backfill)
+
+    start = time.time()
+
+    if args.coordinator:
+        coordinate(leagues)
+    elif args.node:
+        run_node(prepare_database())
+    elif args.dead_letter:
+        crawl_dead_letters()
+    elif args.resume:
+        resume()
+    elif args.use_async:
+        crawl_concurrently(leagues)
+    elif args.backfill:
+        backfill(leagues)
+    else:
+        crawl(leagues)
+
+    if args.derive:
+        derive_metrics(since=start)
+
+
 if __name__ == "__main__":
-    crawl(LEAGUES)
+    main()
@@ -1,25 +1,73 @@
 # database.py
 """Functions that are accessing and modifying the database."""
 
-from typing import List, Dict
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+import json
 import mysql.connector
+from mysql.connector import pooling
 import os
+import threading
 
+import src.scraper.metrics as metrics
 from src.scraper.logger import get_logger
+from src.scraper.rows import StatsRow, metric_columns, union_metrics
 
 DB = os.getenv("DATABASE")
 HOST = os.getenv("DB_HOST")
 USER = os.getenv("DB_USER")
 PSW = os.getenv("DB_PSW")
 
+# Connections kept open per process by the connection pool
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "2"))
+
+# Columns of the info table
+INFO_COLUMNS = ["id", "name", "height", "weight", "dob", "countryob", "club", "age"]
+
+# Leading columns of a stats table, followed by its metrics (the primary key is id, season, squad)
+STATS_BASE_COLUMNS = ["id", "season", "squad", "country", "comp_level", "lg_finish"]
+
+# Connection pool of the current process, created lazily (pools can't be shared across a fork)
+_pool = None
+_pool_pid = None
+
+# Maximum number of players looked up by a single statement of the batch selects
+READ_BATCH = int(os.getenv("DB_READ_BATCH", "512"))
+
+# Read connections of the current process, one per thread (see get_reader)
+_readers = threading.local()
+
+# Status of the leagues, squads and players of the crawl frontier
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Parts of the names of the metric columns holding decimal values (see metric_type)
+DECIMAL_METRICS = ("per90", "90s", "xg", "xa", "pct", "per_", "avg", "average", "wowy")
+
+# Versions of the schemas of the stats tables, see schemas.py
+SCHEMAS_TABLE = (
+    "CREATE TABLE IF NOT EXISTS "
+    "stats_schemas (tbl VARCHAR(30) NOT NULL, "
+    "version INT NOT NULL, "
+    "columns TEXT NOT NULL, "
+    "created TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+    "PRIMARY KEY(tbl, version));"
+)
+
+# The frontier is updated by the discovery threads, one at a time so that they don't exhaust the pool
+_frontier_lock = threading.Lock()
+
 # Logging
 my_logger = get_logger(__name__)
 
 
-def connect_to_db(db=None):
+def connect_to_db(db=None, local_infile: bool = False):
     """
     Create a database connection to a MySQL database
 
+    Arguments:
+        db           -- name of the database to use
+        local_infile -- allow LOAD DATA LOCAL INFILE on the connection
     Returns:
         conn -- MySQL connection object
         cur -- database cursor for the current connection
@@ -27,7 +75,9 @@ def connect_to_db(db=None):
     conn = cur = None
 
     try:
-        conn = mysql.connector.connect(host=HOST, user=USER, password=PSW, database=db)
+        conn = mysql.connector.connect(
+            host=HOST, user=USER, password=PSW, database=db, allow_local_infile=local_infile
+        )
 
         cur = conn.cursor()
     except Exception as e:
@@ -40,6 +90,42 @@ def connect_to_db(db=None):
         return conn, cur
 
 
+def connect_to_pool():
+    """
+    Borrow a connection from this process' MySQL connection pool.
+    Closing the connection returns it to the pool instead of tearing it down.
+
+    Returns:
+        conn -- pooled MySQL connection object
+        cur -- database cursor for the current connection
+    """
+    global _pool, _pool_pid
+    conn = cur = None
+
+    try:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = pooling.MySQLConnectionPool(
+                pool_name=f"fbref_{os.getpid()}",
+                pool_size=POOL_SIZE,
+                host=HOST,
+                user=USER,
+                password=PSW,
+                database=DB,
+            )
+            _pool_pid = os.getpid()
+
+        conn = _pool.get_connection()
+        cur = conn.cursor()
+    except Exception as e:
+        my_logger.error(e)
+        my_logger.error(
+            "database: connect_to_pool: "
+            "Exception was raised when trying to get a pooled connection to mysql."
+        )
+    finally:
+        return conn, cur
+
+
 def close_db_connection(conn, cur) -> bool:
     """
     Close the database connection and the database cursor.
@@ -142,18 +228,143 @@ def drop_info_table() -> bool:
 
 
 def select_info(player_id: str):
+    return _select("select_info", "info", "SELECT * FROM info WHERE id = %s;", (player_id,))
+
+
+def select_info_all():
+    return _select("select_info_all", "info", "SELECT * FROM info;")
+
+
+def select_info_many(ids: Iterable[str]) -> Optional[Dict[str, tuple]]:
+    """
+    Look up the info rows of several players, with one statement per READ_BATCH players.
+
+    Arguments:
+        ids -- ids of the players
+    Returns:
+        Dictionary mapping the ids of the players found to their info row, None if the lookup failed.
+    """
+    rows = _select_many("select_info_many", "info", ids)
+
+    return None if rows is None else {row[0]: row for row in rows}
+
+
+def add_info(info: Dict) -> bool:
+    """
+    Inserts the general information about a player (name, age, position, etc.) into
+    the info table.
+
+    Arguments:
+        info -- A dictionary with column names as keys and player information as values.
+             -- for example {'name':'Thibaut Courtois', 'position':'GK', ..., 'age':29}
+    """
+    return add_player(info, [])
+
+
+def _upsert_info(cur, info: Dict) -> None:
+    """
+    Insert or update a player's row in the info table.
+    An upsert is used instead of REPLACE so that the stats rows referencing
+    the player aren't deleted by the ON DELETE CASCADE foreign keys.
+    """
+    columns = list(info.keys())
+    placeholders = ", ".join(["%s"] * len(columns))
+    updates = ", ".join(f"{column} = VALUES({column})" for column in columns)
+    sql = (
+        f"INSERT INTO info ( {', '.join(columns)} ) VALUES ( {placeholders} ) "
+        f"ON DUPLICATE KEY UPDATE {updates};"
+    )
+
+    cur.execute(sql, list(info.values()))
+
+
+def metric_type(column: str) -> str:
+    """
+    Column type of a metric: DECIMAL for the per 90s, expected goals, percentages and averages,
+    INT for the distances in yards, which overflow a SMALLINT, and SMALLINT for the other counts.
+
+    Arguments:
+        column -- name of the metric column (data-stat of the fbref table)
+    """
+    if any(part in column for part in DECIMAL_METRICS):
+        return "DECIMAL(7,2)"
+
+    if "distance" in column:
+        return "INT"
+
+    return "SMALLINT"
+
+
+def create_stats_tables(tables: List[List[str]]) -> bool:
+    """
+    Create the stats tables if they don't exist, over a single connection.
+    Every table is attempted, a table that can't be created doesn't stop the others.
+
+    Arguments:
+        tables -- a list of string lists,
+               -- tables[i][0] is the name of the i-th table
+               -- tables[i][1:] are the column names for the i-th table
+    """
     conn, cur = connect_to_db(db=DB)
-    res = None
+    res = True
 
     try:
-        cur.execute("SELECT * FROM info WHERE id = '( %s )';" % player_id)
+        for table in tables:
+            res = _create_stats_table(cur, table) and res
+    finally:
+        close_db_connection(conn, cur)
+
+    return res
+
+
+def _create_stats_table(cur, table: List[str]) -> bool:
+    """
+    Create a stats table, typing its metric columns with metric_type and indexing the season
+    and squad columns the queries of the dataset filter on.
 
-        res = cur.fetchall()
+    Arguments:
+        cur   -- cursor of the open connection
+        table -- table[0] is the name of the table, table[1:] are its header columns
+    """
+    columns = "".join(f"{column} {metric_type(column)}, " for column in metric_columns(table[1:]))
+
+    try:
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {table[0]} "
+            "(id VARCHAR(8) NOT NULL, "
+            "season VARCHAR(20) NOT NULL, "
+            "country VARCHAR(30), "
+            "comp_level VARCHAR(30), "
+            "lg_finish VARCHAR(10), "
+            "squad VARCHAR(50) NOT NULL, "
+            f"{columns}"
+            "PRIMARY KEY(id, season, squad), "
+            "INDEX (season), INDEX (squad), "
+            "FOREIGN KEY(id) REFERENCES info(id) ON DELETE CASCADE ON UPDATE CASCADE);"
+        )
     except Exception as e:
         my_logger.error(e)
         my_logger.error(
-            "database: select_info: "
-            f"Exception was raised when trying to select from info where id = {player_id}."
+            f"database: create_stats_table: "
+            f"Exception was raised when trying to create table {table[0]}."
+        )
+        return False
+
+    return True
+
+
+def drop_stats_table(table: str) -> bool:
+    conn, cur = connect_to_db(db=DB)
+    res = False
+
+    try:
+        cur.execute(f"DROP TABLE IF EXISTS {table} ")
+        res = True
+    except Exception as e:
+        my_logger.error(e)
+        my_logger.error(
+            f"database: create_stats_table: "
+            f"Exception was raised when trying to drop table {table}."
         )
     finally:
         close_db_connection(conn, cur)
@@ -161,19 +372,249 @@ def select_info(player_id: str):
     return res
 
 
-def select_info_all():
+def drop_stats_tables(tables: List[List[str]]) -> None:
+    # Drop tables
+    for table in tables:
+        drop_stats_table(table[0])
+
+
+def select_stats(player_id: str, table: str):
+    return _select("select_stats", table, f"SELECT * FROM {table} WHERE id = %s;", (player_id,))
+
+
+def select_stats_all(table: str) -> None:
+    return _select("select_stats_all", table, f"SELECT * FROM {table};")
+
+
+def select_stats_many(ids: Iterable[str], table: str) -> Optional[Dict[str, List[tuple]]]:
+    """
+    Look up the rows of several players in a stats table, with one statement per READ_BATCH players.
+
+    Arguments:
+        ids   -- ids of the players
+        table -- name of the stats table
+    Returns:
+        Dictionary mapping the ids of the players to their rows (an empty list for a player without rows),
+        None if the lookup failed.
+    """
+    ids = list(ids)
+    rows = _select_many("select_stats_many", table, ids)
+
+    if rows is None:
+        return None
+
+    res = {player_id: [] for player_id in ids}
+    for row in rows:
+        res[row[0]].append(row)
+
+    return res
+
+
+def id_batches(ids: Iterable[str], size: int = None) -> Iterator[List[str]]:
+    """
+    Split player ids into batches of at most size ids for IN ( ... ) lookups. A batch is padded
+    with repeats of its last id up to a power of two, so that a handful of statements (one per
+    batch length) are prepared whatever the number of players looked up.
+
+    Arguments:
+        ids  -- ids of the players, duplicates are looked up once
+        size -- maximum number of ids per batch (READ_BATCH by default)
+    """
+    ids = list(dict.fromkeys(ids))
+    size = size or READ_BATCH
+
+    for i in range(0, len(ids), size):
+        batch = ids[i : i + size]
+        length = 1
+
+        while length < len(batch):
+            length *= 2
+
+        yield batch + [batch[-1]] * (min(length, size) - len(batch))
+
+
+class Reader:
+    """
+    Read connection of a thread. Every query is a server-side prepared statement,
+    prepared the first time it is run on the connection and only executed by the following calls.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.conn = None
+
+        # Prepared cursors by statement
+        self.statements = {}
+
+    def query(self, sql: str, params: Iterable = ()) -> List[tuple]:
+        """
+        Run a prepared statement and fetch its rows.
+        A connection that was lost (server restart, wait_timeout) is reopened once.
+        """
+        try:
+            return self.execute(sql, params)
+        except (mysql.connector.OperationalError, mysql.connector.InterfaceError):
+            self.close()
+            return self.execute(sql, params)
+
+    def execute(self, sql: str, params: Iterable) -> List[tuple]:
+        if self.conn is None:
+            # Autocommit, or every read would see the snapshot of the connection's first one
+            self.conn = mysql.connector.connect(host=HOST, user=USER, password=PSW, database=DB, autocommit=True)
+
+        if sql not in self.statements:
+            self.statements[sql] = self.conn.cursor(prepared=True)
+
+        cur = self.statements[sql]
+        cur.execute(sql, tuple(params))
+
+        return cur.fetchall()
+
+    def close(self) -> None:
+        conn, self.conn, self.statements = self.conn, None, {}
+
+        try:
+            if conn is not None:
+                conn.close()
+        except Exception as e:
+            my_logger.error(e)
+
+
+def get_reader() -> Reader:
+    """Return the read connection of the current thread, the ones inherited from a parent process are replaced."""
+    reader = getattr(_readers, "reader", None)
+
+    if reader is None or reader.pid != os.getpid():
+        reader = _readers.reader = Reader()
+
+    return reader
+
+
+def _select(name: str, table: str, sql: str, params: Iterable = ()) -> Optional[List[tuple]]:
+    """Run a select with the read connection of the thread, None if it failed."""
+    try:
+        return get_reader().query(sql, params)
+    except Exception as e:
+        my_logger.error(e)
+        my_logger.error(f"database: {name}: Exception was raised when trying to select from {table}.")
+        return None
+
+
+def _select_many(name: str, table: str, ids: Iterable[str]) -> Optional[List[tuple]]:
+    """Select the rows of several players from a table, batch by batch, None if a batch failed."""
+    rows = []
+
+    for batch in id_batches(ids):
+        placeholders = ", ".join(["%s"] * len(batch))
+        res = _select(name, table, f"SELECT * FROM {table} WHERE id IN ( {placeholders} );", batch)
+
+        if res is None:
+            return None
+
+        rows.extend(res)
+
+    return rows
+
+
+def select_chunks(
+    table: str, chunk_size: int, ids: List[str] = None
+) -> Iterator[Tuple[List[str], List[tuple]]]:
+    """
+    Stream all the rows of a table in chunks. The connection's default cursor is unbuffered,
+    rows are read from the server as they are fetched.
+
+    Arguments:
+        table      -- name of the table
+        chunk_size -- number of rows per chunk
+        ids        -- only select the rows of these players
+    Returns:
+        Iterator of (column names, rows) tuples.
+    """
     conn, cur = connect_to_db(db=DB)
-    res = None
 
     try:
-        cur.execute("SELECT * FROM info;")
+        if ids is None:
+            cur.execute(f"SELECT * FROM {table};")
+        else:
+            cur.execute(f"SELECT * FROM {table} WHERE id IN ( {', '.join(['%s'] * len(ids))} );", list(ids))
+        columns = [column[0] for column in cur.description]
+
+        while rows := cur.fetchmany(chunk_size):
+            yield columns, rows
+    except Exception as e:
+        my_logger.error(e)
+        my_logger.error(
+            "database: select_chunks: "
+            f"Exception was raised when trying to select all from {table}."
+        )
+        raise
+    finally:
+        close_db_connection(conn, cur)
+
+
+def create_table_sql(table: str, columns: Dict[str, str], key: List[str]) -> str:
+    """
+    CREATE TABLE statement of a table given its column types.
+
+    Arguments:
+        table   -- name of the table
+        columns -- SQL type of each column, in column order
+        key     -- primary key columns
+    """
+    definitions = ", ".join(f"{column} {sql_type}" for column, sql_type in columns.items())
+
+    return f"CREATE TABLE IF NOT EXISTS {table} ({definitions}, PRIMARY KEY({', '.join(key)}));"
+
+
+def write_table(
+    table: str, columns: Dict[str, str], key: List[str], rows: List[tuple], ids: List[str] = None
+) -> bool:
+    """
+    Materialize computed rows in a table.
+    The rows of the given players are replaced in a single transaction. A table rebuilt from scratch
+    is written to <table>_new, then swapped in with an atomic RENAME TABLE: MySQL commits DDL
+    statements implicitly, a failed rebuild leaves the previous table in place.
+
+    Arguments:
+        table   -- name of the table
+        columns -- SQL type of each column, in row order
+        key     -- primary key columns
+        rows    -- rows to insert
+        ids     -- players whose rows are replaced, None to rebuild the whole table
+    """
+    conn, cur = connect_to_pool()
+    target = table if ids is not None else f"{table}_new"
+    res = False
+
+    try:
+        # Created before the transaction, the DDL commits implicitly
+        cur.execute(create_table_sql(table, columns, key))
+        if ids is None:
+            cur.execute(f"DROP TABLE IF EXISTS {target};")
+            cur.execute(create_table_sql(target, columns, key))
+        else:
+            cur.executemany(f"DELETE FROM {table} WHERE id = %s;", [(player_id,) for player_id in ids])
+
+        if rows:
+            cur.executemany(
+                f"INSERT INTO {target} ( {', '.join(columns)} ) VALUES ( {', '.join(['%s'] * len(columns))} );",
+                rows,
+            )
+
+        conn.commit()
 
-        res = cur.fetchall()
+        if ids is None:
+            cur.execute(f"DROP TABLE IF EXISTS {table}_old;")
+            cur.execute(f"RENAME TABLE {table} TO {table}_old, {target} TO {table};")
+            cur.execute(f"DROP TABLE {table}_old;")
+
+        res = True
     except Exception as e:
+        if conn is not None:
+            conn.rollback()
         my_logger.error(e)
         my_logger.error(
-            "database: select_info_all: "
-            f"Exception was raised when trying to select all from info."
+            f"database: write_table: Exception was raised when trying to write table {table}."
         )
     finally:
         close_db_connection(conn, cur)
@@ -181,32 +622,28 @@ def select_info_all():
     return res
 
 
-def add_info(info: Dict) -> bool:
+def add_stats(stats: List[StatsRow]) -> bool:
     """
-    Inserts the general information about a player (name, age, position, etc.) into
-    the info table.
+    Insert player performance data into the appropriate table.
 
     Arguments:
-        info -- A dictionary with column names as keys and player information as values.
-             -- for example {'name':'Thibaut Courtois', 'position':'GK', ..., 'age':29}
+        stats -- list of StatsRow
+              -- each one represents a row of a table
+              -- (for example playing time for a player in a single season)
     """
-    # Add data into the info table
-    conn, cur = connect_to_db(db=DB)
+    conn, cur = connect_to_pool()
     res = True
 
     try:
-        placeholders = ", ".join(["%s"] * len(info))
-        columns = ", ".join(info.keys())
-        sql = "REPLACE INTO info ( %s ) VALUES ( %s );" % (columns, placeholders)
-
-        cur.execute(sql, list(info.values()))
+        _upsert_stats(cur, stats)
         conn.commit()
     except Exception as e:
         res = False
+        if conn is not None:
+            conn.rollback()
         my_logger.error(e)
         my_logger.error(
-            "database: add_info: "
-            "Exception was raised when trying to insert primary key (id)."
+            "database: add_stats: Exception was raised when trying to insert stats rows."
         )
     finally:
         close_db_connection(conn, cur)
@@ -214,79 +651,125 @@ def add_info(info: Dict) -> bool:
     return res
 
 
-def create_stats_tables(tables: List[List[str]]) -> bool:
+def add_player(info: Dict, stats: List[StatsRow]) -> bool:
     """
-    Create the stats tables if they don't exist.
+    Store a player's general information and stats rows in a single transaction.
 
     Arguments:
-        tables -- a list of string lists,
-               -- tables[i][0] is the name of the i-th table
-               -- tables[i][1:] are the column names for the i-th table
+        info  -- dictionary of general player information (see add_info).
+        stats -- list of dictionaries, each representing a row of a stats table (see add_stats).
     """
+    return add_players([(info, stats)])
+
+
+def add_players(players: List, done: List[str] = ()) -> bool:
+    """
+    Store several players over one pooled connection and commit once.
+
+    Arguments:
+        players -- list of (info, stats) tuples as returned by scrape_player.
+        done    -- URLs marked as done in the crawl frontier, in the same transaction
+    """
+    conn, cur = connect_to_pool()
     res = True
 
-    base_column = [
-        "season",
-        "squad",
-        "team",
-        "country",
-        "comp_level",
-        "lg_finish",
-    ]
+    try:
+        for info, stats in players:
+            if info:
+                _upsert_info(cur, info)
 
-    # Create tables
-    for table in tables:
-        conn, cur = connect_to_db(db=DB)
+        _upsert_stats(cur, [row for _, stats in players for row in stats])
+        _set_frontier_status(cur, done, DONE)
+        conn.commit()
+    except Exception as e:
+        res = False
+        if conn is not None:
+            conn.rollback()
+        my_logger.error(e)
+        my_logger.error(
+            "database: add_players: "
+            f"Exception was raised when trying to store {len(players)} player(s)."
+        )
+    finally:
+        close_db_connection(conn, cur)
 
-        try:
-            table_name = table[0]
-            columns = table[1:]
+    return res
 
-            columns = list(set(columns) - set(base_column))
 
-            sql_statement = f"""CREATE TABLE IF NOT EXISTS {table_name}
-            (id VARCHAR(8) NOT NULL,
-            season VARCHAR(20) NOT NULL,
-            country VARCHAR(30),
-            comp_level VARCHAR(30),
-            lg_finish VARCHAR(10),
-            squad VARCHAR(50) NOT NULL, """
+def _upsert_stats(cur, stats: List[StatsRow]) -> None:
+    """
+    Insert or update stats rows with one parameterized multi-row statement per table.
 
-            for column in columns:
-                sql_statement += f"{column} FLOAT, "
+    Arguments:
+        cur   -- database cursor of an open connection (the caller commits).
+        stats -- list of StatsRow, each representing a row of a stats table.
+    """
+    # Group the rows by the table they belong to
+    tables = {}
+    for row in stats:
+        tables.setdefault(row.table, []).append(row)
 
-            sql_statement += (
-                "PRIMARY KEY(id, season, squad), FOREIGN KEY(id) REFERENCES info(id) "
-                "ON DELETE CASCADE ON UPDATE CASCADE);"
-            )
+    for table, rows in tables.items():
+        columns = union_metrics(rows)
 
-            cur.execute(sql_statement)
-        except Exception as e:
-            res = False
+        all_columns = STATS_BASE_COLUMNS + columns
+        placeholders = ", ".join(["%s"] * len(all_columns))
+        updates = ", ".join(f"{column} = VALUES({column})" for column in all_columns[3:])
+        sql = (
+            f"INSERT INTO {table} ( {', '.join(all_columns)} ) VALUES ( {placeholders} ) "
+            f"ON DUPLICATE KEY UPDATE {updates};"
+        )
 
-            my_logger.error(e)
-            my_logger.error(
-                f"database: create_stats_table: "
-                f"Exception was raised when trying to create table {table[0]}."
-            )
-        finally:
-            close_db_connection(conn, cur)
+        cur.executemany(sql, [_stats_row_values(row, columns) for row in rows])
 
-        return res
 
+def _stats_row_values(row: StatsRow, columns: List[str]) -> List:
+    """Parameters of the upsert statement of a stats row, its metrics in the given column order."""
+    values = [row.id, row.season, row.team, row.country, row.comp_level, row.lg_finish]
 
-def drop_stats_table(table: str) -> bool:
-    conn, cur = connect_to_db(db=DB)
+    # The metrics are already parsed, they only need reordering when the row has another schema
+    if row.schema.metrics == tuple(columns):
+        values.extend(row.values)
+    else:
+        values.extend(row.get(column) for column in columns)
+
+    return values
+
+
+def load_staging_table(table: str, files: List[str], columns: List[List[str]]) -> bool:
+    """
+    Bulk load delimited files into an empty staging copy of a table (<table>_staging).
+
+    Arguments:
+        table   -- name of the table
+        files   -- paths of the files, in the format written by bulk_load.StagingWriter
+        columns -- columns of each file, in file order
+    """
+    conn, cur = connect_to_db(db=DB, local_infile=True)
     res = False
 
     try:
-        cur.execute(f"DROP TABLE IF EXISTS {table} ")
+        cur.execute(f"DROP TABLE IF EXISTS {table}_staging;")
+        cur.execute(f"CREATE TABLE {table}_staging LIKE {table};")
+
+        for path, file_columns in zip(files, columns):
+            # REPLACE: a player scraped twice (e.g. across a resumed crawl) keeps his last rows
+            cur.execute(
+                f"LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE {table}_staging "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                "LINES TERMINATED BY '\\n' IGNORE 1 LINES "
+                f"( {', '.join(file_columns)} );",
+                (os.path.abspath(path),),
+            )
+
+        conn.commit()
         res = True
     except Exception as e:
         my_logger.error(e)
         my_logger.error(
-            f"database: create_stats_table: "
-            f"Exception was raised when trying to drop table {table}."
+            "database: load_staging_table: "
+            f"Exception was raised when trying to bulk load table {table}."
         )
     finally:
         close_db_connection(conn, cur)
@@ -294,25 +777,39 @@ def drop_stats_table(table: str) -> bool:
     return res
 
 
-def drop_stats_tables(tables: List[List[str]]) -> None:
-    # Drop tables
-    for table in tables:
-        drop_stats_table(table[0])
-
+def swap_staging_tables(tables: List[str]) -> bool:
+    """
+    Atomically replace the info table and the given stats tables with their loaded staging copies,
+    then drop the old tables. The foreign keys are added to the staging tables before the swap:
+    staging rows without an info row fail the swap and leave the old tables in place.
 
-def select_stats(player_id: str, table: str):
+    Arguments:
+        tables -- names of the stats tables
+    """
     conn, cur = connect_to_db(db=DB)
-    res = None
+    res = False
 
     try:
-        cur.execute("SELECT * FROM ( %s ) WHERE id = '( %s )';" % (table, player_id))
+        # CREATE TABLE ... LIKE doesn't copy foreign keys. They follow info_staging when it is renamed to info
+        for table in tables:
+            cur.execute(
+                f"ALTER TABLE {table}_staging ADD FOREIGN KEY(id) REFERENCES info_staging(id) "
+                "ON DELETE CASCADE ON UPDATE CASCADE;"
+            )
+
+        renames = [f"{table} TO {table}_old, {table}_staging TO {table}" for table in ["info"] + tables]
+        cur.execute(f"RENAME TABLE {', '.join(renames)};")
+
+        # The old stats tables reference the old info table, drop them first
+        for table in tables + ["info"]:
+            cur.execute(f"DROP TABLE {table}_old;")
 
-        res = cur.fetchall()
+        res = True
     except Exception as e:
         my_logger.error(e)
         my_logger.error(
-            "database: select_stats: "
-            f"Exception was raised when trying to select from {table} where id = {player_id}."
+            "database: swap_staging_tables: "
+            "Exception was raised when trying to swap the staging tables."
         )
     finally:
         close_db_connection(conn, cur)
@@ -320,19 +817,30 @@ def select_stats(player_id: str, table: str):
     return res
 
 
-def select_stats_all(table: str) -> None:
+def create_frontier_table() -> bool:
+    """
+    Create the table of the crawl frontier: the leagues, squads and players
+    of the current crawl with their pending, done or failed status.
+    """
     conn, cur = connect_to_db(db=DB)
-    res = None
+    res = False
 
     try:
-        cur.execute("SELECT * FROM ( %s );" % table)
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS "
+            "crawl_frontier (url VARCHAR(255) NOT NULL, "
+            "kind VARCHAR(8) NOT NULL, "
+            "status VARCHAR(8) NOT NULL, "
+            "updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, "
+            "PRIMARY KEY(url), "
+            "INDEX(status));"
+        )
 
-        res = cur.fetchall()
+        res = True
     except Exception as e:
         my_logger.error(e)
         my_logger.error(
-            "database: select_stats_all: "
-            f"Exception was raised when trying to select all from {table}."
+            "database: create_frontier_table: Exception was raised when trying to create a table."
         )
     finally:
         close_db_connection(conn, cur)
@@ -340,78 +848,334 @@ def select_stats_all(table: str) -> None:
     return res
 
 
-def add_stats(stats: List[Dict]) -> bool:
+def reset_frontier(leagues: List[str]) -> bool:
     """
-    Insert player performance data into the appropriate table.
+    Start a new crawl: empty the frontier and add the leagues as pending.
 
     Arguments:
-        stats -- list of dictionaries
-              -- each dictionary represents a row of a table
-              -- (for example playing time for a player in a single season)
+        leagues -- list of URLs of soccer leagues to crawl
     """
-    res = True
+    conn, cur = connect_to_pool()
+    res = False
 
-    # Iterate over the dictionaries each of which represents one row of a table
-    for row in stats:
-        conn, cur = connect_to_db(db=DB)
+    try:
+        cur.execute("DELETE FROM crawl_frontier;")
+        _add_to_frontier(cur, leagues, "league")
+        conn.commit()
+
+        res = True
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        my_logger.error(e)
+        my_logger.error(
+            "database: reset_frontier: Exception was raised when trying to reset the crawl frontier."
+        )
+    finally:
+        close_db_connection(conn, cur)
+
+    return res
 
-        # Insert the string attributes from a table row
-        try:
-            statement = f"""REPLACE INTO {row['table']} (id, season, squad, country, comp_level, lg_finish) \
-                        VALUES ('{row['id']}', '{row['season']}', "{row['team']}", '{row['country'].split()[1]}', \
-                         '{row['comp_level']}', '{row['lg_finish']}');"""
 
-            cur.execute(statement)
+def expand_frontier(url: str, children: List[str], kind: str) -> bool:
+    """
+    Add the squads of a league, or the players of a squad, to the frontier as pending
+    and mark the league or squad as done, in a single transaction.
+    URLs already in the frontier keep their status.
+
+    Arguments:
+        url      -- URL of the league or squad
+        children -- URLs found on its page
+        kind     -- kind of the children: "squad" or "player"
+    """
+    with _frontier_lock:
+        conn, cur = connect_to_pool()
+        res = False
+
+        try:
+            _add_to_frontier(cur, children, kind)
+            _set_frontier_status(cur, [url], DONE)
             conn.commit()
+
+            res = True
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             my_logger.error(e)
-
             my_logger.error(
-                "database: add_stats: "
-                "Exception was raised when trying to insert string columns."
+                f"database: expand_frontier: Exception was raised when trying to expand {url}."
             )
+        finally:
+            close_db_connection(conn, cur)
+
+    return res
 
-            res = False
+
+def set_frontier_status(urls: List[str], status: str) -> bool:
+    """
+    Set the status of URLs of the frontier.
+
+    Arguments:
+        urls   -- list of URLs
+        status -- PENDING, DONE or FAILED
+    """
+    with _frontier_lock:
+        conn, cur = connect_to_pool()
+        res = False
+
+        try:
+            _set_frontier_status(cur, urls, status)
+            conn.commit()
+
+            res = True
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            my_logger.error(e)
+            my_logger.error(
+                "database: set_frontier_status: Exception was raised when trying to update the crawl frontier."
+            )
         finally:
             close_db_connection(conn, cur)
 
-        # Iterate over the dict keys each of which represents a table's columns
-        for column in row:
+    return res
 
-            # Skip the table name and string columns (already inserted)
-            if column in [
-                "table",
-                "id",
-                "season",
-                "team",
-                "country",
-                "comp_level",
-                "lg_finish",
-            ]:
-                continue
 
-            conn, cur = connect_to_db(db=DB)
+def select_frontier(status: str) -> Dict[str, List[str]]:
+    """
+    Select the URLs of the frontier with the given status.
 
-            # Insert data into appropriate columns
-            try:
-                team = row["team"].replace("'", "\\'")
-                team = team.replace('"', '\\"')
+    Arguments:
+        status -- PENDING, DONE or FAILED
+    Returns:
+        Dictionary mapping "league", "squad" and "player" to lists of URLs.
+    """
+    conn, cur = connect_to_db(db=DB)
+    urls = {"league": [], "squad": [], "player": []}
 
-                statement = f"""UPDATE {row['table']} SET {column} = {float(row[column].replace(',', ''))}
-                            WHERE id = '{row['id']}' AND season = '{row['season']}' AND squad = "{team}";"""
+    try:
+        cur.execute("SELECT url, kind FROM crawl_frontier WHERE status = %s ORDER BY updated;", (status,))
 
-                cur.execute(statement)
-                conn.commit()
-            except Exception as e:
-                my_logger.error(e)
+        for url, kind in cur.fetchall():
+            urls[kind].append(url)
+    except Exception as e:
+        my_logger.error(e)
+        my_logger.error(
+            "database: select_frontier: Exception was raised when trying to read the crawl frontier."
+        )
+    finally:
+        close_db_connection(conn, cur)
+
+    return urls
+
+
+def _add_to_frontier(cur, urls: Iterable[str], kind: str) -> None:
+    """Insert URLs as pending, leaving the ones already in the frontier untouched."""
+    rows = [(url, kind, PENDING) for url in urls]
+
+    if rows:
+        cur.executemany("INSERT IGNORE INTO crawl_frontier (url, kind, status) VALUES (%s, %s, %s);", rows)
+
+
+def _set_frontier_status(cur, urls: Iterable[str], status: str) -> None:
+    rows = [(status, url) for url in urls]
+
+    if rows:
+        cur.executemany("UPDATE crawl_frontier SET status = %s WHERE url = %s;", rows)
+
+
+def load_schemas() -> Dict[str, Tuple[int, List[str]]]:
+    """
+    Read the latest version of the schema of every stats table from the stats_schemas table,
+    which is created on first use.
 
-                my_logger.error(
-                    f"database: add_stats: "
-                    f"Exception was raised when trying to update column {column} for player {row['id']}."
+    Returns:
+        Dictionary mapping table names to (version, header columns) tuples.
+    """
+    conn, cur = connect_to_pool()
+    schemas = {}
+
+    try:
+        cur.execute(SCHEMAS_TABLE)
+        cur.execute("SELECT tbl, version, columns FROM stats_schemas ORDER BY tbl, version;")
+
+        for table, version, columns in cur.fetchall():
+            schemas[table] = (version, json.loads(columns))
+
+        conn.commit()
+    except Exception as e:
+        my_logger.error(e)
+        my_logger.error("database: load_schemas: Exception was raised when trying to read the stats schemas.")
+    finally:
+        close_db_connection(conn, cur)
+
+    return schemas
+
+
+def save_schemas(schemas: Dict[str, Tuple[int, List[str]]]) -> Optional[Dict[str, Tuple[int, List[str]]]]:
+    """
+    Record new versions of the schemas of stats tables. The columns of each schema are merged with
+    the latest recorded version of the table, and a version numbered after it is recorded if some are
+    new, in one transaction: workers that find new columns concurrently never record the same version.
+
+    Arguments:
+        schemas -- dictionary mapping table names to (version, header columns) tuples
+    Returns:
+        Dictionary mapping table names to their latest recorded (version, header columns) tuples,
+        None if the schemas couldn't be recorded.
+    """
+    conn, cur = connect_to_pool()
+    saved = None
+
+    try:
+        cur.execute(SCHEMAS_TABLE)
+        saved = {}
+
+        for table, (_, columns) in schemas.items():
+            # Locks the versions of the table until the commit
+            cur.execute(
+                "SELECT version, columns FROM stats_schemas WHERE tbl = %s "
+                "ORDER BY version DESC LIMIT 1 FOR UPDATE;",
+                (table,),
+            )
+            row = cur.fetchone()
+            version, recorded = (row[0], json.loads(row[1])) if row else (0, [])
+            added = [column for column in dict.fromkeys(columns) if column not in recorded]
+
+            if added:
+                version, recorded = version + 1, recorded + added
+                cur.execute(
+                    "INSERT INTO stats_schemas (tbl, version, columns) VALUES (%s, %s, %s);",
+                    (table, version, json.dumps(recorded)),
                 )
 
-                res = False
-            finally:
-                close_db_connection(conn, cur)
+            saved[table] = (version, recorded)
+
+        conn.commit()
+    except Exception as e:
+        saved = None
+        if conn is not None:
+            conn.rollback()
+        my_logger.error(e)
+        my_logger.error("database: save_schemas: Exception was raised when trying to record the stats schemas.")
+    finally:
+        close_db_connection(conn, cur)
+
+    return saved
+
+
+def add_columns(table: str, columns: List[str]) -> bool:
+    """
+    Add metric columns to a stats table, online. The columns the table already has are skipped,
+    so concurrent workers can add the same columns.
+
+    Arguments:
+        table   -- name of the table
+        columns -- names of the metric columns
+    """
+    conn, cur = connect_to_pool()
+    columns = list(dict.fromkeys(columns))
+    res = False
+
+    try:
+        # Each duplicate column error means another worker added one of the columns, so there are
+        # fewer missing columns at every attempt
+        for _ in range(len(columns) + 1):
+            cur.execute(f"SELECT * FROM {table} LIMIT 0;")
+            cur.fetchall()
+            existing = {column[0] for column in cur.description}
+            missing = [column for column in columns if column not in existing]
+
+            if not missing:
+                res = True
+                break
+
+            additions = ", ".join(f"ADD COLUMN {column} {metric_type(column)}" for column in missing)
+            try:
+                cur.execute(f"ALTER TABLE {table} {additions};")
+                res = True
+                break
+            except mysql.connector.Error as e:
+                # 1060: duplicate column, added by another worker meanwhile. The statement added
+                # none of its columns, the ones still missing are added again
+                if e.errno != 1060:
+                    raise
+        else:
+            my_logger.error(f"database: add_columns: columns {', '.join(missing)} couldn't be added to {table}.")
+    except Exception as e:
+        my_logger.error(e)
+        my_logger.error(f"database: add_columns: Exception was raised when trying to alter table {table}.")
+    finally:
+        close_db_connection(conn, cur)
 
     return res
+
+
+class BatchWriter:
+    """
+    Buffers scraped players and writes them with add_players,
+    committing once every batch_size players.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 1,
+        on_error: Callable[[List[str]], None] = None,
+        on_commit: Callable[[List[str]], None] = None,
+        mark_done: bool = False,
+        write: Callable[[List, List[str]], bool] = None,
+    ):
+        """
+        Arguments:
+            batch_size -- number of players written per transaction
+            on_error   -- called with the keys of the players of a batch that couldn't be written
+            on_commit  -- called with the keys of the players of a batch once it is committed
+            mark_done  -- the keys are frontier URLs, marked as done in the batch's transaction
+            write      -- function storing a batch, add_players or the add_players of a storage backend
+        """
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.on_commit = on_commit
+        self.mark_done = mark_done
+        self.write = write
+        self.players = []
+        self.keys = []
+
+    def add(self, info: Dict, stats: List[StatsRow], key: str = None) -> bool:
+        """
+        Buffer a player, flushing the buffer once it holds batch_size players.
+
+        Arguments:
+            info  -- dictionary of general player information
+            stats -- list of StatsRow, each representing a row of a stats table
+            key   -- identifies the player for on_error (for example the player's URL)
+        """
+        self.players.append((info, stats))
+        self.keys.append(key)
+
+        if len(self.players) >= self.batch_size:
+            return self.flush()
+
+        return True
+
+    def flush(self) -> bool:
+        """Write all the buffered players in a single transaction."""
+        if not self.players:
+            return True
+
+        keys = [key for key in self.keys if key is not None]
+        write = self.write or add_players
+        res = write(self.players, keys if self.mark_done else ())
+
+        if not res:
+            metrics.inc("errors.db")
+
+        if res and self.on_commit is not None:
+            self.on_commit(keys)
+        elif not res and self.on_error is not None:
+            self.on_error(keys)
+
+        self.players = []
+        self.keys = []
+
+        return res
@@ -0,0 +1,73 @@
+# dead_letter.py
+"""Persistent list of the leagues, squads and players that couldn't be scraped."""
+import json
+import os
+import time
+from typing import Dict, List
+
+# File of the dead letters, one JSON object per line
+DEAD_LETTER_FILE = os.getenv("DEAD_LETTER_FILE", "dead_letter.jsonl")
+
+
+def add(url: str, kind: str, error: str, path: str = None) -> None:
+    """
+    Record a URL that permanently failed.
+    The line is appended with a single write so that concurrent workers don't interleave.
+
+    Arguments:
+        url   -- URL path of the page (league, squad or player)
+        kind  -- "league", "squad" or "player"
+        error -- description of the failure
+        path  -- dead letter file (DEAD_LETTER_FILE by default)
+    """
+    entry = {"url": url, "kind": kind, "error": error, "time": time.time()}
+    line = (json.dumps(entry) + "\n").encode("utf-8")
+
+    fd = os.open(path or DEAD_LETTER_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def load(path: str = None) -> List[Dict]:
+    """
+    Read the dead letters, keeping only the latest entry of each URL.
+
+    Arguments:
+        path -- dead letter file (DEAD_LETTER_FILE by default)
+    """
+    entries = {}
+
+    try:
+        with open(path or DEAD_LETTER_FILE, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entries[entry["url"]] = entry
+    except FileNotFoundError:
+        pass
+
+    return list(entries.values())
+
+
+def prune(before: float, path: str = None) -> None:
+    """
+    Drop the dead letters recorded before a given time.
+    Called once the dead letters have been re-processed: only the URLs
+    that failed again are kept.
+
+    Arguments:
+        before -- timestamp, older entries are removed
+        path   -- dead letter file (DEAD_LETTER_FILE by default)
+    """
+    path = path or DEAD_LETTER_FILE
+    entries = [entry for entry in load(path) if entry["time"] >= before]
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp_path, path)
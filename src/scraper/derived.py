@@ -0,0 +1,228 @@
+# derived.py
+"""Post-crawl stage computing derived metrics from the stats tables with vectorized
+pandas group operations, materialized as tables next to the stats tables:
+<table>_per90, <table>_form (rolling 3 seasons), <table>_career and <table>_age_curve."""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.scraper.export import read_table
+from src.scraper.logger import get_logger
+from src.scraper.rows import STRING_COLUMNS
+from src.scraper.storage import Storage, get_storage
+
+my_logger = get_logger(__name__)
+
+# Seasons of the rolling form window
+FORM_SEASONS = 3
+
+# Stats table holding the minutes played of every (id, season, squad) row, joined to the tables without them
+MINUTES_TABLE = "standard"
+
+# Metrics that are not normalized per 90 minutes
+NOT_PER90 = ["age", "minutes", "minutes_90s", "games", "games_starts", "games_subs"]
+
+# Column name fragments of metrics that are already rates or averages, they can't be summed
+RATES = ["per90", "_pct", "_per_", "average", "avg"]
+
+# SQL types of the non-metric columns of the derived tables
+COLUMN_TYPES = {
+    "id": "VARCHAR(8)",
+    "season": "VARCHAR(20)",
+    "squad": "VARCHAR(50)",
+    "age": "INT",
+    "seasons": "INT",
+    "players": "INT",
+    "first_season": "VARCHAR(20)",
+    "last_season": "VARCHAR(20)",
+}
+
+
+def counting_metrics(frame: pd.DataFrame) -> List[str]:
+    """Metric columns of a stats table that can be summed over seasons (goals, minutes, ...)."""
+    return [
+        column
+        for column in frame.columns
+        if column not in STRING_COLUMNS and column != "age" and not any(rate in column for rate in RATES)
+    ]
+
+
+def per90(totals: pd.DataFrame, metrics: List[str], minutes: pd.Series) -> pd.DataFrame:
+    """Metrics per 90 minutes played, NaN where no minutes were played."""
+    return totals[metrics].div(minutes.where(minutes > 0), axis=0) * 90
+
+
+def season_per90(stats: pd.DataFrame) -> pd.DataFrame:
+    """Per 90 metrics of every (id, season, squad) row."""
+    metrics = [column for column in counting_metrics(stats) if column not in NOT_PER90]
+
+    frame = per90(stats, metrics, stats["minutes"]).add_suffix("_per90")
+
+    return pd.concat([stats[["id", "season", "squad"]], frame], axis=1)
+
+
+def season_totals(stats: pd.DataFrame) -> pd.DataFrame:
+    """Counting metrics of each player summed per season (over squads), sorted by player and season."""
+    metrics = counting_metrics(stats)
+
+    return (
+        stats.groupby(["id", "season"], observed=True, sort=True)[metrics]
+        .sum(min_count=1)
+        .fillna(0)
+    )
+
+
+def rolling_form(totals: pd.DataFrame, seasons: int = FORM_SEASONS) -> pd.DataFrame:
+    """
+    Per 90 metrics over each player's last seasons (the season and the previous ones),
+    computed from running sums: window = cumsum - cumsum shifted by the window length.
+    """
+    running = totals.groupby(level="id").cumsum()
+    window = running - running.groupby(level="id").shift(seasons).fillna(0)
+
+    metrics = [column for column in totals.columns if column not in NOT_PER90]
+
+    form = per90(window, metrics, window["minutes"]).add_suffix(f"_per90_{seasons}y")
+    form.insert(0, f"minutes_{seasons}y", window["minutes"])
+
+    return form.reset_index()
+
+
+def career(totals: pd.DataFrame) -> pd.DataFrame:
+    """Career totals and per 90 metrics of every player."""
+    grouped = totals.groupby(level="id")
+    seasons = totals.index.get_level_values("season").to_series(index=totals.index)
+
+    sums = grouped.sum()
+    metrics = [column for column in sums.columns if column not in NOT_PER90]
+
+    frame = pd.concat(
+        [
+            grouped.size().rename("seasons"),
+            seasons.groupby(level="id").min().rename("first_season"),
+            seasons.groupby(level="id").max().rename("last_season"),
+            sums,
+            per90(sums, metrics, sums["minutes"]).add_suffix("_per90"),
+        ],
+        axis=1,
+    )
+
+    return frame.reset_index()
+
+
+def age_curve(stats: pd.DataFrame) -> pd.DataFrame:
+    """Minutes-weighted per 90 metrics of all the players, by age."""
+    stats = stats[stats["age"].notna()]
+    metrics = counting_metrics(stats)
+
+    grouped = stats.assign(age=stats["age"].astype(int)).groupby("age")
+    sums = grouped[metrics].sum()
+
+    frame = pd.concat(
+        [
+            grouped["id"].nunique().rename("players"),
+            sums["minutes"],
+            per90(sums, [m for m in metrics if m not in NOT_PER90], sums["minutes"]).add_suffix("_per90"),
+        ],
+        axis=1,
+    )
+
+    return frame.reset_index()
+
+
+def with_minutes(
+    table: str, stats: pd.DataFrame, players: Optional[List[str]], storage: Storage
+) -> Optional[pd.DataFrame]:
+    """
+    Stats of a table with the minutes played of every row. Only the standard and playing time tables
+    have a minutes column, the other tables (shooting, passing, ...) get the minutes of the MINUTES_TABLE row
+    of the same (id, season, squad).
+
+    Returns:
+        The stats with a minutes column, None if the minutes can't be read.
+    """
+    if "minutes" in stats.columns:
+        return stats
+
+    try:
+        minutes = read_table(MINUTES_TABLE, storage=storage, ids=players)
+    except Exception as e:
+        my_logger.error(f"derived: {table}: the minutes of the {MINUTES_TABLE} table can't be read: {e!r}")
+        return None
+
+    if "minutes" not in minutes.columns:
+        my_logger.error(f"derived: {table}: the {MINUTES_TABLE} table has no minutes.")
+        return None
+
+    key = ["id", "season", "squad"]
+    minutes = minutes[key + ["minutes"]].astype({"id": str, "season": str, "squad": str})
+
+    return stats.astype({"id": str, "squad": str}).merge(minutes, on=key, how="left")
+
+
+def column_types(frame: pd.DataFrame) -> Dict[str, str]:
+    """SQL types of the columns of a derived table."""
+    return {column: COLUMN_TYPES.get(column, "FLOAT") for column in frame.columns}
+
+
+def frame_rows(frame: pd.DataFrame) -> List[tuple]:
+    """Rows of a frame as tuples of Python values, None for missing values."""
+    columns = [
+        [None if isinstance(value, float) and np.isnan(value) else value for value in frame[column].tolist()]
+        for column in frame.columns
+    ]
+
+    return list(zip(*columns))
+
+
+def derive(tables: List[str], players: Optional[List[str]] = None, storage: Storage = None) -> bool:
+    """
+    Compute the derived metrics of the given stats tables and materialize them.
+
+    Arguments:
+        tables  -- names of the stats tables (e.g. "standard")
+        players -- only recompute the rows of these players (e.g. the ones touched by an
+                   incremental crawl), None to rebuild the derived tables from scratch.
+                   The age curves, aggregated over all the players, are only rebuilt from scratch.
+        storage -- storage backend, the one selected by STORAGE_BACKEND by default
+    Returns:
+        True if all the derived tables were written.
+    """
+    storage = storage or get_storage()
+    res = True
+
+    if players is not None and not players:
+        return res
+
+    for table in tables:
+        stats = read_table(table, storage=storage, ids=players)
+
+        if stats.empty:
+            continue
+
+        # Seasons are compared and sorted as strings ("2019-2020" < "2020-2021")
+        stats["season"] = stats["season"].astype(str)
+        stats = with_minutes(table, stats, players, storage)
+
+        if stats is None:
+            res = False
+            continue
+
+        totals = season_totals(stats)
+
+        derived = {
+            f"{table}_per90": (season_per90(stats), ["id", "season", "squad"]),
+            f"{table}_form": (rolling_form(totals), ["id", "season"]),
+            f"{table}_career": (career(totals), ["id"]),
+        }
+
+        if players is None:
+            derived[f"{table}_age_curve"] = (age_curve(stats), ["age"])
+
+        for name, (frame, key) in derived.items():
+            res = storage.write_table(name, column_types(frame), key, frame_rows(frame), players) and res
+
+        my_logger.info(f"Derived metrics of {table}: {', '.join(derived)} ({len(stats)} rows).")
+
+    return res
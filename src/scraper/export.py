@@ -0,0 +1,94 @@
+# export.py
+"""Columnar export of the stored dataset as pandas DataFrames (NumPy arrays, Arrow-backed
+strings when pyarrow is installed), read from the database in bounded chunks."""
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.scraper.rows import STRING_COLUMNS
+from src.scraper.storage import Storage, get_storage
+
+try:
+    import pyarrow
+
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
+
+# Rows fetched from the database at a time
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+
+# Integer columns of the info table
+INFO_INTEGERS = ["height", "weight", "age"]
+
+# Columns with few distinct values, stored as categoricals
+CATEGORIES = ["season", "squad", "country", "comp_level", "lg_finish", "countryob", "club"]
+
+
+def column_array(column: str, values: tuple):
+    """Typed array of the values of a column in a chunk of rows."""
+    if column in INFO_INTEGERS:
+        return pd.array(values, dtype="Int32")
+    if column == "created":
+        return pd.to_datetime(list(values))
+    if column in STRING_COLUMNS or column in CATEGORIES or column in ["name", "dob"]:
+        return pd.array(values, dtype=STRING_DTYPE)
+
+    # Metrics are stored as SMALLINT, INT or DECIMAL columns (see database.metric_type), read as
+    # single precision floats: Decimal values are converted and None becomes NaN
+    return np.array(values, dtype=np.float32)
+
+
+def read_table(
+    table: str, chunk_size: int = EXPORT_CHUNK_SIZE, storage: Storage = None, ids: List[str] = None
+) -> pd.DataFrame:
+    """
+    Read a whole table into a DataFrame, one chunk of rows at a time.
+    Each chunk is converted to typed columns right away, so only one chunk of
+    Python tuples is held in memory at any time.
+
+    Arguments:
+        table      -- name of the table (info or a stats table)
+        chunk_size -- number of rows fetched at a time
+        storage    -- storage backend, the one selected by STORAGE_BACKEND by default
+        ids        -- only read the rows of these players
+    Returns:
+        DataFrame with one column per table column, metrics as float32 (NaN for missing values).
+    """
+    storage = storage or get_storage()
+    chunks = []
+
+    for columns, rows in storage.select_chunks(table, chunk_size, ids):
+        chunks.append(
+            pd.DataFrame({column: column_array(column, values) for column, values in zip(columns, zip(*rows))})
+        )
+
+    if not chunks:
+        return pd.DataFrame()
+
+    frame = pd.concat(chunks, ignore_index=True)
+
+    # The categories are built once, over the whole column
+    for column in frame.columns:
+        if column in CATEGORIES:
+            frame[column] = frame[column].astype("category")
+
+    return frame
+
+
+def read_all(
+    tables: List[str], chunk_size: int = EXPORT_CHUNK_SIZE, storage: Storage = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Read the info table and the given stats tables.
+
+    Arguments:
+        tables     -- names of the stats tables (e.g. "standard", "shooting")
+        chunk_size -- number of rows fetched at a time
+        storage    -- storage backend, the one selected by STORAGE_BACKEND by default
+    Returns:
+        Dictionary mapping each table name to its DataFrame.
+    """
+    return {table: read_table(table, chunk_size, storage) for table in ["info"] + list(tables)}
@@ -0,0 +1,131 @@
+# fingerprint.py
+"""Local index of content hashes of the stored players, used by the incremental crawl
+to only write the rows that changed since the last run."""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from src.scraper.rows import StatsRow
+
+# SQLite file of the index, delete it whenever the database is rebuilt
+FINGERPRINT_INDEX = os.getenv("FINGERPRINT_INDEX", "fingerprints.sqlite")
+
+
+class Delta(NamedTuple):
+    """What has to be written for a player, and the fingerprints to record once it is."""
+
+    id: str
+    info: Optional[Dict]
+    stats: List[StatsRow]
+    digest: str
+    info_digest: str
+    row_digests: Dict
+    last_season: Optional[str]
+
+    def unchanged(self) -> bool:
+        return self.info is None and not self.stats
+
+
+def digest(value) -> str:
+    """Content hash of a JSON serializable value."""
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def row_key(row: StatsRow) -> tuple:
+    """Primary key of a stats row: (table, season, squad)."""
+    return row.table, row.season, row.team or ""
+
+
+class FingerprintIndex:
+    """
+    SQLite index holding, for every stored player, a hash of the whole player,
+    a hash of its info, a hash of each stats row and the last season it was seen in.
+    """
+
+    def __init__(self, path: str = FINGERPRINT_INDEX):
+        self.conn = sqlite3.connect(path, timeout=30)
+
+        # Several crawler processes share the file
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS players ("
+            "id TEXT PRIMARY KEY, digest TEXT, info_digest TEXT, last_season TEXT, updated REAL);"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "id TEXT, tbl TEXT, season TEXT, squad TEXT, digest TEXT, "
+            "PRIMARY KEY (id, tbl, season, squad));"
+        )
+        self.conn.commit()
+
+    def delta(self, info: Dict, stats: List[StatsRow]) -> Delta:
+        """
+        Compare a freshly scraped player with the index.
+
+        Arguments:
+            info  -- dictionary of general player information
+            stats -- list of StatsRow, each representing a row of a stats table
+        Returns:
+            A Delta holding the info (None if unchanged) and the stats rows that changed.
+        """
+        player_id = info["id"]
+
+        info_digest = digest(info)
+        row_digests = {row_key(row): digest(row.as_dict()) for row in stats}
+        player_digest = digest([info_digest, sorted(row_digests.values())])
+        last_season = max((row.season for row in stats), default=None)
+
+        stored = self.conn.execute(
+            "SELECT digest, info_digest FROM players WHERE id = ?;", (player_id,)
+        ).fetchone()
+
+        if stored is not None and stored[0] == player_digest:
+            return Delta(player_id, None, [], player_digest, info_digest, {}, last_season)
+
+        stored_rows = {
+            (tbl, season, squad): row_digest
+            for tbl, season, squad, row_digest in self.conn.execute(
+                "SELECT tbl, season, squad, digest FROM rows WHERE id = ?;", (player_id,)
+            )
+        }
+
+        changed = [row for row in stats if stored_rows.get(row_key(row)) != row_digests[row_key(row)]]
+        changed_info = None if stored is not None and stored[1] == info_digest else info
+
+        return Delta(
+            player_id,
+            changed_info,
+            changed,
+            player_digest,
+            info_digest,
+            {row_key(row): row_digests[row_key(row)] for row in changed},
+            last_season,
+        )
+
+    def record(self, delta: Delta) -> None:
+        """Record the fingerprints of a player once its delta is stored in the database."""
+        self.conn.executemany(
+            "REPLACE INTO rows (id, tbl, season, squad, digest) VALUES (?, ?, ?, ?, ?);",
+            [(delta.id, *key, row_digest) for key, row_digest in delta.row_digests.items()],
+        )
+        self.conn.execute(
+            "REPLACE INTO players (id, digest, info_digest, last_season, updated) VALUES (?, ?, ?, ?, ?);",
+            (delta.id, delta.digest, delta.info_digest, delta.last_season, time.time()),
+        )
+        self.conn.commit()
+
+    def last_season(self, player_id: str) -> Optional[str]:
+        """Last season a player was seen in, None if the player isn't indexed."""
+        row = self.conn.execute("SELECT last_season FROM players WHERE id = ?;", (player_id,)).fetchone()
+
+        return row[0] if row else None
+
+    def touched(self, since: float) -> List[str]:
+        """Ids of the players whose fingerprints were recorded since the given time."""
+        return [row[0] for row in self.conn.execute("SELECT id FROM players WHERE updated >= ?;", (since,))]
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,251 @@
+# http_client.py
+"""Keep-alive HTTP client with transparent decompression, used by the synchronous crawler."""
+import http.client
+import os
+import socket
+import threading
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional
+from urllib.error import URLError
+from urllib.parse import urljoin, urlsplit
+
+import src.scraper.metrics as metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content encodings the client is able to decode
+ENCODINGS = ["gzip", "deflate"] + (["br"] if brotli is not None else [])
+
+# Headers sent with every request, the User-Agent can be overridden with HTTP_USER_AGENT
+DEFAULT_HEADERS = {
+    "User-Agent": os.getenv(
+        "HTTP_USER_AGENT",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome",
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+}
+
+TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+MAX_REDIRECTS = 5
+
+# Client of the current thread, created lazily (connections can't be shared across threads or a fork)
+_local = threading.local()
+
+# All the clients created by the current process, for the transfer statistics
+_clients = []
+_clients_pid = None
+_clients_lock = threading.Lock()
+
+
+class Response(NamedTuple):
+    url: str
+    status: int
+    headers: http.client.HTTPMessage
+    body: bytes
+
+
+class HttpClient:
+    """
+    HTTP/1.1 client keeping one persistent connection per host.
+    Responses are requested compressed and decoded transparently.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = TIMEOUT):
+        self.headers = dict(DEFAULT_HEADERS)
+        self.headers["Accept-Encoding"] = ", ".join(ENCODINGS)
+        self.headers.update(headers or {})
+        self.timeout = timeout
+
+        # (scheme, host) -> open connection
+        self.connections = {}
+
+        # Transfer statistics
+        self.requests = 0
+        self.bytes_wire = 0
+        self.bytes_decoded = 0
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """
+        Send a GET request, following redirects.
+        Responses are returned whatever their status, connection errors raise URLError.
+
+        Arguments:
+            url     -- absolute URL
+            headers -- extra headers for this request only
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self.request(url, headers)
+
+            if response.status not in (301, 302, 303, 307, 308):
+                return response
+
+            url = urljoin(url, response.headers["Location"])
+
+        raise URLError(f"too many redirects for {url}")
+
+    def request(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """Send a single GET request over the host's persistent connection."""
+        parts = urlsplit(url)
+
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise ValueError(f"unsupported URL {url}")
+
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        request_headers = dict(self.headers, **(headers or {}))
+        key = (parts.scheme, parts.netloc)
+
+        while True:
+            reused = key in self.connections
+            conn = self.connection(key)
+
+            try:
+                if conn.sock is None:
+                    # DNS resolution, TCP connection and TLS handshake (see create_connection)
+                    with metrics.timer("http.connect"):
+                        conn.connect()
+
+                sent = time.perf_counter()
+                conn.request("GET", path, headers=request_headers)
+                response = conn.getresponse()
+                received = time.perf_counter()
+                raw = response.read()
+
+                metrics.observe("http.ttfb", received - sent)
+                metrics.observe("http.body", time.perf_counter() - received)
+                break
+            except (http.client.HTTPException, OSError) as e:
+                self.close_connection(key)
+
+                # The server may have closed a kept-alive connection, try once on a new one
+                if reused:
+                    continue
+
+                raise URLError(e)
+
+        if response.will_close:
+            self.close_connection(key)
+
+        body = decode(raw, response.getheader("Content-Encoding"))
+
+        metrics.inc("requests")
+
+        self.requests += 1
+        self.bytes_wire += len(raw)
+        self.bytes_decoded += len(body)
+
+        return Response(url, response.status, response.headers, body)
+
+    def connection(self, key) -> http.client.HTTPConnection:
+        """Return the open connection to a host, opening it if needed."""
+        if key not in self.connections:
+            scheme, host = key
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(host, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(host, timeout=self.timeout)
+
+            conn._create_connection = create_connection
+            self.connections[key] = conn
+
+        return self.connections[key]
+
+    def close_connection(self, key) -> None:
+        conn = self.connections.pop(key, None)
+
+        if conn is not None:
+            conn.close()
+
+    def close(self) -> None:
+        for key in list(self.connections):
+            self.close_connection(key)
+
+    def summary(self) -> str:
+        """Human readable summary of the transferred bytes."""
+        ratio = self.bytes_decoded / self.bytes_wire if self.bytes_wire else 0
+
+        return (
+            f"{self.requests} requests, {self.bytes_wire / 1e6:.2f} MB on the wire, "
+            f"{self.bytes_decoded / 1e6:.2f} MB decoded (x{ratio:.1f} compression)"
+        )
+
+
+def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None) -> socket.socket:
+    """socket.create_connection, recording the DNS resolution as its own stage."""
+    host, port = address
+
+    with metrics.timer("http.dns"):
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+
+    error = OSError(f"getaddrinfo returned no address for {host}")
+    for *_, sockaddr in addresses:
+        try:
+            return socket.create_connection(sockaddr[:2], timeout, source_address)
+        except OSError as e:
+            error = e
+
+    raise error
+
+
+def decode(body: bytes, encoding: Optional[str]) -> bytes:
+    """
+    Decode a response body according to its Content-Encoding header.
+
+    Arguments:
+        body     -- raw response body
+        encoding -- value of the Content-Encoding header (can be None)
+    """
+    encoding = (encoding or "identity").strip().lower()
+
+    try:
+        if encoding in ("identity", ""):
+            return body
+        if encoding in ("gzip", "x-gzip"):
+            return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        if encoding == "deflate":
+            try:
+                return zlib.decompress(body)
+            except zlib.error:
+                # Some servers send raw deflate streams without the zlib header
+                return zlib.decompress(body, -zlib.MAX_WBITS)
+        if encoding == "br" and brotli is not None:
+            return brotli.decompress(body)
+    except Exception as e:
+        raise ValueError(f"could not decode {encoding} response body: {e}")
+
+    raise ValueError(f"unsupported content encoding {encoding}")
+
+
+def get_client() -> HttpClient:
+    """Return the HTTP client of the current thread."""
+    global _clients, _clients_pid
+
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.client = HttpClient()
+        _local.pid = os.getpid()
+
+        with _clients_lock:
+            if _clients_pid != os.getpid():
+                _clients = []
+                _clients_pid = os.getpid()
+            _clients.append(_local.client)
+
+    return _local.client
+
+
+def transfer_summary() -> str:
+    """Human readable summary of the bytes transferred by all the clients of the current process."""
+    total = HttpClient()
+
+    with _clients_lock:
+        clients = list(_clients) if _clients_pid == os.getpid() else []
+
+    for client in clients:
+        total.requests += client.requests
+        total.bytes_wire += client.bytes_wire
+        total.bytes_decoded += client.bytes_decoded
+
+    return total.summary()
@@ -0,0 +1,372 @@
+# metrics.py
+"""Timers and counters of the crawl's hot path (fetch, parse, extract, database writes).
+Every process records into its own registry and publishes snapshots to METRICS_DIR;
+the crawler merges them into a periodic summary line and a Prometheus text exposition."""
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from src.scraper.logger import get_logger
+
+my_logger = get_logger(__name__)
+
+# Directory of the snapshots published by the worker processes, one file per process
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "fbref-scraper.metrics"))
+
+# Seconds between two summary lines (and rewrites of METRICS_FILE)
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "30"))
+
+# Prometheus text file rewritten every METRICS_INTERVAL seconds, disabled when unset
+METRICS_FILE = os.getenv("METRICS_FILE")
+
+# Port of the Prometheus endpoint, 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Minimum number of seconds between two snapshots published by a worker
+PUBLISH_INTERVAL = 1.0
+
+# Upper bounds in seconds of the histogram buckets: 0.5ms doubling up to about 2 minutes
+BUCKETS = [0.0005 * 2**i for i in range(19)]
+
+# Quantiles reported for every stage
+QUANTILES = [0.5, 0.95, 0.99]
+
+# Registry of the current process (see get_registry)
+_registry = None
+_registry_pid = None
+
+
+class Histogram:
+    """Durations of a stage counted in log-scale buckets, cheap to record and to merge."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Estimate of a quantile, interpolated linearly inside its bucket."""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {"counts": self.counts, "count": self.count, "sum": self.sum, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Histogram":
+        histogram = cls()
+        histogram.counts = list(data["counts"])
+        histogram.count = data["count"]
+        histogram.sum = data["sum"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class Registry:
+    """Histograms of the stage durations and counters of a process, safe to use from several threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.published = 0.0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            self.histograms[stage].observe(seconds)
+
+    def inc(self, counter: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def merge(self, other: "Registry") -> None:
+        with self.lock:
+            self.started = min(self.started, other.started)
+
+            for stage, histogram in other.histograms.items():
+                self.histograms.setdefault(stage, Histogram()).merge(histogram)
+
+            for counter, value in other.counters.items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            return {
+                "started": self.started,
+                "histograms": {stage: h.to_dict() for stage, h in self.histograms.items()},
+                "counters": dict(self.counters),
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Registry":
+        registry = cls()
+        registry.started = data["started"]
+        registry.histograms = {stage: Histogram.from_dict(h) for stage, h in data["histograms"].items()}
+        registry.counters = dict(data["counters"])
+        return registry
+
+    def requests_per_second(self) -> float:
+        elapsed = time.time() - self.started
+        return self.counters.get("requests", 0) / elapsed if elapsed > 0 else 0.0
+
+    def errors(self) -> Dict[str, float]:
+        """Error counters by kind ("errors.fetch" -> "fetch")."""
+        return {name[7:]: value for name, value in sorted(self.counters.items()) if name.startswith("errors.")}
+
+    def summary(self) -> str:
+        """One line summary: counters, request rate and the quantiles of every stage."""
+        errors = ", ".join(f"{kind} {value:g}" for kind, value in self.errors().items()) or "none"
+        parts = [
+            f"{self.counters.get('players', 0):g} players, {self.counters.get('requests', 0):g} requests"
+            f" ({self.requests_per_second():.2f}/s), {self.counters.get('throttled', 0):g} throttled,"
+            f" errors: {errors}"
+        ]
+
+        for stage, histogram in sorted(self.histograms.items()):
+            quantiles = " ".join(
+                f"p{round(q * 100)}={histogram.quantile(q) * 1000:.0f}ms" for q in QUANTILES
+            )
+            parts.append(f"{stage} n={histogram.count} {quantiles}")
+
+        return " | ".join(parts)
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition of the registry."""
+        lines = ["# TYPE fbref_stage_seconds summary"]
+
+        for stage, histogram in sorted(self.histograms.items()):
+            for q in QUANTILES:
+                lines.append(f'fbref_stage_seconds{{stage="{stage}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+            lines.append(f'fbref_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'fbref_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        lines.append("# TYPE fbref_requests_per_second gauge")
+        lines.append(f"fbref_requests_per_second {self.requests_per_second():.6f}")
+
+        lines.append("# TYPE fbref_errors_total counter")
+        for kind, value in self.errors().items():
+            lines.append(f'fbref_errors_total{{kind="{kind}"}} {value:g}')
+
+        for counter, value in sorted(self.counters.items()):
+            if not counter.startswith("errors."):
+                lines.append(f"# TYPE fbref_{counter}_total counter")
+                lines.append(f"fbref_{counter}_total {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+def get_registry() -> Registry:
+    """Return the registry of the current process."""
+    global _registry, _registry_pid
+
+    if _registry_pid != os.getpid():
+        _registry = Registry()
+        _registry_pid = os.getpid()
+
+    return _registry
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record the duration of a stage."""
+    get_registry().observe(stage, seconds)
+
+
+def inc(counter: str, value: float = 1) -> None:
+    """Increment a counter, "errors.<kind>" counters are reported as errors."""
+    get_registry().inc(counter, value)
+
+
+@contextmanager
+def timer(stage: str):
+    """Record the duration of the with block, whether it raises or not."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def timed(stage: str):
+    """Decorator recording the duration of every call of a function."""
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def reset(path: str = None) -> None:
+    """Start a new crawl: drop the snapshots of the previous one and the registry of the current process."""
+    global _registry_pid
+
+    for snapshot in glob.glob(os.path.join(path or METRICS_DIR, "*.json")):
+        try:
+            os.remove(snapshot)
+        except FileNotFoundError:
+            pass
+
+    _registry_pid = None
+
+
+def publish(force: bool = False, path: str = None) -> None:
+    """
+    Write the registry of the current process to its snapshot file.
+    Unless forced, nothing is written if the last snapshot is less than PUBLISH_INTERVAL seconds old.
+
+    Arguments:
+        force -- publish whatever the age of the last snapshot
+        path  -- snapshot directory (METRICS_DIR by default)
+    """
+    registry = get_registry()
+    now = time.time()
+
+    if not force and now - registry.published < PUBLISH_INTERVAL:
+        return
+
+    registry.published = now
+    path = path or METRICS_DIR
+    os.makedirs(path, exist_ok=True)
+
+    snapshot = os.path.join(path, f"{os.getpid()}.json")
+    with open(f"{snapshot}.tmp", "w", encoding="utf-8") as f:
+        json.dump(registry.to_dict(), f)
+    os.replace(f"{snapshot}.tmp", snapshot)
+
+
+def collect(path: str = None) -> Registry:
+    """Merge the registry of the current process with the snapshots published by the other processes."""
+    # Copy of the current process' registry, its threads keep recording meanwhile
+    total = Registry.from_dict(get_registry().to_dict())
+
+    for snapshot in glob.glob(os.path.join(path or METRICS_DIR, "*.json")):
+        if os.path.basename(snapshot) == f"{os.getpid()}.json":
+            continue
+
+        try:
+            with open(snapshot, encoding="utf-8") as f:
+                total.merge(Registry.from_dict(json.load(f)))
+        except (OSError, ValueError, KeyError):
+            # A snapshot being replaced, picked up by the next collection
+            continue
+
+    return total
+
+
+class Reporter:
+    """
+    Background thread of the crawler process logging a summary line of the collected metrics
+    every METRICS_INTERVAL seconds, rewriting METRICS_FILE and serving them on METRICS_PORT.
+    """
+
+    def __init__(
+        self,
+        interval: float = METRICS_INTERVAL,
+        file: Optional[str] = METRICS_FILE,
+        port: int = METRICS_PORT,
+        path: str = None,
+    ):
+        self.interval = interval
+        self.file = file
+        self.port = port
+        self.path = path
+        self.stopped = threading.Event()
+        self.thread = None
+        self.server = None
+
+    def start(self) -> "Reporter":
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+        if self.port:
+            self.server = ThreadingHTTPServer(("", self.port), self.handler())
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            my_logger.info(f"Metrics served on http://localhost:{self.server.server_port}/metrics.")
+
+        return self
+
+    def stop(self) -> None:
+        """Stop the thread and the endpoint, reporting the final metrics."""
+        self.stopped.set()
+
+        if self.thread is not None:
+            self.thread.join()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+        self.report()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def report(self) -> None:
+        registry = collect(self.path)
+        my_logger.info(f"Metrics: {registry.summary()}")
+
+        if self.file:
+            with open(f"{self.file}.tmp", "w", encoding="utf-8") as f:
+                f.write(registry.prometheus())
+            os.replace(f"{self.file}.tmp", self.file)
+
+    def handler(self):
+        path = self.path
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = collect(path).prometheus().encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,89 @@
+# parsing.py
+"""HTML parser backend selection and restricted parsing of fbref pages."""
+import os
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, Comment, SoupStrainer
+from bs4.element import Tag
+
+try:
+    import lxml
+
+    DEFAULT_PARSER = "lxml"
+except ImportError:
+    DEFAULT_PARSER = "html.parser"
+
+# Tree builder used by BeautifulSoup: "lxml" when it is installed, the pure-Python "html.parser" otherwise
+PARSER = os.getenv("HTML_PARSER", DEFAULT_PARSER)
+
+# League and squad pages only need the table holding the squad/player links
+LINKS_STRAINER = SoupStrainer("table")
+
+
+def make_soup(markup, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """
+    Parse a page with the configured parser backend.
+
+    Arguments:
+        markup     -- HTML as a string or bytes
+        parse_only -- optional SoupStrainer, only the matching elements are put in the tree
+    """
+    return BeautifulSoup(markup, PARSER, parse_only=parse_only)
+
+
+def player_strainer(tables: List[str]) -> SoupStrainer:
+    """
+    SoupStrainer keeping only what is extracted from a player page:
+    the requested stats tables, the application/ld+json script and the wrappers
+    of the tables fbref ships inside HTML comments (see find_table).
+
+    Arguments:
+        tables -- list of strings each of which is the id of a table to keep
+    """
+    ids = set(tables)
+
+    def keep(name, attrs) -> bool:
+        if name == "table":
+            return attrs.get("id") in ids
+        if name == "script":
+            return attrs.get("type") == "application/ld+json"
+        if name == "div":
+            classes = attrs.get("class") or ""
+            if isinstance(classes, str):
+                classes = classes.split()
+            return "commented" in classes
+        return False
+
+    return SoupStrainer(keep)
+
+
+def find_table(soup: BeautifulSoup, table_id: str) -> Optional[Tag]:
+    """
+    Find a table by id, including the tables fbref ships inside HTML comments
+    (they are only rendered client-side).
+    A commented table is parsed on its own, the first time it is requested, and
+    inserted in the tree next to its comment so that later lookups find it directly.
+
+    Arguments:
+        soup     -- BeautifulSoup object of a page
+        table_id -- id of the table
+    Returns:
+        The table tag, or None if the page doesn't have the table.
+    """
+    table = soup.find("table", id=table_id)
+
+    if table is not None:
+        return table
+
+    marker = f'id="{table_id}"'
+    comment = soup.find(string=lambda text: isinstance(text, Comment) and marker in text)
+
+    if comment is None:
+        return None
+
+    table = make_soup(str(comment), SoupStrainer("table", id=table_id)).find("table", id=table_id)
+
+    if table is not None:
+        comment.insert_before(table.extract())
+
+    return table
@@ -0,0 +1,118 @@
+# pipeline.py
+"""Pipelined discovery of the players to scrape. Leagues, squads and players are
+connected by bounded queues, and the league and squad pages are fetched by threads."""
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List
+
+import src.scraper.dead_letter as dead_letter
+from src.scraper.logger import get_logger
+from src.scraper.requests import get_players, get_squads
+
+my_logger = get_logger(__name__)
+
+# Number of threads fetching league and squad pages
+DISCOVERY_THREADS = int(os.getenv("DISCOVERY_THREADS", "4"))
+
+# Capacity of the queues between the stages
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+def player_id(player: str) -> str:
+    """Unique id of a player URL path (/en/players/<id>/<name>)."""
+    return player[12:20]
+
+
+def discover_players(
+    leagues: Iterable[str],
+    squads: Iterable[str] = (),
+    threads: int = DISCOVERY_THREADS,
+    maxsize: int = QUEUE_SIZE,
+    squads_of: Callable[[str], List[str]] = get_squads,
+    players_of: Callable[[str], List[str]] = get_players,
+) -> Iterator[str]:
+    """
+    Yield the players of all teams in the given leagues and of the given teams,
+    as soon as each team page has been fetched.
+    Every player is yielded once, even if he appears in several teams (loans, transfers).
+    The bounded queues apply backpressure: discovery pauses while the consumer is busy.
+
+    Arguments:
+        leagues    -- list of URLs of soccer leagues
+        squads     -- list of URLs of teams
+        threads    -- number of threads fetching league pages and squad pages
+        maxsize    -- capacity of the squad and player queues
+        squads_of  -- function returning the team URLs of a league
+        players_of -- function returning the player URLs of a team
+    """
+    squad_queue = queue.Queue(maxsize)
+    player_queue = queue.Queue(maxsize)
+
+    seen_squads = set()
+    seen_squads_lock = threading.Lock()
+
+    def put_squad(squad: str) -> None:
+        with seen_squads_lock:
+            if squad in seen_squads:
+                return
+            seen_squads.add(squad)
+
+        squad_queue.put(squad)
+
+    def league_stage() -> None:
+        def crawl_league(league: str) -> None:
+            try:
+                # None: the page couldn't be downloaded, already dead lettered
+                for squad in squads_of(league) or []:
+                    put_squad(squad)
+            except Exception as e:
+                my_logger.error(f"pipeline: league_stage: {league}: {e!r}")
+                dead_letter.add(league, "league", repr(e))
+
+        try:
+            for squad in squads:
+                put_squad(squad)
+
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(crawl_league, leagues))
+        finally:
+            for _ in range(threads):
+                squad_queue.put(_DONE)
+
+    def squad_stage() -> None:
+        try:
+            while (squad := squad_queue.get()) is not _DONE:
+                try:
+                    for player in players_of(squad) or []:
+                        player_queue.put(player)
+                except Exception as e:
+                    my_logger.error(f"pipeline: squad_stage: {squad}: {e!r}")
+                    dead_letter.add(squad, "squad", repr(e))
+        finally:
+            player_queue.put(_DONE)
+
+    # Daemon threads, so that a consumer stopping early doesn't keep the process alive
+    threading.Thread(target=league_stage, daemon=True).start()
+    for _ in range(threads):
+        threading.Thread(target=squad_stage, daemon=True).start()
+
+    seen_players = set()
+    done = 0
+
+    while done < threads:
+        player = player_queue.get()
+
+        if player is _DONE:
+            done += 1
+            continue
+
+        if player_id(player) in seen_players:
+            continue
+
+        seen_players.add(player_id(player))
+        yield player
@@ -0,0 +1,34 @@
+# player.py
+"""Function to scrape a whole player page (general info and stats) from a single download."""
+from typing import Dict, List, Optional, Tuple
+
+import src.scraper.metrics as metrics
+from src.scraper.parsing import player_strainer
+from src.scraper.requests import get_soup
+from src.scraper.player_info import scrape_info
+from src.scraper.player_stats import scrape_stats
+from src.scraper.rows import StatsRow
+
+
+def scrape_player(player: str, tables: List[str]) -> Optional[Tuple[Dict, List[StatsRow]]]:
+    """
+    Fetch and parse a player page once, then extract both the general
+    information and the stats tables from the same document.
+    Only the requested tables and the ld+json header are parsed.
+
+    Arguments:
+        player -- unique player URL path.
+        tables -- list of strings each of which is the name of a table to scrape.
+    Returns:
+        info   -- dictionary of general player information (see scrape_info).
+        stats  -- list of StatsRow, one per stats table row (see scrape_stats).
+        None is returned instead if the page couldn't be downloaded.
+    """
+    url = f"https://fbref.com{player}"
+    soup = get_soup(url, player_strainer(tables))
+
+    if soup is None:
+        return None
+
+    with metrics.timer("extract"):
+        return scrape_info(player, soup), scrape_stats(player, soup, tables)
@@ -3,7 +3,6 @@
 
 
 from datetime import date
-from requests import get_soup
 import json
 
 from src.scraper.logger import get_logger
@@ -11,20 +10,18 @@ from src.scraper.logger import get_logger
 my_logger = get_logger(__name__)
 
 
-def scrape_info(player):
+def scrape_info(player, soup):
     """
     Scrape general information about a player.
 
     Arguments:
         player  -- string part of the URL path that identifies a player.
+        soup    -- BeautifulSoup object of the already downloaded player page.
     Returns:
         info    -- a dictionary of player information
                 -- each key is a column (name, position, etc.)
                 -- each value is a data point
     """
-    url = f"https://fbref.com{player}"
-    soup = get_soup(url)
-
     try:
         header = json.loads(soup.find("script", type="application/ld+json").string)
     except:
@@ -1,7 +1,12 @@
 # player_stats.py
 """Functions that scrape player stats."""
-from typing import List, Dict
-from requests import get_soup
+from typing import List
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+from src.scraper.parsing import find_table, player_strainer
+from src.scraper.requests import get_soup
+from src.scraper.rows import StatsRow, get_schema
 
 from src.scraper.logger import get_logger
 
@@ -9,66 +14,70 @@ my_logger = get_logger(__name__)
 
 
 # Scrape player performance statistics from a single page
-def scrape_stats(player: str, tables: List[str]) -> List[Dict]:
+def scrape_stats(player: str, soup: BeautifulSoup, tables: List[str]) -> List[StatsRow]:
     """
     Scrapes stats tables for a single player.
 
     Arguments:
         player       -- A unique player URL path.
+        soup         -- BeautifulSoup object of the already downloaded player page.
         tables       -- List of strings each of which is the name of a table to scrape.
     Returns:
-        stats_tables -- A list of dictionaries.
-                     -- Each dictionary represents a row of a stats table.
-                     -- Every key is a column name and every value is a data point for that column.
+        stats_tables -- A list of StatsRow, each representing a row of a stats table.
+                     -- Metrics are parsed to floats, empty cells are None.
     """
-    url = f"https://fbref.com{player}"
-    soup = get_soup(url)
-
     stats_tables = []
 
     # Iterate over the table names that should be scraped
     for table in tables:
 
-        # Find the table tag with the given table name
-        stats = soup.find("table", id=table)
+        # Find the table tag with the given table name (it may be inside an HTML comment)
+        stats = find_table(soup, table)
 
         # If the table doesn't exist, move on to the next table
         if stats is None:
             continue
 
+        # The table's schema is derived from its header the first time the table is seen
+        schema = get_schema(table[6:-7], header_columns(stats))
+
         # Rows is a list of all the <tr> tags in the current table
         rows = stats.find_all(name="tr", id="stats")
 
         # Iterate over the <tr> tags and extract the data from them
         # Contains all the table cells for a single player/season/club
         for row in rows:
-
-            # Add the table name and primary key attributes (id, season, squad) to the dictionary
             season = row.find(name="th").get_text()
-            stat_dict = {"table": table[6:-7], "id": player[12:20], "season": season}
 
-            # All html table cells in a single table row
-            cells = row.find_all(name="td")
+            # Text of all html table cells in a single table row, by column name (age, team, etc.)
+            cells = {cell.attrs["data-stat"]: cell.get_text() for cell in row.find_all(name="td")}
+
+            # Append the typed row, keyed by the player id, season and squad
+            stats_tables.append(StatsRow.from_cells(schema, player[12:20], season, cells))
+
+    return stats_tables
+
 
-            # cell is a single html table cell (a <td> tag)
-            for cell in cells:
+def header_columns(table: Tag) -> List[str]:
+    """
+    Column names (data-stat) of a stats table, between the 'Season' and the 'Matches' columns.
 
-                # attr_name is the name of the attribute's cell (season, age, etc.)
-                attr_name = cell.attrs["data-stat"]
+    Arguments:
+        table -- the table tag
+    """
+    columns = []
+    header = table.find("th", string="Season")
 
-                # Skip if attribute is part of the primary key, or we reached the end ('matches' column)
-                if attr_name in ["season", "matches"]:
-                    continue
+    if header is None:
+        return columns
 
-                # Otherwise, add the attribute and its value to the dictionary (if it exists)
-                cell_value = cell.get_text()
-                if cell_value:
-                    stat_dict[attr_name] = cell_value
+    for header in header.find_next_siblings("th"):
+        if header.get_text() == "Matches":
+            break
 
-            # Append the dictionary representing a single row to the list
-            stats_tables.append(stat_dict)
+        columns.append(header.attrs["data-stat"])
 
-    return stats_tables
+    return columns
 
 
 def get_stats_headers(url: str, tables: List[str]) -> List[List[str]]:
@@ -85,7 +94,7 @@ def get_stats_headers(url: str, tables: List[str]) -> List[List[str]]:
                 -- Remaining elements of the list (column[i][1:]) are the column names.
     """
     url = f"https://fbref.com{url}"
-    soup = get_soup(url)
+    soup = get_soup(url, player_strainer(tables))
 
     headers = []
 
@@ -95,14 +104,7 @@ def get_stats_headers(url: str, tables: List[str]) -> List[List[str]]:
             # Create a header list, append the table name to it
             headers.append([])
             headers[-1].append(table[6:-7])
-            header = soup.find("table", {"id": table}).find("th", text="Season")
-
-            # Iterate through the rest of the table header until you reach last column ('Matches')
-            while (header := header.find_next_sibling("th")).get_text() != "Matches":
-                column = header.attrs["data-stat"]
-
-                # Append all the other columns
-                headers[-1].append(column)
+            headers[-1].extend(header_columns(find_table(soup, table)))
 
         except:
             my_logger.error(
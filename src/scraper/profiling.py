@@ -0,0 +1,94 @@
+# profiling.py
+"""Sampled cProfile profiling of the crawler's worker processes.
+Each worker dumps the stats of its sampled calls to PROFILE_DIR, merged into one report at the end of the crawl."""
+import cProfile
+import glob
+import io
+import os
+import pstats
+from typing import Callable, Optional
+
+# Directory of the per-worker profiles and of the merged report
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Number of functions listed in the text report
+REPORT_LINES = 40
+
+
+class SampledProfiler:
+    """
+    Profiles one call out of every, accumulating the samples of the process in a single cProfile.Profile.
+    """
+
+    def __init__(self, every: int, path: str = None):
+        """
+        Arguments:
+            every -- profile one call out of every (1 profiles all the calls)
+            path  -- directory of the profiles (PROFILE_DIR by default)
+        """
+        self.every = max(1, every)
+        self.path = path or PROFILE_DIR
+        self.calls = 0
+        self.samples = 0
+        self.profile = cProfile.Profile()
+
+    def run(self, function: Callable, *args, **kwargs):
+        """Call a function, profiling it if the call is sampled."""
+        self.calls += 1
+
+        # The first call of every worker is sampled, then one call out of every
+        if (self.calls - 1) % self.every:
+            return function(*args, **kwargs)
+
+        self.samples += 1
+        return self.profile.runcall(function, *args, **kwargs)
+
+    def dump(self) -> Optional[str]:
+        """Write the profile of the process to <path>/<pid>.prof, if any call was sampled."""
+        if not self.samples:
+            return None
+
+        os.makedirs(self.path, exist_ok=True)
+        dump_path = os.path.join(self.path, f"{os.getpid()}.prof")
+        self.profile.dump_stats(dump_path)
+
+        return dump_path
+
+
+def reset(path: str = None) -> None:
+    """Remove the per-worker profiles of a previous crawl."""
+    for profile in glob.glob(os.path.join(path or PROFILE_DIR, "*.prof")):
+        os.remove(profile)
+
+
+def merge(path: str = None) -> Optional[str]:
+    """
+    Merge the per-worker profiles into <path>/report.prof and write a text report,
+    sorted by cumulative time, to <path>/report.txt.
+
+    Arguments:
+        path -- directory of the profiles (PROFILE_DIR by default)
+    Returns:
+        The path of the text report, or None if no worker was profiled.
+    """
+    path = path or PROFILE_DIR
+    report = os.path.join(path, "report.prof")
+    profiles = [profile for profile in sorted(glob.glob(os.path.join(path, "*.prof"))) if profile != report]
+
+    if not profiles:
+        return None
+
+    stats = pstats.Stats(*profiles, stream=io.StringIO())
+    stats.dump_stats(report)
+
+    text = io.StringIO()
+    stats.stream = text
+    text.write(f"{len(profiles)} profiled worker(s)\n")
+    stats.sort_stats("cumulative").print_stats(REPORT_LINES)
+    stats.sort_stats("tottime").print_stats(REPORT_LINES)
+
+    text_report = os.path.join(path, "report.txt")
+    with open(text_report, "w", encoding="utf-8") as f:
+        f.write(text.getvalue())
+
+    return text_report
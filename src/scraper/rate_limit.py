@@ -0,0 +1,202 @@
+# rate_limit.py
+"""Token bucket rate limiter shared by all the crawler processes through a lock file."""
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Requests per second allowed at start-up, 0 disables rate limiting
+RATE_LIMIT = float(os.getenv("RATE_LIMIT", "0.5"))
+
+# Bounds of the adaptive rate in requests per second
+RATE_LIMIT_MIN = float(os.getenv("RATE_LIMIT_MIN", "0.05"))
+RATE_LIMIT_MAX = float(os.getenv("RATE_LIMIT_MAX", "2"))
+
+# Rate increase (requests per second) after every successful request
+RATE_LIMIT_STEP = float(os.getenv("RATE_LIMIT_STEP", "0.01"))
+
+# Maximum number of tokens that can be saved up
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "2"))
+
+# File holding the shared state of the token bucket
+RATE_LIMIT_FILE = os.getenv(
+    "RATE_LIMIT_FILE", os.path.join(tempfile.gettempdir(), "fbref-scraper.ratelimit")
+)
+
+# Shared state: tokens, time of the last refill, rate, time until which requests are blocked
+STATE = struct.Struct("dddd")
+
+# Limiter of the current process (see get_limiter)
+_limiter = None
+_limiter_pid = None
+
+
+class RateLimiter:
+    """
+    Token bucket whose state lives in a file locked with flock, so that every process
+    of a crawl draws from the same bucket.
+    The rate adapts itself: it grows slowly after every successful request and is halved,
+    with requests paused for the Retry-After delay, when the server answers 429.
+    """
+
+    def __init__(
+        self,
+        path: str = RATE_LIMIT_FILE,
+        rate: float = RATE_LIMIT,
+        min_rate: float = RATE_LIMIT_MIN,
+        max_rate: float = RATE_LIMIT_MAX,
+        step: float = RATE_LIMIT_STEP,
+        burst: float = RATE_LIMIT_BURST,
+    ):
+        self.path = path
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.burst = burst
+
+        # Fallback for platforms without flock: the bucket is only shared by threads
+        self.thread_lock = threading.Lock()
+        self.local_state = None
+
+    @contextmanager
+    def state(self):
+        """Lock the bucket and yield its state as a list, the list is written back on exit."""
+        if fcntl is None:
+            with self.thread_lock:
+                if self.local_state is None:
+                    self.local_state = [self.burst, time.time(), self.rate, 0.0]
+                yield self.local_state
+            return
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            data = os.pread(fd, STATE.size, 0)
+            if len(data) == STATE.size:
+                state = list(STATE.unpack(data))
+            else:
+                state = [self.burst, time.time(), self.rate, 0.0]
+
+            yield state
+
+            os.pwrite(fd, STATE.pack(*state), 0)
+        finally:
+            os.close(fd)
+
+    def reset(self) -> None:
+        """
+        Re-seed the bucket with the configured rate and a full burst, dropping the rate adapted by a previous crawl.
+        A pause requested by the server (Retry-After) that isn't over yet is kept.
+        """
+        with self.state() as state:
+            now = time.time()
+            state[:] = [self.burst, now, self.rate, state[3] if state[3] > now else 0.0]
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self.state() as state:
+                tokens, updated, rate, blocked_until = state
+                now = time.time()
+
+                tokens = min(self.burst, tokens + (now - updated) * rate)
+
+                if now >= blocked_until and tokens >= 1:
+                    state[:] = [tokens - 1, now, rate, blocked_until]
+                    return
+
+                state[:] = [tokens, now, rate, blocked_until]
+                wait = max(blocked_until - now, (1 - tokens) / rate)
+
+            time.sleep(wait)
+
+    def success(self) -> None:
+        """Additive increase of the rate after a successful request."""
+        with self.state() as state:
+            state[2] = min(self.max_rate, state[2] + self.step)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """
+        Multiplicative decrease of the rate after a 429 response.
+        Requests are paused for retry_after seconds (or one token interval if unknown).
+
+        Arguments:
+            retry_after -- delay in seconds requested by the server's Retry-After header
+        """
+        with self.state() as state:
+            now = time.time()
+
+            # Workers answered 429 during the same pause only count once
+            if now >= state[3]:
+                state[2] = max(self.min_rate, state[2] / 2)
+
+            delay = retry_after if retry_after is not None else 1 / state[2]
+            state[0] = 0.0
+            state[1] = now
+            state[3] = max(state[3], now + delay)
+
+    def current_rate(self) -> float:
+        with self.state() as state:
+            return state[2]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header, given either in seconds or as an HTTP date.
+
+    Returns:
+        The delay in seconds, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_limiter() -> Optional[RateLimiter]:
+    """Return the rate limiter of the current process, or None if rate limiting is disabled."""
+    global _limiter, _limiter_pid
+
+    if _limiter_pid != os.getpid():
+        _limiter = RateLimiter() if RATE_LIMIT > 0 else None
+        _limiter_pid = os.getpid()
+
+    return _limiter
+
+
+def reset_limiter() -> None:
+    """
+    Start a crawl from RATE_LIMIT: the bucket file outlives the crawls, the crawler process
+    re-seeds it before starting the workers.
+    """
+    limiter = get_limiter()
+
+    if limiter is not None:
+        limiter.reset()
+
+
+def set_limiter(limiter: Optional[RateLimiter]) -> None:
+    """Replace the rate limiter of the current process (None disables rate limiting)."""
+    global _limiter, _limiter_pid
+
+    _limiter = limiter
+    _limiter_pid = os.getpid()
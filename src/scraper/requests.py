@@ -1,49 +1,167 @@
 # requests.py
 """Contains the functions for making HTML requests and creating BeautifulSoup objects."""
+import os
+import random
 import re
-from urllib.request import urlopen
-from urllib.request import Request
-from urllib.error import URLError
-from typing import List
-from bs4 import BeautifulSoup
-
+import time
+from http.client import responses
+from urllib.error import HTTPError, URLError
+from typing import List, Optional
+from bs4 import BeautifulSoup, SoupStrainer
+
+import src.scraper.dead_letter as dead_letter
+import src.scraper.metrics as metrics
+from src.scraper.cache import get_cache
+from src.scraper.http_client import get_client
 from src.scraper.logger import get_logger
+from src.scraper.parsing import LINKS_STRAINER, make_soup
+from src.scraper.rate_limit import get_limiter, parse_retry_after
 
 my_logger = get_logger(__name__)
 
-def get_soup(url: str) -> BeautifulSoup:
+# Number of times a request is retried after a transient error
+RETRIES = int(os.getenv("HTTP_RETRIES", "4"))
+
+# Base and maximum delay in seconds of the exponential backoff between retries
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "2"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "120"))
+
+# Status codes worth retrying
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def fetch(url: str) -> bytes:
     """
-    Fetch the html for the given player URL and return a BeautifulSoup object.
+    Download a page through the process' keep-alive HTTP client,
+    waiting for the rate limiter shared by all the crawler processes.
+    When the page cache is enabled, fresh cached pages are returned without a request
+    and stale ones are revalidated with a conditional request.
 
     Arguments:
-        url -- player's URL path as a string
+        url -- absolute URL of the page
+    Returns:
+        The decoded response body.
+    Raises:
+        URLError   -- the server couldn't be reached (or the page isn't cached in offline mode)
+        HTTPError  -- the server answered with an error status
+        ValueError -- the URL or the response body is invalid
     """
-    try:
-        request = Request(
-            url,
-            # headers={'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_5)'
-            #                                                   'AppleWebKit 537.36 (KHTML, like Gecko) Chrome',
-            #                                     'Accept': 'text/html,application/xhtml+xml,application/xml;'
-            #                                               'q=0.9,image/webp,*/*;q=0.8'}
-        )
-    except ValueError as e:
-        my_logger.error("requests: get_soup: ", e)
-        return None
+    cache = get_cache()
+    page = cache.get(url) if cache is not None else None
+
+    if page is not None and (cache.offline or cache.is_fresh(page)):
+        return page.body
+
+    if cache is not None and cache.offline:
+        raise URLError(f"offline mode: {url} is not cached")
+
+    headers = {}
+    if page is not None:
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+
+    limiter = get_limiter()
+    if limiter is not None:
+        with metrics.timer("fetch.wait"):
+            limiter.acquire()
+
+    response = get_client().get(url, headers)
+
+    if response.status == 429:
+        metrics.inc("throttled")
+
+    if limiter is not None:
+        if response.status == 429:
+            limiter.throttled(parse_retry_after(response.headers.get("Retry-After")))
+        elif response.status < 400:
+            limiter.success()
+
+    if response.status == 304 and page is not None:
+        cache.revalidated(url, response.headers)
+        return page.body
+
+    if response.status != 200:
+        raise HTTPError(url, response.status, responses.get(response.status, ""), response.headers, None)
+
+    if cache is not None:
+        cache.put(url, response.body, response.headers)
+
+    return response.body
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Delay before retrying a request: exponential backoff with full jitter.
+
+    Arguments:
+        attempt -- number of the failed attempt, starting at 0
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def is_transient(error: Exception) -> bool:
+    """Tell whether a failed request is worth retrying."""
+    if isinstance(error, HTTPError):
+        return error.code in TRANSIENT_STATUSES
+
+    # A page missing from the cache in offline mode won't appear by retrying
+    cache = get_cache()
+    if cache is not None and cache.offline:
+        return False
+
+    return isinstance(error, URLError)
+
+
+def fetch_with_retries(url: str) -> bytes:
+    """
+    Download a page with fetch, retrying transient errors (connection errors,
+    timeouts, 429 and 5xx responses) with a jittered exponential backoff.
+    Raises the last error once the retries are exhausted.
+    """
+    for attempt in range(RETRIES + 1):
+        try:
+            return fetch(url)
+        except URLError as e:
+            if attempt == RETRIES or not is_transient(e):
+                raise
+
+            delay = backoff_delay(attempt)
+            my_logger.warning(
+                f"requests: fetch_with_retries: {url}: {e}. Retrying in {delay:.1f}s."
+            )
+            time.sleep(delay)
+
 
+def get_soup(url: str, parse_only: SoupStrainer = None) -> BeautifulSoup:
+    """
+    Fetch the html for the given player URL and return a BeautifulSoup object.
+
+    Arguments:
+        url        -- player's URL path as a string
+        parse_only -- optional SoupStrainer restricting the parse to the elements that are needed
+    Returns:
+        The parsed page, or None if it couldn't be downloaded or parsed.
+    """
     try:
-        html = urlopen(request)
+        with metrics.timer("fetch"):
+            html = fetch_with_retries(url)
     except (ValueError, URLError) as e:
-        my_logger.error("requests: get_soup: ", e)
+        my_logger.error(f"requests: get_soup: {url}: {e}")
+        metrics.inc("errors.fetch")
         return None
 
     try:
-        return BeautifulSoup(html, "html.parser")
+        with metrics.timer("parse"):
+            return make_soup(html, parse_only)
     except Exception as e:
-        my_logger.error("requests: get_soup: ", e)
+        my_logger.error(f"requests: get_soup: {url}: {e}")
+        metrics.inc("errors.parse")
         return None
 
 
-def get_squads(league: str) -> List[str]:
+def get_squads(league: str) -> Optional[List[str]]:
     """
     Crawl a league page and collect all team URLs.
 
@@ -52,10 +170,49 @@ def get_squads(league: str) -> List[str]:
 
     Returns:
         List of strings. Each string is a unique team URL.
+        None if the page couldn't be downloaded.
     """
     url = f"https://fbref.com{league}"
-    soup = get_soup(url)
+    soup = get_soup(url, LINKS_STRAINER)
+
+    if soup is None:
+        dead_letter.add(league, "league", "league page couldn't be downloaded")
+        return None
+
+    return parse_squads(soup)
+
+
+def get_players(squad: str) -> Optional[List[str]]:
+    """
+    Crawl a team page and collect all player URLs.
+
+    Arguments:
+         squad -- single URL of a league
+
+    Returns:
+        List of strings. Each string is a unique player URL.
+        None if the page couldn't be downloaded.
+    """
+    url = f"https://fbref.com{squad}"
+    soup = get_soup(url, LINKS_STRAINER)
+
+    if soup is None:
+        dead_letter.add(squad, "squad", "squad page couldn't be downloaded")
+        return None
+
+    return parse_players(soup)
+
+
+def parse_squads(soup: BeautifulSoup) -> List[str]:
+    """
+    Collect all team URLs from an already parsed league page.
 
+    Arguments:
+         soup -- BeautifulSoup object of a league page
+
+    Returns:
+        List of strings. Each string is a unique team URL.
+    """
     links = []
 
     for link in soup.find("table").find_all("a", href=re.compile("(\/squads\/)")):
@@ -64,19 +221,16 @@ def get_squads(league: str) -> List[str]:
     return links
 
 
-def get_players(squad: str) -> List[str]:
+def parse_players(soup: BeautifulSoup) -> List[str]:
     """
-    Crawl a team page and collect all player URLs.
+    Collect all player URLs from an already parsed team page.
 
     Arguments:
-         squad -- single URL of a league
+         soup -- BeautifulSoup object of a team page
 
     Returns:
         List of strings. Each string is a unique player URL.
     """
-    url = f"https://fbref.com{squad}"
-    soup = get_soup(url)
-
     links = []
 
     for link in soup.find("table").find_all(
@@ -0,0 +1,219 @@
+# rows.py
+"""Typed rows of the stats tables. The schema of a table is derived once from its header,
+and its rows are compact records of parsed values (None for empty cells)."""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Columns of a stats row that are not numeric metrics
+STRING_COLUMNS = [
+    "table",
+    "id",
+    "season",
+    "team",
+    "squad",
+    "country",
+    "comp_level",
+    "lg_finish",
+]
+
+# Key and descriptive fields of a stats row, in table column order
+BASE_FIELDS = ("id", "season", "team", "country", "comp_level", "lg_finish")
+
+# Schemas of the stats tables seen by the current process
+_schemas = {}
+
+
+def metric_columns(columns: Iterable[str]) -> List[str]:
+    """Numeric metric columns among the columns of a stats table header."""
+    return [column for column in columns if column not in STRING_COLUMNS]
+
+
+def parse_number(text: str) -> Optional[float]:
+    """Parse a cell of a metric column, None for an empty or non-numeric cell."""
+    if not text:
+        return None
+
+    try:
+        return float(text.replace(",", ""))
+    except ValueError:
+        return None
+
+
+class StatsSchema:
+    """Name and metric columns of a stats table."""
+
+    __slots__ = ("table", "metrics", "index")
+
+    def __init__(self, table: str, metrics: Iterable[str]):
+        """
+        Arguments:
+            table   -- name of the table (e.g. "standard")
+            metrics -- names of the metric columns, in table order
+        """
+        self.table = table
+        self.metrics = tuple(metrics)
+        self.index = {column: i for i, column in enumerate(self.metrics)}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, StatsSchema) and (self.table, self.metrics) == (other.table, other.metrics)
+
+    def __hash__(self) -> int:
+        return hash((self.table, self.metrics))
+
+    def __repr__(self) -> str:
+        return f"StatsSchema({self.table!r}, {list(self.metrics)!r})"
+
+
+def register_schemas(headers: List[List[str]]) -> None:
+    """
+    Register the schemas of the stats tables, so that all the rows of a table share them.
+
+    Arguments:
+        headers -- stats table headers as returned by get_stats_headers
+    """
+    for header in headers:
+        _schemas[header[0]] = StatsSchema(header[0], metric_columns(header[1:]))
+
+
+def get_schema(table: str, columns: Iterable[str] = ()) -> StatsSchema:
+    """
+    Schema of a stats table, derived from the given header columns the first time it is requested.
+    A header with metric columns the schema doesn't have (a column fbref added) extends it:
+    the new columns are appended to a new schema, used from then on.
+
+    Arguments:
+        table   -- name of the table
+        columns -- columns of the table header
+    """
+    schema = _schemas.get(table)
+
+    if schema is None:
+        schema = _schemas[table] = StatsSchema(table, metric_columns(columns))
+    else:
+        added = [column for column in metric_columns(columns) if column not in schema.index]
+
+        if added:
+            schema = _schemas[table] = StatsSchema(table, schema.metrics + tuple(added))
+
+    return schema
+
+
+def union_metrics(rows: Iterable["StatsRow"]) -> List[str]:
+    """Metric columns of the schemas of rows of a table, in schema order."""
+    columns = {}
+
+    for schema in dict.fromkeys(row.schema for row in rows):
+        columns.update(dict.fromkeys(schema.metrics))
+
+    return list(columns)
+
+
+class StatsRow:
+    """
+    A row of a stats table: its key and descriptive fields, and a tuple
+    of the metric values in schema order.
+    """
+
+    __slots__ = ("schema", "id", "season", "team", "country", "comp_level", "lg_finish", "values")
+
+    def __init__(
+        self,
+        schema: StatsSchema,
+        id: str,
+        season: str,
+        team: Optional[str] = None,
+        country: Optional[str] = None,
+        comp_level: Optional[str] = None,
+        lg_finish: Optional[str] = None,
+        values: Tuple[Optional[float], ...] = None,
+    ):
+        self.schema = schema
+        self.id = id
+        self.season = season
+        self.team = team
+        self.country = country
+        self.comp_level = comp_level
+        self.lg_finish = lg_finish
+        self.values = tuple(values) if values is not None else (None,) * len(schema.metrics)
+
+    @classmethod
+    def from_cells(cls, schema: StatsSchema, player_id: str, season: str, cells: Dict[str, str]) -> "StatsRow":
+        """
+        Build a row from the text of its cells, parsing the metrics once.
+
+        Arguments:
+            schema    -- schema of the table
+            player_id -- unique id of the player
+            season    -- season of the row
+            cells     -- text of the row's cells, by column name (data-stat)
+        """
+        country = cells.get("country")
+
+        return cls(
+            schema,
+            player_id,
+            season,
+            cells.get("team") or None,
+            # "es ESP" -> "ESP"
+            country.split()[-1] if country and country.split() else None,
+            cells.get("comp_level") or None,
+            cells.get("lg_finish") or None,
+            tuple(parse_number(cells.get(column)) for column in schema.metrics),
+        )
+
+    @classmethod
+    def from_dict(cls, cells: Dict[str, str]) -> "StatsRow":
+        """
+        Build a row, with a schema of its own, from a dictionary of cell texts
+        holding its table, id and season (for example {"table": "standard", "id": ..., "minutes": "2,661"}).
+        """
+        schema = StatsSchema(cells["table"], metric_columns(cells))
+
+        return cls.from_cells(schema, cells["id"], cells["season"], cells)
+
+    @property
+    def table(self) -> str:
+        return self.schema.table
+
+    def key(self) -> Tuple[str, str, str, str]:
+        """Primary key of the row, with its table: (table, id, season, squad)."""
+        return self.schema.table, self.id, self.season, self.team
+
+    def get(self, column: str, default=None):
+        """Value of a field or of a metric, default if the table doesn't have the column."""
+        if column in BASE_FIELDS:
+            return getattr(self, column)
+
+        i = self.schema.index.get(column)
+
+        return self.values[i] if i is not None else default
+
+    def replace(self, **changes) -> "StatsRow":
+        """Copy of the row with some fields or metrics changed."""
+        fields = {field: changes.pop(field, getattr(self, field)) for field in BASE_FIELDS}
+        values = list(self.values)
+
+        for column, value in changes.items():
+            values[self.schema.index[column]] = value
+
+        return StatsRow(self.schema, values=values, **fields)
+
+    def as_dict(self) -> Dict:
+        """The row as a dictionary, without its empty cells."""
+        row = {"table": self.schema.table}
+        row.update((field, getattr(self, field)) for field in BASE_FIELDS if getattr(self, field) is not None)
+        row.update((column, value) for column, value in zip(self.schema.metrics, self.values) if value is not None)
+
+        return row
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, StatsRow) and self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        return f"StatsRow({self.as_dict()!r})"
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state) -> None:
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
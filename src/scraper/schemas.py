@@ -0,0 +1,183 @@
+# schemas.py
+"""Versioned registry of the stats table schemas: the header columns of each table, kept in a local
+file (SCHEMA_FILE) and in the stats_schemas table of the database. The registry grows from the headers
+of the scraped pages, a column fbref adds to a table is added to the database table online."""
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import src.scraper.storage as storage
+from src.scraper.logger import get_logger
+from src.scraper.rows import StatsRow, metric_columns
+
+my_logger = get_logger(__name__)
+
+# Local copy of the registry, read when the database can't be reached
+SCHEMA_FILE = os.getenv("SCHEMA_FILE", "schemas.json")
+
+# Registry of the current process, loaded lazily (see get_registry)
+_registry = None
+_registry_pid = None
+
+
+class SchemaRegistry:
+    """Latest version and header columns of each stats table, by table name (e.g. "standard")."""
+
+    def __init__(self, schemas: Dict[str, Tuple[int, List[str]]] = None, path: str = SCHEMA_FILE):
+        """
+        Arguments:
+            schemas -- dictionary mapping table names to (version, header columns) tuples
+            path    -- local file of the registry
+        """
+        self.schemas = dict(schemas or {})
+        self.path = path
+        self.lock = threading.Lock()
+
+        # StatsSchema objects whose columns are known to be in the registry
+        self.checked = set()
+
+    @classmethod
+    def load(cls, path: str = SCHEMA_FILE) -> "SchemaRegistry":
+        """Registry merged from the local file and the stats_schemas table."""
+        registry = cls(path=path)
+
+        for source in (read_schema_file(path), storage.get_storage().load_schemas()):
+            for table, (version, columns) in source.items():
+                registry.merge(table, columns, version)
+
+        return registry
+
+    def headers(self, tables: Iterable[str] = None) -> List[List[str]]:
+        """
+        Headers of the known tables, in the format returned by get_stats_headers.
+
+        Arguments:
+            tables -- names of the tables (e.g. "standard"), all the known tables by default
+        """
+        tables = self.schemas if tables is None else [table for table in tables if table in self.schemas]
+
+        return [[table] + self.schemas[table][1] for table in tables]
+
+    def version(self, table: str) -> int:
+        return self.schemas[table][0] if table in self.schemas else 0
+
+    def merge(self, table: str, columns: Iterable[str], version: int = None) -> List[str]:
+        """
+        Add header columns to the schema of a table, creating a new version if some are new.
+        The number of a new version is provisional, save numbers it after the versions recorded
+        by the other workers.
+
+        Arguments:
+            table   -- name of the table
+            columns -- header columns
+            version -- version the columns come from, the registry keeps the highest one
+        Returns:
+            The columns that were added.
+        """
+        with self.lock:
+            current, known = self.schemas.get(table, (0, []))
+            added = [column for column in dict.fromkeys(columns) if column not in known]
+
+            if added or (version or 0) > current:
+                new_version = max(current + 1 if added else current, version or 0)
+                self.schemas[table] = (new_version, known + added)
+
+            return added
+
+    def save(self) -> bool:
+        """
+        Record the new versions in the database, which numbers them after the versions recorded
+        by the other workers and merges their columns, then write the registry to its local file,
+        keeping the newer versions other workers wrote there.
+        """
+        with self.lock:
+            schemas = dict(self.schemas)
+
+        saved = storage.get_storage().save_schemas(schemas)
+
+        with self.lock:
+            for table, (version, columns) in (saved or {}).items():
+                known = self.schemas[table][1]
+                self.schemas[table] = (version, columns + [column for column in known if column not in columns])
+
+            schemas = dict(self.schemas)
+
+        for table, (version, columns) in read_schema_file(self.path).items():
+            if version > schemas.get(table, (0, []))[0]:
+                schemas[table] = (version, columns)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(schemas, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+        return saved is not None
+
+    def migrate(self, headers: List[List[str]]) -> bool:
+        """
+        Make sure the database tables of the given headers exist and have their metric columns:
+        a table the database doesn't have yet is created, the missing columns are added online.
+
+        Arguments:
+            headers -- stats table headers as returned by get_stats_headers
+        """
+        res = storage.get_storage().create_schema(headers)
+
+        for header in headers:
+            res = storage.get_storage().add_columns(header[0], metric_columns(header[1:])) and res
+
+        return res
+
+    def observe(self, stats: List[StatsRow]) -> None:
+        """
+        Check the schemas of scraped rows against the registry. Metric columns missing from
+        the registry (added by fbref since the table was created) are added to the table and
+        recorded in a new version of its schema, before the rows are written. A table the registry
+        doesn't know at all is created from the first scraped page that has it.
+
+        Arguments:
+            stats -- list of StatsRow, as returned by scrape_stats
+        """
+        for schema in {row.schema for row in stats} - self.checked:
+            known = schema.table in self.schemas
+            added = self.merge(schema.table, schema.metrics)
+
+            if added and known:
+                my_logger.info(
+                    f"Schema of {schema.table}: columns {', '.join(added)} found,"
+                    f" migrating to version {self.version(schema.table)}."
+                )
+            elif added:
+                my_logger.info(f"Schema of {schema.table}: new table, creating it.")
+
+            if added:
+
+                if not (self.migrate([[schema.table] + added]) and self.save()):
+                    my_logger.error(f"schemas: observe: the migration of table {schema.table} failed.")
+                    continue
+
+            self.checked.add(schema)
+
+
+def read_schema_file(path: str) -> Dict[str, Tuple[int, List[str]]]:
+    """Registry written to a local file, empty if there is none."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {table: (version, columns) for table, (version, columns) in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        my_logger.error(f"schemas: read_schema_file: {path} is not a valid schema file: {e}")
+        return {}
+
+
+def get_registry() -> SchemaRegistry:
+    """Return the schema registry of the current process, loaded the first time."""
+    global _registry, _registry_pid
+
+    if _registry_pid != os.getpid():
+        _registry = SchemaRegistry.load(os.getenv("SCHEMA_FILE", SCHEMA_FILE))
+        _registry_pid = os.getpid()
+
+    return _registry
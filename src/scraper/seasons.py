@@ -0,0 +1,44 @@
+# seasons.py
+"""Season-specific URLs of the league pages, used by the historical backfill."""
+import re
+from typing import List
+
+# Comp page of the current season: /en/comps/<id>/<name>
+COMP_URL = re.compile(r"^/en/comps/(\d+)/([^/]+)$")
+
+
+def season_name(year: int) -> str:
+    """Name of the season starting in the given year, as used by fbref (2021 -> 2021-2022)."""
+    return f"{year}-{year + 1}"
+
+
+def season_url(league: str, year: int) -> str:
+    """
+    URL of a league's comp page for a past season.
+
+    Arguments:
+        league -- URL of the league's current season comp page, e.g. /en/comps/9/Premier-League-Stats
+        year   -- year the season starts in
+    Returns:
+        The season's comp page, e.g. /en/comps/9/2021-2022/2021-2022-Premier-League-Stats
+    """
+    match = COMP_URL.match(league)
+
+    if match is None:
+        raise ValueError(f"{league} is not the URL of a current season comp page")
+
+    comp, name = match.groups()
+    season = season_name(year)
+
+    return f"/en/comps/{comp}/{season}/{season}-{name}"
+
+
+def season_leagues(leagues: List[str], first: int, last: int) -> List[str]:
+    """
+    Comp pages of the given leagues for every season from first to last (years the seasons start in),
+    most recent season first.
+    """
+    if first > last:
+        raise ValueError(f"the first season ({first}) is after the last one ({last})")
+
+    return [season_url(league, year) for year in range(last, first - 1, -1) for league in leagues]
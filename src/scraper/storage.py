@@ -0,0 +1,674 @@
+# storage.py
+"""Storage backends. The crawler stores the players and its crawl frontier through the backend
+selected by STORAGE_BACKEND: MySQL (default), PostgreSQL or an embedded SQLite file."""
+import io
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import src.scraper.database as db
+import src.scraper.metrics as metrics
+from src.scraper.bulk_load import format_line
+from src.scraper.logger import get_logger
+from src.scraper.rows import metric_columns, union_metrics
+
+my_logger = get_logger(__name__)
+
+# "mysql", "postgres" or "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mysql")
+
+# Database file of the SQLite backend
+SQLITE_PATH = os.getenv("SQLITE_PATH", "fbref.sqlite")
+
+# Port of the PostgreSQL server (host, user, password and database are shared with MySQL)
+PG_PORT = int(os.getenv("DB_PORT", "5432"))
+
+# Stats batches of at least this many rows are sent to PostgreSQL with COPY
+PG_COPY_THRESHOLD = int(os.getenv("PG_COPY_THRESHOLD", "500"))
+
+# Primary key of the stats tables
+STATS_KEY = ["id", "season", "squad"]
+
+# Storage backend of the current process, created lazily (connections can't be shared across a fork)
+_storage = None
+_storage_pid = None
+
+
+class Storage:
+    """Interface of the storage backends."""
+
+    def create_schema(self, tables: List[List[str]]) -> bool:
+        """
+        Create the info table, the stats tables and the crawl frontier table.
+
+        Arguments:
+            tables -- stats table headers as returned by get_stats_headers
+        """
+        raise NotImplementedError
+
+    def add_players(self, players: List, done: List[str] = ()) -> bool:
+        """
+        Store several players in a single transaction.
+
+        Arguments:
+            players -- list of (info, stats) tuples as returned by scrape_player
+            done    -- URLs marked as done in the crawl frontier, in the same transaction
+        """
+        raise NotImplementedError
+
+    def select_info(self, player_id: str) -> Optional[List]:
+        raise NotImplementedError
+
+    def select_stats(self, player_id: str, table: str) -> Optional[List]:
+        raise NotImplementedError
+
+    def select_info_many(self, ids: List[str]) -> Optional[Dict[str, tuple]]:
+        """
+        Look up the info rows of several players in a few statements.
+
+        Returns:
+            Dictionary mapping the ids of the players found to their info row.
+        """
+        raise NotImplementedError
+
+    def select_stats_many(self, ids: List[str], table: str) -> Optional[Dict[str, List[tuple]]]:
+        """
+        Look up the rows of several players in a stats table in a few statements.
+
+        Returns:
+            Dictionary mapping the ids of the players to their rows.
+        """
+        raise NotImplementedError
+
+    def select_chunks(
+        self, table: str, chunk_size: int, ids: List[str] = None
+    ) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Stream all the rows of a table, or the rows of the given players, in chunks of at most chunk_size rows.
+
+        Returns:
+            Iterator of (column names, rows) tuples.
+        """
+        raise NotImplementedError
+
+    def write_table(
+        self, table: str, columns: Dict[str, str], key: List[str], rows: List[tuple], ids: List[str] = None
+    ) -> bool:
+        """
+        Materialize computed rows in a table, in a single transaction: a table rebuilt from scratch is
+        written to <table>_new and swapped in, a failed rebuild leaves the previous table in place.
+
+        Arguments:
+            table   -- name of the table
+            columns -- SQL type of each column, in row order
+            key     -- primary key columns
+            rows    -- rows to insert
+            ids     -- players whose rows are replaced, None to rebuild the whole table
+        """
+        raise NotImplementedError
+
+    def reset_frontier(self, leagues: List[str]) -> bool:
+        raise NotImplementedError
+
+    def expand_frontier(self, url: str, children: List[str], kind: str) -> bool:
+        raise NotImplementedError
+
+    def set_frontier_status(self, urls: List[str], status: str) -> bool:
+        raise NotImplementedError
+
+    def select_frontier(self, status: str) -> Dict[str, List[str]]:
+        raise NotImplementedError
+
+    def load_schemas(self) -> Dict[str, Tuple[int, List[str]]]:
+        """
+        Latest version of the schema of every stats table, recorded in the stats_schemas table.
+
+        Returns:
+            Dictionary mapping table names to (version, header columns) tuples.
+        """
+        raise NotImplementedError
+
+    def save_schemas(self, schemas: Dict[str, Tuple[int, List[str]]]) -> Optional[Dict[str, Tuple[int, List[str]]]]:
+        """
+        Record new versions of stats table schemas, numbered after the latest recorded version
+        of each table, whose columns they extend.
+
+        Returns:
+            Dictionary mapping table names to their latest recorded (version, header columns) tuples,
+            None if the schemas couldn't be recorded.
+        """
+        raise NotImplementedError
+
+    def add_columns(self, table: str, columns: List[str]) -> bool:
+        """Add metric columns to a stats table, skipping the ones it already has."""
+        raise NotImplementedError
+
+
+class MySQLStorage(Storage):
+    """MySQL backend, implemented by the functions of the database module."""
+
+    @metrics.timed("db.create_schema")
+    def create_schema(self, tables: List[List[str]]) -> bool:
+        res = db.create_db(db.DB)
+        res = db.create_info_table() and res
+        res = db.create_stats_tables(tables) and res
+
+        return db.create_frontier_table() and res
+
+    @metrics.timed("db.add_players")
+    def add_players(self, players: List, done: List[str] = ()) -> bool:
+        return db.add_players(players, done)
+
+    @metrics.timed("db.select_info")
+    def select_info(self, player_id: str) -> Optional[List]:
+        return db.select_info(player_id)
+
+    @metrics.timed("db.select_stats")
+    def select_stats(self, player_id: str, table: str) -> Optional[List]:
+        return db.select_stats(player_id, table)
+
+    @metrics.timed("db.select_info_many")
+    def select_info_many(self, ids: List[str]) -> Optional[Dict[str, tuple]]:
+        return db.select_info_many(ids)
+
+    @metrics.timed("db.select_stats_many")
+    def select_stats_many(self, ids: List[str], table: str) -> Optional[Dict[str, List[tuple]]]:
+        return db.select_stats_many(ids, table)
+
+    def select_chunks(
+        self, table: str, chunk_size: int, ids: List[str] = None
+    ) -> Iterator[Tuple[List[str], List[tuple]]]:
+        return db.select_chunks(table, chunk_size, ids)
+
+    @metrics.timed("db.write_table")
+    def write_table(
+        self, table: str, columns: Dict[str, str], key: List[str], rows: List[tuple], ids: List[str] = None
+    ) -> bool:
+        return db.write_table(table, columns, key, rows, ids)
+
+    @metrics.timed("db.reset_frontier")
+    def reset_frontier(self, leagues: List[str]) -> bool:
+        return db.reset_frontier(leagues)
+
+    @metrics.timed("db.expand_frontier")
+    def expand_frontier(self, url: str, children: List[str], kind: str) -> bool:
+        return db.expand_frontier(url, children, kind)
+
+    @metrics.timed("db.set_frontier_status")
+    def set_frontier_status(self, urls: List[str], status: str) -> bool:
+        return db.set_frontier_status(urls, status)
+
+    @metrics.timed("db.select_frontier")
+    def select_frontier(self, status: str) -> Dict[str, List[str]]:
+        return db.select_frontier(status)
+
+    @metrics.timed("db.load_schemas")
+    def load_schemas(self) -> Dict[str, Tuple[int, List[str]]]:
+        return db.load_schemas()
+
+    @metrics.timed("db.save_schemas")
+    def save_schemas(self, schemas: Dict[str, Tuple[int, List[str]]]) -> Optional[Dict[str, Tuple[int, List[str]]]]:
+        return db.save_schemas(schemas)
+
+    @metrics.timed("db.add_columns")
+    def add_columns(self, table: str, columns: List[str]) -> bool:
+        return db.add_columns(table, columns)
+
+
+class SQLStorage(Storage):
+    """
+    Backend over a DB-API connection, using the INSERT ... ON CONFLICT upserts
+    understood by both PostgreSQL and SQLite.
+    """
+
+    # Parameter placeholder of the driver
+    placeholder = "?"
+
+    def __init__(self):
+        # The frontier is updated by the discovery threads, one at a time
+        self.frontier_lock = threading.Lock()
+
+    def connect(self):
+        raise NotImplementedError
+
+    def release(self, conn) -> None:
+        conn.close()
+
+    def begin(self, cur) -> None:
+        """Open the transaction explicitly, for the drivers that don't include DDL statements in it."""
+
+    def run(self, name: str, work: Callable, default=False):
+        """
+        Run work(cur) in a transaction, committed if it doesn't raise.
+
+        Arguments:
+            name    -- name of the operation, for the logs
+            work    -- function taking a cursor
+            default -- returned if the transaction fails
+        Returns:
+            What work returned, or default.
+        """
+        conn = cur = None
+        res = default
+
+        try:
+            with metrics.timer(f"db.{name}"):
+                conn = self.connect()
+                cur = conn.cursor()
+
+                res = work(cur)
+                conn.commit()
+        except Exception as e:
+            res = default
+            if conn is not None:
+                conn.rollback()
+            my_logger.error(e)
+            my_logger.error(f"storage: {name}: Exception was raised by {type(self).__name__}.")
+        finally:
+            if cur is not None:
+                cur.close()
+            if conn is not None:
+                self.release(conn)
+
+        return res
+
+    def create_schema(self, tables: List[List[str]]) -> bool:
+        statements = [
+            "CREATE TABLE IF NOT EXISTS info (id VARCHAR(8) NOT NULL, "
+            "created TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+            "name VARCHAR(50), height INT, weight INT, dob VARCHAR(50), "
+            "countryob VARCHAR(50), club VARCHAR(50), age INT, "
+            "PRIMARY KEY(id));",
+            "CREATE TABLE IF NOT EXISTS crawl_frontier (url VARCHAR(255) NOT NULL, "
+            "kind VARCHAR(8) NOT NULL, status VARCHAR(8) NOT NULL, "
+            "updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY(url));",
+            "CREATE INDEX IF NOT EXISTS crawl_frontier_status ON crawl_frontier (status);",
+        ]
+
+        for table in tables:
+            columns = metric_columns(table[1:])
+            statements.append(
+                f"CREATE TABLE IF NOT EXISTS {table[0]} (id VARCHAR(8) NOT NULL, "
+                "season VARCHAR(20) NOT NULL, squad VARCHAR(50) NOT NULL, "
+                "country VARCHAR(30), comp_level VARCHAR(30), lg_finish VARCHAR(10), "
+                + "".join(f"{column} {db.metric_type(column)}, " for column in columns)
+                + "PRIMARY KEY(id, season, squad), FOREIGN KEY(id) REFERENCES info(id) "
+                "ON DELETE CASCADE ON UPDATE CASCADE);"
+            )
+            statements.append(f"CREATE INDEX IF NOT EXISTS {table[0]}_season ON {table[0]} (season);")
+            statements.append(f"CREATE INDEX IF NOT EXISTS {table[0]}_squad ON {table[0]} (squad);")
+
+        def work(cur):
+            for statement in statements:
+                cur.execute(statement)
+            return True
+
+        return self.run("create_schema", work)
+
+    def upsert(self, cur, table: str, columns: List[str], key: List[str], rows: List[List]) -> None:
+        """
+        Insert or update rows with a single statement.
+
+        Arguments:
+            cur     -- cursor of the open transaction
+            table   -- name of the table
+            columns -- columns of the rows
+            key     -- primary key columns
+            rows    -- list of value lists, in column order
+        """
+        values = "( " + ", ".join([self.placeholder] * len(columns)) + " )"
+
+        cur.executemany(self.upsert_sql(table, columns, key, values), rows)
+
+    def upsert_sql(self, table: str, columns: List[str], key: List[str], values: str) -> str:
+        """INSERT ... ON CONFLICT statement, values being what follows VALUES."""
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in key)
+
+        return (
+            f"INSERT INTO {table} ( {', '.join(columns)} ) VALUES {values} "
+            f"ON CONFLICT ( {', '.join(key)} ) DO UPDATE SET {updates}"
+        )
+
+    def add_players(self, players: List, done: List[str] = ()) -> bool:
+        infos = [[info.get(column) for column in db.INFO_COLUMNS] for info, _ in players if info]
+
+        # Group the rows by table, a later row replaces an earlier one with the same key
+        tables = {}
+        for _, stats in players:
+            for row in stats:
+                tables.setdefault(row.table, {})[row.key()] = row
+
+        def work(cur):
+            if infos:
+                self.upsert(cur, "info", db.INFO_COLUMNS, ["id"], infos)
+
+            for table, rows in tables.items():
+                columns = union_metrics(rows.values())
+                self.upsert(
+                    cur,
+                    table,
+                    db.STATS_BASE_COLUMNS + columns,
+                    STATS_KEY,
+                    [db._stats_row_values(row, columns) for row in rows.values()],
+                )
+
+            self._set_frontier_status(cur, done, db.DONE)
+            return True
+
+        return self.run("add_players", work)
+
+    def select_info(self, player_id: str) -> Optional[List]:
+        def work(cur):
+            cur.execute(f"SELECT * FROM info WHERE id = {self.placeholder};", (player_id,))
+            return cur.fetchall()
+
+        return self.run("select_info", work, None)
+
+    def select_stats(self, player_id: str, table: str) -> Optional[List]:
+        def work(cur):
+            cur.execute(f"SELECT * FROM {table} WHERE id = {self.placeholder};", (player_id,))
+            return cur.fetchall()
+
+        return self.run("select_stats", work, None)
+
+    def select_info_many(self, ids: List[str]) -> Optional[Dict[str, tuple]]:
+        def work(cur):
+            return {row[0]: row for row in self.select_many(cur, "info", ids)}
+
+        return self.run("select_info_many", work, None)
+
+    def select_stats_many(self, ids: List[str], table: str) -> Optional[Dict[str, List[tuple]]]:
+        def work(cur):
+            res = {player_id: [] for player_id in ids}
+            for row in self.select_many(cur, table, ids):
+                res[row[0]].append(row)
+            return res
+
+        return self.run("select_stats_many", work, None)
+
+    def select_many(self, cur, table: str, ids: List[str]) -> List[tuple]:
+        """Select the rows of several players from a table, batch by batch (see database.id_batches)."""
+        rows = []
+
+        for batch in db.id_batches(ids):
+            placeholders = ", ".join([self.placeholder] * len(batch))
+            cur.execute(f"SELECT * FROM {table} WHERE id IN ( {placeholders} );", batch)
+            rows.extend(cur.fetchall())
+
+        return rows
+
+    def cursor(self, conn, name: str):
+        """Cursor streaming the results of a large query."""
+        return conn.cursor()
+
+    def select_chunks(
+        self, table: str, chunk_size: int, ids: List[str] = None
+    ) -> Iterator[Tuple[List[str], List[tuple]]]:
+        conn = self.connect()
+        cur = self.cursor(conn, f"select_{table}")
+
+        try:
+            if ids is None:
+                cur.execute(f"SELECT * FROM {table};")
+            else:
+                placeholders = ", ".join([self.placeholder] * len(ids))
+                cur.execute(f"SELECT * FROM {table} WHERE id IN ( {placeholders} );", list(ids))
+
+            while rows := cur.fetchmany(chunk_size):
+                # Server-side cursors only describe the columns once rows are fetched
+                yield [column[0] for column in cur.description], rows
+        except Exception as e:
+            my_logger.error(e)
+            my_logger.error(f"storage: select_chunks: Exception was raised by {type(self).__name__}.")
+            raise
+        finally:
+            cur.close()
+            conn.rollback()
+            self.release(conn)
+
+    def write_table(
+        self, table: str, columns: Dict[str, str], key: List[str], rows: List[tuple], ids: List[str] = None
+    ) -> bool:
+        def work(cur):
+            self.begin(cur)
+
+            # A table rebuilt from scratch is written to <table>_new and swapped in by the same transaction
+            target = table if ids is not None else f"{table}_new"
+
+            if ids is None:
+                cur.execute(f"DROP TABLE IF EXISTS {target};")
+            cur.execute(db.create_table_sql(target, columns, key))
+
+            if ids is not None:
+                cur.executemany(
+                    f"DELETE FROM {table} WHERE id = {self.placeholder};", [(player_id,) for player_id in ids]
+                )
+
+            if rows:
+                values = ", ".join([self.placeholder] * len(columns))
+                cur.executemany(f"INSERT INTO {target} ( {', '.join(columns)} ) VALUES ( {values} );", rows)
+
+            if ids is None:
+                cur.execute(f"DROP TABLE IF EXISTS {table};")
+                cur.execute(f"ALTER TABLE {target} RENAME TO {table};")
+            return True
+
+        return self.run("write_table", work)
+
+    def reset_frontier(self, leagues: List[str]) -> bool:
+        def work(cur):
+            cur.execute("DELETE FROM crawl_frontier;")
+            self._add_to_frontier(cur, leagues, "league")
+            return True
+
+        return self.run("reset_frontier", work)
+
+    def expand_frontier(self, url: str, children: List[str], kind: str) -> bool:
+        def work(cur):
+            self._add_to_frontier(cur, children, kind)
+            self._set_frontier_status(cur, [url], db.DONE)
+            return True
+
+        with self.frontier_lock:
+            return self.run("expand_frontier", work)
+
+    def set_frontier_status(self, urls: List[str], status: str) -> bool:
+        def work(cur):
+            self._set_frontier_status(cur, urls, status)
+            return True
+
+        with self.frontier_lock:
+            return self.run("set_frontier_status", work)
+
+    def select_frontier(self, status: str) -> Dict[str, List[str]]:
+        def work(cur):
+            urls = {"league": [], "squad": [], "player": []}
+            cur.execute(
+                f"SELECT url, kind FROM crawl_frontier WHERE status = {self.placeholder} ORDER BY updated;",
+                (status,),
+            )
+            for url, kind in cur.fetchall():
+                urls[kind].append(url)
+            return urls
+
+        return self.run("select_frontier", work, {"league": [], "squad": [], "player": []})
+
+    def load_schemas(self) -> Dict[str, Tuple[int, List[str]]]:
+        def work(cur):
+            cur.execute(db.SCHEMAS_TABLE)
+            cur.execute("SELECT tbl, version, columns FROM stats_schemas ORDER BY tbl, version;")
+            return {table: (version, json.loads(columns)) for table, version, columns in cur.fetchall()}
+
+        return self.run("load_schemas", work, {})
+
+    def save_schemas(self, schemas: Dict[str, Tuple[int, List[str]]]) -> Optional[Dict[str, Tuple[int, List[str]]]]:
+        def work(cur):
+            cur.execute(db.SCHEMAS_TABLE)
+            saved = {}
+
+            for table, (_, columns) in schemas.items():
+                cur.execute(
+                    f"SELECT version, columns FROM stats_schemas WHERE tbl = {self.placeholder} "
+                    "ORDER BY version DESC LIMIT 1;",
+                    (table,),
+                )
+                row = cur.fetchone()
+                version, recorded = (row[0], json.loads(row[1])) if row else (0, [])
+                added = [column for column in dict.fromkeys(columns) if column not in recorded]
+
+                if added:
+                    # A worker recording the same version meanwhile fails the transaction on the primary key
+                    version, recorded = version + 1, recorded + added
+                    cur.execute(
+                        f"INSERT INTO stats_schemas (tbl, version, columns) VALUES ({self.placeholder}, "
+                        f"{self.placeholder}, {self.placeholder});",
+                        (table, version, json.dumps(recorded)),
+                    )
+
+                saved[table] = (version, recorded)
+
+            return saved
+
+        return self.run("save_schemas", work, None)
+
+    def add_columns(self, table: str, columns: List[str]) -> bool:
+        def existing_columns(cur):
+            cur.execute(f"SELECT * FROM {table} LIMIT 0;")
+            return {column[0] for column in cur.description}
+
+        existing = self.run("add_columns", existing_columns, set())
+
+        for column in [column for column in columns if column not in existing]:
+            statement = f"ALTER TABLE {table} ADD COLUMN {column} {db.metric_type(column)};"
+            # Fails if another worker added the column meanwhile, checked below
+            self.run("add_columns", lambda cur: cur.execute(statement))
+
+        return set(columns) <= self.run("add_columns", existing_columns, set())
+
+    def _add_to_frontier(self, cur, urls: List[str], kind: str) -> None:
+        rows = [(url, kind, db.PENDING) for url in urls]
+
+        if rows:
+            cur.executemany(
+                "INSERT INTO crawl_frontier (url, kind, status) "
+                f"VALUES ({self.placeholder}, {self.placeholder}, {self.placeholder}) "
+                "ON CONFLICT (url) DO NOTHING;",
+                rows,
+            )
+
+    def _set_frontier_status(self, cur, urls: List[str], status: str) -> None:
+        rows = [(status, url) for url in urls]
+
+        if rows:
+            cur.executemany(
+                f"UPDATE crawl_frontier SET status = {self.placeholder}, updated = CURRENT_TIMESTAMP "
+                f"WHERE url = {self.placeholder};",
+                rows,
+            )
+
+
+class SQLiteStorage(SQLStorage):
+    """Embedded SQLite backend, in WAL mode so that the worker processes can write concurrently."""
+
+    def __init__(self, path: str = SQLITE_PATH):
+        super().__init__()
+        self.path = path
+
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON;")
+        # Durable at every checkpoint rather than every commit, safe in WAL mode
+        conn.execute("PRAGMA synchronous=NORMAL;")
+
+        return conn
+
+    def begin(self, cur) -> None:
+        # The sqlite3 module only opens a transaction before a DML statement, DDL would be committed at once
+        cur.execute("BEGIN;")
+
+
+class PostgresStorage(SQLStorage):
+    """
+    PostgreSQL backend. Batches are upserted with execute_values, large stats batches
+    are sent with COPY into a temporary table and upserted from there.
+    The database has to exist.
+    """
+
+    placeholder = "%s"
+
+    def __init__(self):
+        super().__init__()
+
+        from psycopg2.pool import ThreadedConnectionPool
+
+        self.pool = ThreadedConnectionPool(
+            1, db.POOL_SIZE, host=db.HOST, port=PG_PORT, user=db.USER, password=db.PSW, dbname=db.DB
+        )
+
+    def connect(self):
+        return self.pool.getconn()
+
+    def cursor(self, conn, name: str):
+        # A named cursor is a server-side cursor, the result isn't sent to the client at once
+        return conn.cursor(name=name)
+
+    def release(self, conn) -> None:
+        self.pool.putconn(conn)
+
+    def upsert(self, cur, table: str, columns: List[str], key: List[str], rows: List[List]) -> None:
+        if len(rows) >= PG_COPY_THRESHOLD:
+            return self.copy_upsert(cur, table, columns, key, rows)
+
+        from psycopg2.extras import execute_values
+
+        # execute_values expands the single %s into the rows of one multi-row statement
+        execute_values(cur, self.upsert_sql(table, columns, key, "%s"), rows)
+
+    def copy_upsert(self, cur, table: str, columns: List[str], key: List[str], rows: List[List]) -> None:
+        """Upsert rows by COPYing them into a temporary table dropped at commit."""
+        buffer = io.StringIO("".join(format_line(row) for row in rows))
+
+        cur.execute(f"CREATE TEMP TABLE {table}_copy (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP;")
+        cur.copy_expert(
+            f"COPY {table}_copy ( {', '.join(columns)} ) FROM STDIN WITH (FORMAT csv, NULL 'NULL');",
+            buffer,
+        )
+
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in key)
+        cur.execute(
+            f"INSERT INTO {table} ( {', '.join(columns)} ) SELECT {', '.join(columns)} FROM {table}_copy "
+            f"ON CONFLICT ( {', '.join(key)} ) DO UPDATE SET {updates};"
+        )
+
+
+def get_storage() -> Storage:
+    """Return the storage backend of the current process, selected by STORAGE_BACKEND."""
+    global _storage, _storage_pid
+
+    if _storage_pid != os.getpid():
+        backend = os.getenv("STORAGE_BACKEND", STORAGE_BACKEND)
+
+        if backend == "sqlite":
+            _storage = SQLiteStorage(os.getenv("SQLITE_PATH", SQLITE_PATH))
+        elif backend == "postgres":
+            _storage = PostgresStorage()
+        else:
+            _storage = MySQLStorage()
+
+        _storage_pid = os.getpid()
+
+    return _storage
+
+
+def set_storage(storage: Storage) -> None:
+    """Replace the storage backend of the current process."""
+    global _storage, _storage_pid
+
+    _storage = storage
+    _storage_pid = os.getpid()
@@ -0,0 +1,548 @@
+# task_queue.py
+"""Shared queue of league, squad and player tasks of a distributed crawl, selected by TASK_QUEUE:
+a MySQL table leased with SELECT ... FOR UPDATE SKIP LOCKED (default), Redis, or an in-process
+stand-in. Nodes lease tasks for TASK_LEASE seconds and heartbeat them, expired leases are re-queued."""
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import src.scraper.database as db
+from src.scraper.logger import get_logger
+
+my_logger = get_logger(__name__)
+
+# "mysql", "redis" or "memory"
+TASK_QUEUE = os.getenv("TASK_QUEUE", "mysql")
+
+# Redis server of the redis backend
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Seconds a leased task stays with its node without a heartbeat
+LEASE_SECONDS = int(os.getenv("TASK_LEASE", "300"))
+
+# A task whose lease expired this many times is given up on
+MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+
+# Kinds of tasks, in the order they are leased: discovery pages first so that players are published early
+KINDS = ["league", "squad", "player"]
+
+# Status of the tasks
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# Queue of the current process, created lazily (connections can't be shared across a fork)
+_queue = None
+_queue_pid = None
+
+
+class Task(NamedTuple):
+    url: str
+    kind: str
+    attempts: int
+
+
+class TaskQueue:
+    """Interface of the task queue backends. A URL is only ever published once."""
+
+    def reset(self, leagues: List[str]) -> bool:
+        """Start a new crawl: empty the queue and publish the leagues."""
+        raise NotImplementedError
+
+    def publish(self, urls: Iterable[str], kind: str) -> bool:
+        """Add tasks as pending, the URLs already in the queue are left untouched."""
+        raise NotImplementedError
+
+    def lease(self, node: str, limit: int, seconds: int = LEASE_SECONDS) -> List[Task]:
+        """
+        Lease at most limit pending tasks to a node.
+
+        Arguments:
+            node    -- unique name of the node
+            limit   -- maximum number of tasks returned
+            seconds -- duration of the lease
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, node: str, urls: List[str], seconds: int = LEASE_SECONDS) -> bool:
+        """Extend the leases the node still holds on the given tasks."""
+        raise NotImplementedError
+
+    def complete(self, node: str, url: str, children: List[str] = (), kind: str = None) -> bool:
+        """
+        Mark a task as done and publish what it discovered, if the node still holds its lease.
+
+        Arguments:
+            node     -- unique name of the node
+            url      -- URL of the task
+            children -- URLs found on its page (squads of a league, players of a squad)
+            kind     -- kind of the children
+        Returns:
+            False if the lease expired and the task was re-queued meanwhile (or the queue can't be
+            reached): the result is stale and must be dropped.
+        """
+        raise NotImplementedError
+
+    def fail(self, node: str, url: str) -> bool:
+        """Mark a task as failed if the node still holds its lease, returns False like complete otherwise."""
+        raise NotImplementedError
+
+    def requeue_expired(self, max_attempts: int = MAX_ATTEMPTS) -> Tuple[int, List[Task]]:
+        """
+        Put the tasks whose lease expired back in the queue.
+
+        Returns:
+            The number of re-queued tasks, and the tasks given up on after max_attempts leases.
+        """
+        raise NotImplementedError
+
+    def counts(self) -> Dict[str, int]:
+        """Number of tasks by status."""
+        raise NotImplementedError
+
+    def finished(self) -> bool:
+        """Tell whether a crawl was published and all its tasks are done or failed."""
+        counts = self.counts()
+
+        return counts[PENDING] + counts[LEASED] == 0 and counts[DONE] + counts[FAILED] > 0
+
+
+class MemoryQueue(TaskQueue):
+    """In-process queue, shared by the threads of a single process. Stand-in for the tests."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {kind: deque() for kind in KINDS}
+        # url -> kind, status, attempts, node and end of the lease of the task
+        self.tasks = {}
+
+    def reset(self, leagues: List[str]) -> bool:
+        with self.lock:
+            self.pending = {kind: deque() for kind in KINDS}
+            self.tasks = {}
+
+        return self.publish(leagues, "league")
+
+    def publish(self, urls: Iterable[str], kind: str) -> bool:
+        with self.lock:
+            self._publish(urls, kind)
+
+        return True
+
+    def lease(self, node: str, limit: int, seconds: int = LEASE_SECONDS) -> List[Task]:
+        leased = []
+
+        with self.lock:
+            for kind in KINDS:
+                while self.pending[kind] and len(leased) < limit:
+                    url = self.pending[kind].popleft()
+                    task = self.tasks[url]
+                    task.update(status=LEASED, attempts=task["attempts"] + 1, node=node, until=time.time() + seconds)
+                    leased.append(Task(url, kind, task["attempts"]))
+
+        return leased
+
+    def heartbeat(self, node: str, urls: List[str], seconds: int = LEASE_SECONDS) -> bool:
+        with self.lock:
+            for url in urls:
+                task = self.tasks.get(url)
+                if task is not None and task["status"] == LEASED and task["node"] == node:
+                    task["until"] = time.time() + seconds
+
+        return True
+
+    def complete(self, node: str, url: str, children: List[str] = (), kind: str = None) -> bool:
+        with self.lock:
+            if not self._holds(node, url):
+                return False
+
+            self._publish(children, kind)
+            self.tasks[url].update(status=DONE, node=None)
+
+        return True
+
+    def fail(self, node: str, url: str) -> bool:
+        with self.lock:
+            if not self._holds(node, url):
+                return False
+
+            self.tasks[url].update(status=FAILED, node=None)
+
+        return True
+
+    def requeue_expired(self, max_attempts: int = MAX_ATTEMPTS) -> Tuple[int, List[Task]]:
+        requeued, given_up = 0, []
+        now = time.time()
+
+        with self.lock:
+            for url, task in self.tasks.items():
+                if task["status"] != LEASED or task["until"] >= now:
+                    continue
+
+                if task["attempts"] >= max_attempts:
+                    task.update(status=FAILED, node=None)
+                    given_up.append(Task(url, task["kind"], task["attempts"]))
+                else:
+                    task.update(status=PENDING, node=None)
+                    self.pending[task["kind"]].append(url)
+                    requeued += 1
+
+        return requeued, given_up
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (PENDING, LEASED, DONE, FAILED)}
+
+        with self.lock:
+            for task in self.tasks.values():
+                counts[task["status"]] += 1
+
+        return counts
+
+    def _publish(self, urls: Iterable[str], kind: str) -> None:
+        for url in urls:
+            if url not in self.tasks:
+                self.tasks[url] = {"kind": kind, "status": PENDING, "attempts": 0, "node": None, "until": 0.0}
+                self.pending[kind].append(url)
+
+    def _holds(self, node: str, url: str) -> bool:
+        task = self.tasks.get(url)
+
+        return task is not None and task["status"] == LEASED and task["node"] == node
+
+
+class MySQLQueue(TaskQueue):
+    """
+    Queue in the crawl_tasks table of the MySQL database (MySQL 8 for SKIP LOCKED):
+    concurrent nodes lease disjoint tasks without waiting for each other's locks.
+    """
+
+    def run(self, name: str, work, default=False):
+        """Run work(cur) in a transaction over a pooled connection, committed if it doesn't raise."""
+        conn, cur = db.connect_to_pool()
+        res = default
+
+        try:
+            res = work(cur)
+            conn.commit()
+        except Exception as e:
+            res = default
+            if conn is not None:
+                conn.rollback()
+            my_logger.error(e)
+            my_logger.error(f"task_queue: {name}: Exception was raised by the MySQL task queue.")
+        finally:
+            db.close_db_connection(conn, cur)
+
+        return res
+
+    def reset(self, leagues: List[str]) -> bool:
+        def work(cur):
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS "
+                "crawl_tasks (url VARCHAR(255) NOT NULL, "
+                "kind VARCHAR(8) NOT NULL, "
+                "priority TINYINT NOT NULL, "
+                "status VARCHAR(8) NOT NULL, "
+                "attempts INT NOT NULL DEFAULT 0, "
+                "node VARCHAR(64), "
+                "lease_until TIMESTAMP NULL, "
+                "created TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6), "
+                "PRIMARY KEY(url), "
+                "INDEX(status, priority, created), "
+                "INDEX(status, lease_until));"
+            )
+            cur.execute("DELETE FROM crawl_tasks;")
+            self._publish(cur, leagues, "league")
+            return True
+
+        return self.run("reset", work)
+
+    def publish(self, urls: Iterable[str], kind: str) -> bool:
+        return self.run("publish", lambda cur: self._publish(cur, urls, kind) or True)
+
+    def lease(self, node: str, limit: int, seconds: int = LEASE_SECONDS) -> List[Task]:
+        def work(cur):
+            cur.execute(
+                "SELECT url, kind, attempts FROM crawl_tasks WHERE status = %s "
+                "ORDER BY priority, created LIMIT %s FOR UPDATE SKIP LOCKED;",
+                (PENDING, limit),
+            )
+            rows = cur.fetchall()
+
+            if rows:
+                placeholders = ", ".join(["%s"] * len(rows))
+                cur.execute(
+                    "UPDATE crawl_tasks SET status = %s, node = %s, attempts = attempts + 1, "
+                    f"lease_until = NOW() + INTERVAL %s SECOND WHERE url IN ( {placeholders} );",
+                    [LEASED, node, seconds] + [url for url, _, _ in rows],
+                )
+
+            return [Task(url, kind, attempts + 1) for url, kind, attempts in rows]
+
+        return self.run("lease", work, [])
+
+    def heartbeat(self, node: str, urls: List[str], seconds: int = LEASE_SECONDS) -> bool:
+        def work(cur):
+            if urls:
+                placeholders = ", ".join(["%s"] * len(urls))
+                cur.execute(
+                    "UPDATE crawl_tasks SET lease_until = NOW() + INTERVAL %s SECOND "
+                    f"WHERE status = %s AND node = %s AND url IN ( {placeholders} );",
+                    [seconds, LEASED, node] + list(urls),
+                )
+            return True
+
+        return self.run("heartbeat", work)
+
+    def complete(self, node: str, url: str, children: List[str] = (), kind: str = None) -> bool:
+        def work(cur):
+            if not self._finish(cur, node, url, DONE):
+                return False
+
+            self._publish(cur, children, kind)
+            return True
+
+        return self.run("complete", work)
+
+    def fail(self, node: str, url: str) -> bool:
+        return self.run("fail", lambda cur: self._finish(cur, node, url, FAILED))
+
+    def requeue_expired(self, max_attempts: int = MAX_ATTEMPTS) -> Tuple[int, List[Task]]:
+        def work(cur):
+            cur.execute(
+                "SELECT url, kind, attempts FROM crawl_tasks WHERE status = %s AND lease_until < NOW() "
+                "FOR UPDATE SKIP LOCKED;",
+                (LEASED,),
+            )
+            tasks = [Task(*row) for row in cur.fetchall()]
+            given_up = [task for task in tasks if task.attempts >= max_attempts]
+            requeued = [task for task in tasks if task.attempts < max_attempts]
+
+            for status, batch in ((FAILED, given_up), (PENDING, requeued)):
+                cur.executemany(
+                    "UPDATE crawl_tasks SET status = %s, node = NULL, lease_until = NULL WHERE url = %s;",
+                    [(status, task.url) for task in batch],
+                )
+
+            return len(requeued), given_up
+
+        return self.run("requeue_expired", work, (0, []))
+
+    def counts(self) -> Dict[str, int]:
+        def work(cur):
+            counts = {status: 0 for status in (PENDING, LEASED, DONE, FAILED)}
+            cur.execute("SELECT status, COUNT(*) FROM crawl_tasks GROUP BY status;")
+            for status, count in cur.fetchall():
+                counts[status] = count
+            return counts
+
+        return self.run("counts", work, {status: 0 for status in (PENDING, LEASED, DONE, FAILED)})
+
+    def _finish(self, cur, node: str, url: str, status: str) -> bool:
+        """Set the status of a task the node still holds the lease of, tell whether it did."""
+        cur.execute(
+            "UPDATE crawl_tasks SET status = %s, node = NULL, lease_until = NULL "
+            "WHERE url = %s AND node = %s AND status = %s;",
+            (status, url, node, LEASED),
+        )
+
+        return cur.rowcount > 0
+
+    def _publish(self, cur, urls: Iterable[str], kind: str) -> None:
+        rows = [(url, kind, KINDS.index(kind), PENDING) for url in urls]
+
+        if rows:
+            cur.executemany(
+                "INSERT IGNORE INTO crawl_tasks (url, kind, priority, status) VALUES (%s, %s, %s, %s);", rows
+            )
+
+
+# Publish URLs not seen yet. KEYS: kinds hash, pending list. ARGV: kind, urls...
+REDIS_PUBLISH = """
+for i = 2, #ARGV do
+    if redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[1]) == 1 then
+        redis.call('RPUSH', KEYS[2], ARGV[i])
+    end
+end
+return 1
+"""
+
+# Lease pending URLs. KEYS: pending lists in lease order, leases zset, nodes hash, attempts hash.
+# ARGV: limit, lease end, node. Returns the leased URLs.
+REDIS_LEASE = """
+local n = #KEYS
+local leased = {}
+for i = 1, n - 3 do
+    while #leased < tonumber(ARGV[1]) do
+        local url = redis.call('LPOP', KEYS[i])
+        if not url then break end
+        redis.call('ZADD', KEYS[n - 2], ARGV[2], url)
+        redis.call('HSET', KEYS[n - 1], url, ARGV[3])
+        redis.call('HINCRBY', KEYS[n], url, 1)
+        table.insert(leased, url)
+    end
+end
+return leased
+"""
+
+# Re-queue the expired leases. KEYS: leases zset, kinds hash, attempts hash, failed set, pending key prefix.
+# ARGV: now, max attempts. Returns the number of re-queued URLs and the URLs given up on.
+REDIS_REQUEUE = """
+local requeued = 0
+local given_up = {}
+for _, url in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])) do
+    redis.call('ZREM', KEYS[1], url)
+    if tonumber(redis.call('HGET', KEYS[3], url) or 0) >= tonumber(ARGV[2]) then
+        redis.call('SADD', KEYS[4], url)
+        table.insert(given_up, url)
+    else
+        redis.call('RPUSH', KEYS[5] .. redis.call('HGET', KEYS[2], url), url)
+        requeued = requeued + 1
+    end
+end
+return {requeued, given_up}
+"""
+
+
+# Finish a task if the node still holds its lease (the lease wasn't re-queued) and publish its children.
+# KEYS: leases zset, nodes hash, done or failed set, kinds hash, pending key prefix.
+# ARGV: url, node, kind of the children, children... Returns 1, or 0 if the lease was lost.
+REDIS_FINISH = """
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) or redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[1])
+for i = 4, #ARGV do
+    if redis.call('HSETNX', KEYS[4], ARGV[i], ARGV[3]) == 1 then
+        redis.call('RPUSH', KEYS[5] .. ARGV[3], ARGV[i])
+    end
+end
+return 1
+"""
+
+
+class RedisQueue(TaskQueue):
+    """
+    Queue in a Redis server: one pending list per kind, the leases in a sorted set by lease end,
+    done and failed tasks in sets. Leasing, finishing and re-queueing run as Lua scripts, atomically.
+    Needs the optional redis package.
+    """
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = "fbref:tasks"):
+        import redis
+
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.publish_script = self.redis.register_script(REDIS_PUBLISH)
+        self.lease_script = self.redis.register_script(REDIS_LEASE)
+        self.requeue_script = self.redis.register_script(REDIS_REQUEUE)
+        self.finish_script = self.redis.register_script(REDIS_FINISH)
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    def reset(self, leagues: List[str]) -> bool:
+        names = ["kinds", "leases", "nodes", "attempts", DONE, FAILED] + [f"{PENDING}:{kind}" for kind in KINDS]
+        self.redis.delete(*[self.key(name) for name in names])
+
+        return self.publish(leagues, "league")
+
+    def publish(self, urls: Iterable[str], kind: str) -> bool:
+        urls = list(urls)
+
+        if urls:
+            self.publish_script(keys=[self.key("kinds"), self.key(f"{PENDING}:{kind}")], args=[kind] + urls)
+
+        return True
+
+    def lease(self, node: str, limit: int, seconds: int = LEASE_SECONDS) -> List[Task]:
+        keys = [self.key(f"{PENDING}:{kind}") for kind in KINDS]
+        keys += [self.key("leases"), self.key("nodes"), self.key("attempts")]
+        urls = self.lease_script(keys=keys, args=[limit, time.time() + seconds, node])
+
+        if not urls:
+            return []
+
+        kinds = self.redis.hmget(self.key("kinds"), urls)
+        attempts = self.redis.hmget(self.key("attempts"), urls)
+
+        return [Task(url, kind, int(n)) for url, kind, n in zip(urls, kinds, attempts)]
+
+    def heartbeat(self, node: str, urls: List[str], seconds: int = LEASE_SECONDS) -> bool:
+        urls = list(urls)
+
+        if urls:
+            nodes = self.redis.hmget(self.key("nodes"), urls)
+            until = time.time() + seconds
+            leases = {url: until for url, owner in zip(urls, nodes) if owner == node}
+
+            if leases:
+                # XX: a lease that was re-queued meanwhile isn't re-created
+                self.redis.zadd(self.key("leases"), leases, xx=True)
+
+        return True
+
+    def complete(self, node: str, url: str, children: List[str] = (), kind: str = None) -> bool:
+        return self._finish(node, url, DONE, list(children), kind or "")
+
+    def fail(self, node: str, url: str) -> bool:
+        return self._finish(node, url, FAILED)
+
+    def requeue_expired(self, max_attempts: int = MAX_ATTEMPTS) -> Tuple[int, List[Task]]:
+        keys = [self.key("leases"), self.key("kinds"), self.key("attempts"), self.key(FAILED), self.key(f"{PENDING}:")]
+        requeued, urls = self.requeue_script(keys=keys, args=[time.time(), max_attempts])
+
+        if not urls:
+            return requeued, []
+
+        kinds = self.redis.hmget(self.key("kinds"), urls)
+
+        return requeued, [Task(url, kind, max_attempts) for url, kind in zip(urls, kinds)]
+
+    def counts(self) -> Dict[str, int]:
+        pipe = self.redis.pipeline()
+        for kind in KINDS:
+            pipe.llen(self.key(f"{PENDING}:{kind}"))
+        pipe.zcard(self.key("leases"))
+        pipe.scard(self.key(DONE))
+        pipe.scard(self.key(FAILED))
+        *pending, leased, done, failed = pipe.execute()
+
+        return {PENDING: sum(pending), LEASED: leased, DONE: done, FAILED: failed}
+
+    def _finish(self, node: str, url: str, status: str, children: List[str] = (), kind: str = "") -> bool:
+        keys = [self.key("leases"), self.key("nodes"), self.key(status), self.key("kinds"), self.key(f"{PENDING}:")]
+
+        return self.finish_script(keys=keys, args=[url, node, kind] + list(children)) == 1
+
+
+def get_queue() -> TaskQueue:
+    """Return the task queue of the current process, selected by TASK_QUEUE."""
+    global _queue, _queue_pid
+
+    if _queue_pid != os.getpid():
+        backend = os.getenv("TASK_QUEUE", TASK_QUEUE)
+
+        if backend == "redis":
+            _queue = RedisQueue(os.getenv("REDIS_URL", REDIS_URL))
+        elif backend == "memory":
+            _queue = MemoryQueue()
+        else:
+            _queue = MySQLQueue()
+
+        _queue_pid = os.getpid()
+
+    return _queue
+
+
+def set_queue(queue: TaskQueue) -> None:
+    """Replace the task queue of the current process."""
+    global _queue, _queue_pid
+
+    _queue = queue
+    _queue_pid = os.getpid()
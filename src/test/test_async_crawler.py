@@ -0,0 +1,159 @@
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase, TestCase, mock
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import src.scraper.async_crawler as async_crawler
+import src.scraper.database as db
+import src.scraper.dead_letter as dead_letter
+import src.scraper.metrics as metrics
+from src.scraper.async_crawler import crawl_async
+from src.scraper.cache import ResponseCache, set_cache
+from src.scraper.fingerprint import FingerprintIndex
+from src.scraper.rate_limit import set_limiter
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture_handler(name: str):
+    async def handler(request):
+        return web.FileResponse(os.path.join(FIXTURES, name))
+
+    return handler
+
+
+class TestAsyncCrawler(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        set_limiter(None)
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dead_letter_file = dead_letter.DEAD_LETTER_FILE
+        dead_letter.DEAD_LETTER_FILE = os.path.join(self.tmp.name, "dead_letter.jsonl")
+
+        # Paths of the requests received by the server
+        self.requests = []
+
+        @web.middleware
+        async def record(request, handler):
+            self.requests.append(request.path)
+            return await handler(request)
+
+        app = web.Application(middlewares=[record])
+        app.router.add_get("/en/comps/12/La-Liga-Stats", fixture_handler("league.html"))
+        app.router.add_get("/en/squads/{id}/{name}", fixture_handler("squad.html"))
+        app.router.add_get("/en/players/{id}/{name}", fixture_handler("player.html"))
+
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.base_url = str(self.server.make_url("")).rstrip("/")
+
+    async def asyncTearDown(self):
+        await self.server.close()
+        set_cache(None)
+
+        dead_letter.DEAD_LETTER_FILE = self.dead_letter_file
+        self.tmp.cleanup()
+
+    async def test_crawl(self):
+        players = await crawl_async(
+            ["/en/comps/12/La-Liga-Stats"],
+            ["stats_standard_dom_lg"],
+            base_url=self.base_url,
+            concurrency=2,
+            processes=1,
+            store=False,
+        )
+
+        # Two squads with the same two players each, every player is scraped once
+        self.assertEqual(sorted(players), ["0d9b2d31", "1840e36d"])
+
+    async def test_crawl_records_stages(self):
+        # A host name, IP addresses aren't resolved
+        base_url = self.base_url.replace("127.0.0.1", "localhost")
+
+        await crawl_async(
+            ["/en/comps/12/La-Liga-Stats"], ["stats_standard_dom_lg"], base_url=base_url, concurrency=1,
+            processes=1, store=False,
+        )
+
+        registry = metrics.get_registry()
+        requests = registry.counters["requests"]
+
+        # A single keep-alive connection for all the requests
+        self.assertEqual(registry.histograms["http.connect"].count, 1)
+        self.assertEqual(registry.histograms["http.dns"].count, 1)
+        self.assertEqual(registry.histograms["http.ttfb"].count, requests)
+        self.assertEqual(registry.histograms["http.body"].count, requests)
+
+    async def test_crawl_missing_league(self):
+        players = await crawl_async(
+            ["/en/comps/99/Missing-Stats"],
+            ["stats_standard_dom_lg"],
+            base_url=self.base_url,
+            processes=1,
+            store=False,
+        )
+
+        self.assertEqual(players, [])
+        self.assertEqual(
+            [(entry["url"], entry["kind"]) for entry in dead_letter.load()],
+            [("/en/comps/99/Missing-Stats", "league")],
+        )
+
+    async def test_crawl_offline(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        set_cache(ResponseCache(cache_dir))
+        await crawl_async(
+            ["/en/comps/12/La-Liga-Stats"], ["stats_standard_dom_lg"], base_url=self.base_url, processes=1, store=False
+        )
+        requests = len(self.requests)
+
+        set_cache(ResponseCache(cache_dir, offline=True))
+        players = await crawl_async(
+            ["/en/comps/12/La-Liga-Stats", "/en/comps/20/Bundesliga-Stats"],
+            ["stats_standard_dom_lg"],
+            base_url=self.base_url,
+            processes=1,
+            store=False,
+        )
+
+        # Only the cached pages are crawled, without a request
+        self.assertEqual(sorted(players), ["0d9b2d31", "1840e36d"])
+        self.assertEqual(len(self.requests), requests)
+
+
+class TestIncrementalParse(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = FingerprintIndex(os.path.join(self.tmp.name, "fingerprints.sqlite"))
+        self.written = []
+
+        def write(players, done):
+            self.written.extend(players)
+            return True
+
+        writer = db.BatchWriter(on_commit=async_crawler.record_fingerprints, write=write)
+
+        for name, value in (("writer", writer), ("index", self.index), ("schemas", mock.MagicMock())):
+            patcher = mock.patch.object(async_crawler, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_unchanged_players_are_not_written(self):
+        with open(os.path.join(FIXTURES, "player.html"), encoding="utf-8") as f:
+            html = f.read()
+
+        for _ in range(2):
+            async_crawler.parse_player("/en/players/0d9b2d31/Pedri", html, ["stats_standard_dom_lg"])
+
+        self.assertEqual(len(self.written), 1)
+        self.assertEqual(async_crawler.pending, {})
@@ -0,0 +1,66 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+import src.scraper.bulk_load as bulk_load
+from src.scraper.rows import StatsRow
+
+INFO = {"id": "0d9b2d31", "name": 'Pedri "Pedrito"', "height": 174, "club": "Barcelona"}
+
+STATS = [StatsRow.from_dict(row) for row in [
+    {"table": "standard", "id": "0d9b2d31", "season": "2020-2021", "team": "Barcelona",
+     "country": "es ESP", "comp_level": "1. La Liga", "minutes": "2,661"},
+    {"table": "shooting", "id": "0d9b2d31", "season": "2020-2021", "team": "Barcelona", "shots": "38"},
+]]
+
+TABLES = [["standard", "age", "team", "country", "comp_level", "lg_finish", "games", "minutes"]]
+
+
+class TestStagingWriter(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.committed = []
+        self.writer = bulk_load.StagingWriter(TABLES, self.tmp.name, on_commit=self.committed.extend)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, table):
+        with open(os.path.join(self.tmp.name, f"{table}.{os.getpid()}.csv"), encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def test_rows_are_staged_per_table(self):
+        self.writer.add(INFO, STATS, key="/en/players/0d9b2d31/Pedri")
+        self.writer.flush()
+
+        self.assertEqual(self.committed, ["/en/players/0d9b2d31/Pedri"])
+        self.assertEqual(
+            self.read("info"),
+            [
+                "id,name,height,weight,dob,countryob,club,age",
+                '"0d9b2d31","Pedri ""Pedrito""",174,NULL,NULL,NULL,"Barcelona",NULL',
+            ],
+        )
+        self.assertEqual(
+            self.read("standard"),
+            [
+                "id,season,squad,country,comp_level,lg_finish,age,games,minutes",
+                '"0d9b2d31","2020-2021","Barcelona","ESP","1. La Liga",NULL,NULL,NULL,2661.0',
+            ],
+        )
+        self.assertEqual(list(bulk_load.staging_files(self.tmp.name)), ["info", "standard"])
+
+    def test_load_swaps_staged_tables(self):
+        self.writer.add(INFO, STATS)
+        self.writer.flush()
+
+        with mock.patch.object(bulk_load.db, "load_staging_table", return_value=True) as load_table, \
+                mock.patch.object(bulk_load.db, "swap_staging_tables", return_value=True) as swap:
+            self.assertTrue(bulk_load.load(self.tmp.name))
+
+        self.assertEqual([call.args[0] for call in load_table.call_args_list], ["info", "standard"])
+        self.assertEqual(load_table.call_args_list[1].args[2][0][:3], ["id", "season", "squad"])
+        swap.assert_called_once_with(["standard"])
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, mock
+from urllib.error import URLError
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from src.scraper.cache import ResponseCache, get_cache, set_cache
+from src.scraper.rate_limit import set_limiter
+from src.scraper.requests import fetch
+
+PAGE = b"<html><body><table></table></body></html>"
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # Status codes of the responses sent by the server
+    statuses = []
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            ETagHandler.statuses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            return
+
+        ETagHandler.statuses.append(200)
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestResponseCache(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmp.name, ttl=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_get(self):
+        self.assertIsNone(self.cache.get("https://fbref.com/a"))
+
+        self.cache.put("https://fbref.com/a", PAGE, {"ETag": '"v1"'})
+        page = self.cache.get("https://fbref.com/a")
+
+        self.assertEqual(page.body, PAGE)
+        self.assertEqual(page.etag, '"v1"')
+        self.assertTrue(self.cache.is_fresh(page))
+
+    def test_ttl(self):
+        self.cache.ttl = 0
+        self.cache.put("https://fbref.com/a", PAGE, {})
+
+        self.assertFalse(self.cache.is_fresh(self.cache.get("https://fbref.com/a")))
+
+    def test_evicts_least_recently_used(self):
+        for index in range(3):
+            self.cache.put(f"https://fbref.com/{index}", PAGE * 100, {})
+            os.utime(self.cache.paths(f"https://fbref.com/{index}")[0], (index, index))
+
+        # Reading a page makes it the most recently used one
+        self.cache.get("https://fbref.com/0")
+        self.cache.max_bytes = self.cache.disk_usage() - 1
+        self.cache.evict()
+
+        self.assertIsNotNone(self.cache.get("https://fbref.com/0"))
+        self.assertIsNone(self.cache.get("https://fbref.com/1"))
+        self.assertIsNotNone(self.cache.get("https://fbref.com/2"))
+
+
+class TestCachedFetch(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/en/players/0d9b2d31/Pedri"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        ETagHandler.statuses.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmp.name, ttl=60)
+        set_cache(self.cache)
+        set_limiter(None)
+
+    def tearDown(self):
+        set_cache(None)
+        self.tmp.cleanup()
+
+    def test_fresh_page_is_not_downloaded(self):
+        self.assertEqual(fetch(self.url), PAGE)
+        self.assertEqual(fetch(self.url), PAGE)
+
+        self.assertEqual(ETagHandler.statuses, [200])
+
+    def test_stale_page_is_revalidated(self):
+        fetch(self.url)
+        self.cache.ttl = 0
+
+        self.assertEqual(fetch(self.url), PAGE)
+        self.assertEqual(ETagHandler.statuses, [200, 304])
+
+        # The 304 refreshed the page
+        self.cache.ttl = 60
+        self.assertTrue(self.cache.is_fresh(self.cache.get(self.url)))
+
+    def test_offline(self):
+        fetch(self.url)
+        self.cache.offline = True
+        self.cache.ttl = 0
+
+        self.assertEqual(fetch(self.url), PAGE)
+        self.assertRaises(URLError, fetch, self.url + "-missing")
+        self.assertEqual(ETagHandler.statuses, [200])
+
+    def test_offline_without_directory(self):
+        env = {"CACHE_OFFLINE": "1", "CACHE_DIR": ""}
+
+        with mock.patch.dict(os.environ, env), mock.patch("src.scraper.cache.CACHE_DIR", None):
+            # Reloaded from the environment by the next call
+            with mock.patch("src.scraper.cache._cache_pid", None):
+                self.assertTrue(get_cache().offline)
+                self.assertRaises(URLError, fetch, self.url)
+
+        self.assertEqual(ETagHandler.statuses, [])
@@ -1,10 +1,12 @@
 import os
-from unittest import TestCase
+import threading
+from unittest import TestCase, mock
 from dotenv import load_dotenv
 
 load_dotenv(".env.test")
 
 import src.scraper.database as db
+from src.scraper.rows import StatsRow
 
 # Test DB
 DB = os.getenv("DATABASE")
@@ -57,12 +59,12 @@ player_tables = [
     ]
 ]
 
-player_stats = [{'table': 'standard', 'id': '0d9b2d31', 'season': '2007-2008', 'age': '17', 'team': 'Bayern Munich',
+player_stats = [StatsRow.from_dict(row) for row in [{'table': 'standard', 'id': '0d9b2d31', 'season': '2007-2008', 'age': '17', 'team': 'Bayern Munich',
                  'country': 'de GER', 'comp_level': '1. Bundesliga', 'lg_finish': '1st', 'games': '12',
                  'games_starts': '3', 'minutes': '361', 'minutes_90s': '4.0', 'goals': '0', 'assists': '0',
                  'goals_pens': '0', 'pens_made': '0', 'pens_att': '0', 'cards_yellow': '0', 'cards_red': '0',
                  'goals_per90': '0.00', 'assists_per90': '0.00', 'goals_assists_per90': '0.00',
-                 'goals_pens_per90': '0.00', 'goals_assists_pens_per90': '0.00'}]
+                 'goals_pens_per90': '0.00', 'goals_assists_pens_per90': '0.00'}]]
 
 
 class TestConnection(TestCase):
@@ -148,7 +150,7 @@ class TestStats(TestCase):
         # Create Standard table
         db.create_stats_tables(player_tables)
 
-        res = db.select_stats(player_info["id"], player_stats[0]["table"])
+        res = db.select_stats(player_info["id"], player_stats[0].table)
 
         self.assertIsNotNone(res)
 
@@ -160,5 +162,243 @@ class TestStats(TestCase):
         # Create Standard table
         db.create_stats_tables(player_tables)
 
-        self.assertIsNotNone(db.select_stats_all(player_stats[0]["table"]))
+        self.assertIsNotNone(db.select_stats_all(player_stats[0].table))
 
+
+
+class RecordingCursor:
+    """Stand-in cursor that records the statements it is asked to run."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, [params]))
+
+    def executemany(self, sql, seq_params):
+        self.statements.append((sql, list(seq_params)))
+
+
+class TestBatchedStats(TestCase):
+    def test_upsert_stats_single_statement_per_table(self):
+        cur = RecordingCursor()
+        rows = player_stats + [player_stats[0].replace(season="2008-2009", minutes=1204.0)]
+
+        db._upsert_stats(cur, rows)
+
+        self.assertEqual(len(cur.statements), 1)
+        sql, params = cur.statements[0]
+        self.assertTrue(sql.startswith("INSERT INTO standard"))
+        self.assertIn("ON DUPLICATE KEY UPDATE", sql)
+        self.assertEqual(len(params), 2)
+        self.assertEqual(params[0][:4], ["0d9b2d31", "2007-2008", "Bayern Munich", "GER"])
+        self.assertIn(1204.0, params[1])
+
+    def test_upsert_stats_missing_cells_are_null(self):
+        cur = RecordingCursor()
+        row = player_stats[0].replace(goals=None)
+
+        db._upsert_stats(cur, [player_stats[0], row])
+
+        sql, params = cur.statements[0]
+        columns = sql[sql.index("(") + 1 : sql.index(")")].split(", ")
+        goals = [c.strip() for c in columns].index("goals")
+        self.assertEqual(params[0][goals], 0.0)
+        self.assertIsNone(params[1][goals])
+
+
+class TestStatsTables(TestCase):
+    def test_metric_types(self):
+        self.assertEqual(db.metric_type("goals"), "SMALLINT")
+        self.assertEqual(db.metric_type("minutes_90s"), "DECIMAL(7,2)")
+        self.assertEqual(db.metric_type("goals_assists_per90"), "DECIMAL(7,2)")
+        self.assertEqual(db.metric_type("npxg_xg_assist"), "DECIMAL(7,2)")
+        self.assertEqual(db.metric_type("passes_pct"), "DECIMAL(7,2)")
+        self.assertEqual(db.metric_type("passes_total_distance"), "INT")
+        self.assertEqual(db.metric_type("average_shot_distance"), "DECIMAL(7,2)")
+
+    def test_all_tables_created_over_one_connection(self):
+        cur = RecordingCursor()
+        tables = player_tables + [["shooting", "team", "shots", "xg", "average_shot_distance"]]
+
+        with mock.patch.object(db, "connect_to_db", return_value=(None, cur)) as connect, mock.patch.object(
+            db, "close_db_connection"
+        ):
+            self.assertTrue(db.create_stats_tables(tables))
+
+        connect.assert_called_once()
+        self.assertEqual(len(cur.statements), 2)
+        shooting = cur.statements[1][0]
+        self.assertIn("shots SMALLINT, xg DECIMAL(7,2), average_shot_distance DECIMAL(7,2)", shooting)
+        self.assertNotIn("team", shooting)
+        self.assertIn("INDEX (season), INDEX (squad)", shooting)
+
+
+class TestAddColumns(TestCase):
+    class AlteredCursor(mock.MagicMock):
+        """Cursor of a table another worker adds the "xg" column to before our ALTER TABLE."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.columns = ["id", "season", "goals"]
+            self.altered = []
+
+        @property
+        def description(self):
+            return [(column,) for column in self.columns]
+
+        def execute(self, sql, params=None):
+            if sql.startswith("ALTER TABLE"):
+                if "xg" not in self.columns:
+                    self.columns.append("xg")
+                    raise db.mysql.connector.ProgrammingError(msg="Duplicate column name 'xg'", errno=1060)
+                self.altered.append(sql)
+
+    def test_missing_columns_are_retried_after_a_duplicate(self):
+        cur = self.AlteredCursor()
+
+        with mock.patch.object(db, "connect_to_pool", return_value=(mock.MagicMock(), cur)), mock.patch.object(
+            db, "close_db_connection"
+        ):
+            self.assertTrue(db.add_columns("shooting", ["goals", "xg", "shots"]))
+
+        self.assertEqual(cur.altered, ["ALTER TABLE shooting ADD COLUMN shots SMALLINT;"])
+
+
+class TestWriteTable(TestCase):
+    COLUMNS = {"id": "VARCHAR(8)", "goals_per90": "FLOAT"}
+
+    def test_rebuild_is_swapped_in(self):
+        cur = RecordingCursor()
+
+        with mock.patch.object(db, "connect_to_pool", return_value=(mock.MagicMock(), cur)), mock.patch.object(
+            db, "close_db_connection"
+        ):
+            self.assertTrue(db.write_table("standard_career", self.COLUMNS, ["id"], [("0d9b2d31", 0.3)]))
+
+        statements = [sql for sql, _ in cur.statements]
+        self.assertTrue(statements[3].startswith("INSERT INTO standard_career_new"))
+        self.assertEqual(
+            statements[-2],
+            "RENAME TABLE standard_career TO standard_career_old, standard_career_new TO standard_career;",
+        )
+        self.assertNotIn("DROP TABLE IF EXISTS standard_career;", statements)
+
+    def test_failed_rebuild_keeps_the_table(self):
+        cur = mock.MagicMock()
+        cur.executemany.side_effect = db.mysql.connector.DataError("out of range")
+
+        with mock.patch.object(db, "connect_to_pool", return_value=(mock.MagicMock(), cur)), mock.patch.object(
+            db, "close_db_connection"
+        ):
+            self.assertFalse(db.write_table("standard_career", self.COLUMNS, ["id"], [("0d9b2d31", 0.3)]))
+
+        statements = [call.args[0] for call in cur.execute.call_args_list]
+        self.assertFalse(any("RENAME" in sql or sql.startswith("DROP TABLE standard_career") for sql in statements))
+
+
+class TestStagingTables(TestCase):
+    def test_foreign_keys_are_added_before_the_swap(self):
+        cur = RecordingCursor()
+
+        with mock.patch.object(db, "connect_to_db", return_value=(mock.MagicMock(), cur)), mock.patch.object(
+            db, "close_db_connection"
+        ):
+            self.assertTrue(db.swap_staging_tables(["standard"]))
+
+        statements = [sql for sql, _ in cur.statements]
+        self.assertTrue(statements[0].startswith("ALTER TABLE standard_staging ADD FOREIGN KEY(id)"))
+        self.assertIn("REFERENCES info_staging(id)", statements[0])
+        self.assertTrue(statements[1].startswith("RENAME TABLE"))
+        self.assertEqual(statements[2:], ["DROP TABLE standard_old;", "DROP TABLE info_old;"])
+
+    def test_orphan_rows_keep_the_old_tables(self):
+        cur = mock.MagicMock()
+        cur.execute.side_effect = db.mysql.connector.IntegrityError("foreign key constraint fails")
+
+        with mock.patch.object(db, "connect_to_db", return_value=(mock.MagicMock(), cur)), mock.patch.object(
+            db, "close_db_connection"
+        ):
+            self.assertFalse(db.swap_staging_tables(["standard"]))
+
+        cur.execute.assert_called_once()
+
+
+class TestReader(TestCase):
+    def test_id_batches(self):
+        self.assertEqual(list(db.id_batches(["a", "b", "a", "c"], 8)), [["a", "b", "c", "c"]])
+        self.assertEqual(list(db.id_batches(["a", "b", "c"], 2)), [["a", "b"], ["c"]])
+        self.assertEqual(list(db.id_batches(["a", "b", "c", "d", "e"], 6)), [["a", "b", "c", "d", "e", "e"]])
+        self.assertEqual(list(db.id_batches([])), [])
+
+    def test_statements_are_prepared_once(self):
+        conn = mock.MagicMock()
+        conn.cursor.side_effect = lambda prepared: mock.MagicMock()
+
+        with mock.patch.object(db.mysql.connector, "connect", return_value=conn) as connect:
+            reader = db.Reader()
+            reader.query("SELECT * FROM info WHERE id = %s;", ["0d9b2d31"])
+            reader.query("SELECT * FROM info WHERE id = %s;", ["1840e36d"])
+            reader.query("SELECT * FROM info;")
+
+        connect.assert_called_once()
+        self.assertEqual(conn.cursor.call_count, 2)
+        cur = reader.statements["SELECT * FROM info WHERE id = %s;"]
+        cur.execute.assert_called_with("SELECT * FROM info WHERE id = %s;", ("1840e36d",))
+
+    def test_lost_connection_is_reopened(self):
+        lost, conn = mock.MagicMock(), mock.MagicMock()
+        lost.cursor.return_value.execute.side_effect = db.mysql.connector.OperationalError("gone away")
+        conn.cursor.return_value.fetchall.return_value = [(player_info["id"],)]
+
+        with mock.patch.object(db.mysql.connector, "connect", side_effect=[lost, conn]):
+            self.assertEqual(db.Reader().query("SELECT id FROM info;"), [("0d9b2d31",)])
+
+        lost.close.assert_called_once()
+
+    def test_select_stats_many(self):
+        reader = mock.MagicMock()
+        reader.query.return_value = [("0d9b2d31", "2020-2021"), ("0d9b2d31", "2021-2022")]
+
+        with mock.patch.object(db, "get_reader", return_value=reader):
+            res = db.select_stats_many(["0d9b2d31", "1840e36d"], "standard")
+
+        reader.query.assert_called_once_with(
+            "SELECT * FROM standard WHERE id IN ( %s, %s );", ["0d9b2d31", "1840e36d"]
+        )
+        self.assertEqual(len(res["0d9b2d31"]), 2)
+        self.assertEqual(res["1840e36d"], [])
+
+    def test_readers_are_per_thread(self):
+        readers = []
+        thread = threading.Thread(target=lambda: readers.append(db.get_reader()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(db.get_reader(), db.get_reader())
+        self.assertIsNot(readers[0], db.get_reader())
+
+
+class TestFrontier(TestCase):
+    def test_batch_marks_players_done(self):
+        writer = db.BatchWriter(2, mark_done=True)
+
+        with mock.patch.object(db, "add_players", return_value=True) as add_players:
+            writer.add(player_info, player_stats, key="/en/players/0d9b2d31/Pedri")
+            writer.add(None, [], key="/en/players/1840e36d/Thibaut-Courtois")
+
+        add_players.assert_called_once_with(
+            [(player_info, player_stats), (None, [])],
+            ["/en/players/0d9b2d31/Pedri", "/en/players/1840e36d/Thibaut-Courtois"],
+        )
+
+    def test_frontier_statements(self):
+        cur = RecordingCursor()
+
+        db._add_to_frontier(cur, ["/en/players/0d9b2d31/Pedri"], "player")
+        db._set_frontier_status(cur, [], db.DONE)
+        db._set_frontier_status(cur, ["/en/squads/206d90db/Barcelona-Stats"], db.DONE)
+
+        self.assertEqual(len(cur.statements), 2)
+        self.assertTrue(cur.statements[0][0].startswith("INSERT IGNORE INTO crawl_frontier"))
+        self.assertEqual(cur.statements[1][1], [("done", "/en/squads/206d90db/Barcelona-Stats")])
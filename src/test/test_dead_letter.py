@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+from urllib.error import HTTPError
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+import src.scraper.dead_letter as dead_letter
+import src.scraper.requests as requests
+from src.scraper.cache import set_cache
+from src.scraper.rate_limit import set_limiter
+
+PAGE = b"<html><body><table></table></body></html>"
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # Number of requests received per path
+    hits = {}
+
+    def do_GET(self):
+        hits = FlakyHandler.hits[self.path] = FlakyHandler.hits.get(self.path, 0) + 1
+
+        if self.path == "/missing":
+            status, body = 404, b""
+        elif self.path == "/flaky" and hits < 3:
+            status, body = 503, b""
+        else:
+            status, body = 200, PAGE
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDeadLetter(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "dead_letter.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_load(self):
+        dead_letter.add("/en/players/0d9b2d31/Pedri", "player", "timeout", path=self.path)
+        dead_letter.add("/en/squads/206d90db/Barcelona-Stats", "squad", "404", path=self.path)
+        dead_letter.add("/en/players/0d9b2d31/Pedri", "player", "503", path=self.path)
+
+        entries = dead_letter.load(self.path)
+
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]["error"], "503")
+
+    def test_prune(self):
+        dead_letter.add("/en/players/0d9b2d31/Pedri", "player", "timeout", path=self.path)
+        start = time.time()
+        dead_letter.add("/en/players/1840e36d/Thibaut-Courtois", "player", "timeout", path=self.path)
+
+        dead_letter.prune(before=start, path=self.path)
+
+        self.assertEqual(
+            [entry["url"] for entry in dead_letter.load(self.path)],
+            ["/en/players/1840e36d/Thibaut-Courtois"],
+        )
+
+    def test_load_missing_file(self):
+        self.assertEqual(dead_letter.load(self.path), [])
+
+
+class TestRetries(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FlakyHandler.hits.clear()
+        set_cache(None)
+        set_limiter(None)
+        self.backoff_base = requests.BACKOFF_BASE
+        requests.BACKOFF_BASE = 0.01
+
+    def tearDown(self):
+        requests.BACKOFF_BASE = self.backoff_base
+
+    def test_transient_errors_are_retried(self):
+        self.assertEqual(requests.fetch_with_retries(f"{self.base_url}/flaky"), PAGE)
+        self.assertEqual(FlakyHandler.hits["/flaky"], 3)
+
+    def test_permanent_errors_are_not_retried(self):
+        self.assertRaises(HTTPError, requests.fetch_with_retries, f"{self.base_url}/missing")
+        self.assertEqual(FlakyHandler.hits["/missing"], 1)
+
+    def test_backoff_delay(self):
+        for attempt in range(10):
+            self.assertLessEqual(requests.backoff_delay(attempt), requests.BACKOFF_MAX)
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from src.scraper.rows import StatsRow
+from src.scraper.storage import SQLiteStorage
+
+try:
+    import src.scraper.derived as derived
+except ImportError:
+    derived = None
+
+TABLES = [["standard", "age", "team", "country", "comp_level", "lg_finish", "games", "minutes", "goals"]]
+
+PEDRI = [
+    ("2019-2020", "Las Palmas", "16", "2,700", "4"),
+    ("2020-2021", "Barcelona", "17", "1,800", "2"),
+    ("2021-2022", "Barcelona", "18", "900", "3"),
+    ("2022-2023", "Barcelona", "19", "1,800", "6"),
+]
+
+
+def stats_rows(player_id, seasons):
+    return [
+        StatsRow.from_dict(
+            {"table": "standard", "id": player_id, "season": season, "team": team, "age": age,
+             "minutes": minutes, "goals": goals}
+        )
+        for season, team, age, minutes, goals in seasons
+    ]
+
+
+@unittest.skipIf(derived is None, "pandas is not installed")
+class TestDerivedMetrics(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.tmp.name, "fbref.sqlite"))
+        self.storage.create_schema(TABLES)
+        self.storage.add_players(
+            [
+                ({"id": "0d9b2d31", "name": "Pedri"}, stats_rows("0d9b2d31", PEDRI)),
+                ({"id": "1840e36d", "name": "Courtois"}, stats_rows("1840e36d", [("2020-2021", "Real Madrid", "28", "3,420", "")])),
+            ]
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def select(self, table, player_id):
+        return self.storage.select_stats(player_id, table)
+
+    def test_derive(self):
+        self.assertTrue(derived.derive(["standard"], storage=self.storage))
+
+        per90 = self.select("standard_per90", "0d9b2d31")
+        self.assertEqual(per90[0][:3], ("0d9b2d31", "2019-2020", "Las Palmas"))
+        self.assertAlmostEqual(per90[3][-1], 0.3)
+
+        # 2022-2023 form covers the last 3 seasons: 11 goals in 4,500 minutes
+        form = self.select("standard_form", "0d9b2d31")
+        self.assertEqual(form[3][:3], ("0d9b2d31", "2022-2023", 4500.0))
+        self.assertAlmostEqual(form[3][-1], 11 * 90 / 4500)
+
+        career = self.select("standard_career", "0d9b2d31")
+        self.assertEqual(career[0][:4], ("0d9b2d31", 4, "2019-2020", "2022-2023"))
+
+        _, ages = next(self.storage.select_chunks("standard_age_curve", 100))
+        self.assertEqual([row[0] for row in ages], [16, 17, 18, 19, 28])
+
+    def test_derive_touched_players(self):
+        derived.derive(["standard"], storage=self.storage)
+        self.storage.add_players([(None, stats_rows("0d9b2d31", [("2022-2023", "Barcelona", "19", "1,800", "9")]))])
+
+        self.assertTrue(derived.derive(["standard"], ["0d9b2d31"], storage=self.storage))
+
+        self.assertAlmostEqual(self.select("standard_per90", "0d9b2d31")[3][-1], 0.45)
+        self.assertEqual(len(self.select("standard_career", "1840e36d")), 1)
+
+    def test_derive_table_without_minutes(self):
+        shooting = [["shooting", "age", "team", "country", "comp_level", "lg_finish", "minutes_90s", "shots"]]
+        self.storage.create_schema(shooting)
+        self.storage.add_players(
+            [(None, [StatsRow.from_dict(
+                {"table": "shooting", "id": "0d9b2d31", "season": "2019-2020", "team": "Las Palmas",
+                 "age": "16", "minutes_90s": "30.0", "shots": "60"}
+            )])]
+        )
+
+        self.assertTrue(derived.derive(["shooting"], storage=self.storage))
+
+        # Minutes of the standard row of the same season and squad: 60 shots in 2,700 minutes
+        per90 = self.select("shooting_per90", "0d9b2d31")
+        self.assertAlmostEqual(per90[0][-1], 2.0)
+        self.assertEqual(self.select("shooting_career", "0d9b2d31")[0][6], 2700.0)
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from src.scraper.rows import StatsRow
+from src.scraper.storage import SQLiteStorage
+
+try:
+    import src.scraper.export as export
+except ImportError:
+    export = None
+
+TABLES = [["standard", "age", "team", "country", "comp_level", "lg_finish", "games", "minutes", "goals"]]
+
+INFO = {"id": "0d9b2d31", "name": "Pedri", "height": 174, "club": "Barcelona"}
+
+SEASONS = ["2019-2020", "2020-2021", "2021-2022", "2022-2023", "2023-2024"]
+
+
+@unittest.skipIf(export is None, "pandas is not installed")
+class TestExport(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.tmp.name, "fbref.sqlite"))
+        self.storage.create_schema(TABLES)
+
+        stats = [
+            StatsRow.from_dict(
+                {"table": "standard", "id": "0d9b2d31", "season": season, "team": "Barcelona",
+                 "games": str(30 + i), "minutes": "2,661" if i else ""}
+            )
+            for i, season in enumerate(SEASONS)
+        ]
+        self.storage.add_players([(INFO, stats)])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_table_in_chunks(self):
+        frame = export.read_table("standard", chunk_size=2, storage=self.storage)
+
+        self.assertEqual(len(frame), 5)
+        self.assertEqual(frame["games"].dtype, "float32")
+        self.assertEqual(frame["games"].sum(), 160)
+        self.assertTrue(frame["minutes"].isna()[0])
+        self.assertEqual(frame["season"].dtype, "category")
+
+    def test_read_all(self):
+        frames = export.read_all(["standard"], storage=self.storage)
+
+        self.assertEqual(list(frames), ["info", "standard"])
+        self.assertEqual(frames["info"]["height"].dtype, "Int32")
+        self.assertTrue(frames["info"]["weight"].isna()[0])
+        self.assertEqual(frames["info"]["name"][0], "Pedri")
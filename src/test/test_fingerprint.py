@@ -0,0 +1,64 @@
+import os
+import tempfile
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from src.scraper.fingerprint import FingerprintIndex
+from src.scraper.rows import StatsRow
+
+INFO = {"id": "0d9b2d31", "name": "Pedri", "club": "Barcelona", "age": 20}
+
+STATS = [
+    StatsRow.from_dict(row)
+    for row in [
+        {"table": "standard", "id": "0d9b2d31", "season": "2020-2021", "team": "Barcelona", "minutes": "2,661"},
+        {"table": "standard", "id": "0d9b2d31", "season": "2021-2022", "team": "Barcelona", "minutes": "1,357"},
+    ]
+]
+
+
+class TestFingerprintIndex(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = FingerprintIndex(os.path.join(self.tmp.name, "fingerprints.sqlite"))
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_new_player_is_written(self):
+        delta = self.index.delta(INFO, STATS)
+
+        self.assertEqual(delta.info, INFO)
+        self.assertEqual(delta.stats, STATS)
+        self.assertEqual(delta.last_season, "2021-2022")
+        self.assertIsNone(self.index.last_season("0d9b2d31"))
+
+    def test_unchanged_player_is_skipped(self):
+        self.index.record(self.index.delta(INFO, STATS))
+
+        self.assertTrue(self.index.delta(dict(INFO), [row.replace() for row in STATS]).unchanged())
+        self.assertEqual(self.index.last_season("0d9b2d31"), "2021-2022")
+
+    def test_only_changed_rows_are_written(self):
+        self.index.record(self.index.delta(INFO, STATS))
+
+        current = STATS[1].replace(minutes=1450.0)
+        delta = self.index.delta(INFO, [STATS[0], current])
+
+        self.assertIsNone(delta.info)
+        self.assertEqual(delta.stats, [current])
+
+        self.index.record(delta)
+
+        self.assertTrue(self.index.delta(INFO, [STATS[0], current]).unchanged())
+
+    def test_changed_info_is_written(self):
+        self.index.record(self.index.delta(INFO, STATS))
+
+        delta = self.index.delta(dict(INFO, club="Real Madrid"), STATS)
+
+        self.assertEqual(delta.info["club"], "Real Madrid")
+        self.assertEqual(delta.stats, [])
@@ -0,0 +1,91 @@
+import gzip
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from src.scraper.http_client import HttpClient
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+with open(os.path.join(FIXTURES, "player.html"), "rb") as f:
+    PLAYER_PAGE = f.read()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # Remote ports of the connections the server accepted
+    connections = set()
+
+    def do_GET(self):
+        FixtureHandler.connections.add(self.client_address[1])
+
+        if self.path == "/redirect":
+            self.send_response(301)
+            self.send_header("Location", "/en/players/0d9b2d31/Pedri")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = PLAYER_PAGE
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpClient(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FixtureHandler.connections.clear()
+        self.client = HttpClient()
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_decodes_gzip(self):
+        response = self.client.get(f"{self.base_url}/en/players/0d9b2d31/Pedri")
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, PLAYER_PAGE)
+        self.assertLess(self.client.bytes_wire, self.client.bytes_decoded)
+
+    def test_reuses_connection(self):
+        for _ in range(3):
+            self.client.get(f"{self.base_url}/en/players/0d9b2d31/Pedri")
+
+        self.assertEqual(self.client.requests, 3)
+        self.assertEqual(len(FixtureHandler.connections), 1)
+
+    def test_follows_redirect(self):
+        response = self.client.get(f"{self.base_url}/redirect")
+
+        self.assertEqual(response.status, 200)
+        self.assertTrue(response.url.endswith("/en/players/0d9b2d31/Pedri"))
+
+    def test_invalid_url(self):
+        self.assertRaises(ValueError, self.client.get, "/en/players/0d9b2d31/Pedri")
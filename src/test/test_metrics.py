@@ -0,0 +1,130 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+from unittest import TestCase
+from urllib.request import urlopen
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+import src.scraper.metrics as metrics
+from src.scraper.http_client import HttpClient
+from src.test.test_http_client import FixtureHandler
+
+
+class TestHistogram(TestCase):
+    def test_quantiles(self):
+        histogram = metrics.Histogram()
+        for i in range(1, 101):
+            histogram.observe(i / 1000)
+
+        # Estimates within the bucket of the exact quantile
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.05, delta=0.02)
+        self.assertAlmostEqual(histogram.quantile(0.99), 0.099, delta=0.03)
+        self.assertLessEqual(histogram.quantile(0.99), histogram.max)
+        self.assertEqual(metrics.Histogram().quantile(0.5), 0.0)
+
+    def test_merge(self):
+        first, second = metrics.Histogram(), metrics.Histogram()
+        first.observe(0.001)
+        second.observe(10)
+
+        first.merge(second)
+
+        self.assertEqual(first.count, 2)
+        self.assertAlmostEqual(first.sum, 10.001)
+        self.assertEqual(first.max, 10)
+
+
+class TestRegistry(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        metrics.reset(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_collect_merges_snapshots(self):
+        # Snapshot published by another worker process
+        worker = metrics.Registry()
+        worker.observe("parse", 0.01)
+        worker.inc("requests", 3)
+        with open(os.path.join(self.tmp.name, "1.json"), "w") as f:
+            json.dump(worker.to_dict(), f)
+
+        metrics.observe("parse", 0.02)
+        metrics.inc("requests")
+        metrics.inc("errors.fetch")
+        metrics.publish(force=True, path=self.tmp.name)
+
+        registry = metrics.collect(self.tmp.name)
+
+        # The snapshot of the current process isn't counted twice
+        self.assertEqual(registry.histograms["parse"].count, 2)
+        self.assertEqual(registry.counters["requests"], 4)
+        self.assertEqual(registry.errors(), {"fetch": 1})
+
+    def test_publish_is_throttled(self):
+        metrics.publish(path=self.tmp.name)
+        metrics.inc("players")
+        metrics.publish(path=self.tmp.name)
+
+        with open(os.path.join(self.tmp.name, f"{os.getpid()}.json")) as f:
+            self.assertEqual(json.load(f)["counters"], {})
+
+    def test_prometheus(self):
+        with metrics.timer("extract"):
+            pass
+        metrics.inc("players")
+        metrics.inc("errors.db")
+
+        text = metrics.collect(self.tmp.name).prometheus()
+
+        self.assertIn('fbref_stage_seconds{stage="extract",quantile="0.95"}', text)
+        self.assertIn('fbref_stage_seconds_count{stage="extract"} 1', text)
+        self.assertIn('fbref_errors_total{kind="db"} 1', text)
+        self.assertIn("fbref_players_total 1", text)
+        self.assertIn("fbref_requests_per_second", text)
+
+    def test_reporter_endpoint(self):
+        metrics.inc("players", 2)
+        prometheus_file = os.path.join(self.tmp.name, "metrics.prom")
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        reporter = metrics.Reporter(interval=60, file=prometheus_file, port=port, path=self.tmp.name).start()
+
+        with urlopen(f"http://127.0.0.1:{reporter.server.server_port}/metrics") as response:
+            self.assertIn(b"fbref_players_total 2", response.read())
+
+        reporter.stop()
+
+        with open(prometheus_file) as f:
+            self.assertIn("fbref_players_total 2", f.read())
+
+    def test_client_records_stages(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = HttpClient()
+
+        try:
+            for _ in range(2):
+                client.get(f"http://127.0.0.1:{server.server_address[1]}/en/players/0d9b2d31/Pedri")
+        finally:
+            client.close()
+            server.shutdown()
+            server.server_close()
+
+        registry = metrics.get_registry()
+
+        # One connection for both requests
+        self.assertEqual(registry.histograms["http.dns"].count, 1)
+        self.assertEqual(registry.histograms["http.connect"].count, 1)
+        self.assertEqual(registry.histograms["http.ttfb"].count, 2)
+        self.assertEqual(registry.histograms["http.body"].count, 2)
+        self.assertEqual(registry.counters["requests"], 2)
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase, mock
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+import src.scraper.crawler as crawler
+import src.scraper.database as db
+import src.scraper.dead_letter as dead_letter
+import src.scraper.storage as storage
+from src.scraper.pipeline import discover_players
+from src.scraper.storage import SQLiteStorage
+
+SQUADS = {
+    "/en/comps/12/La-Liga-Stats": ["/en/squads/53a2f082/Real-Madrid-Stats", "/en/squads/206d90db/Barcelona-Stats"],
+    "/en/comps/20/Bundesliga-Stats": ["/en/squads/054efa67/Bayern-Munich-Stats"],
+}
+
+PLAYERS = {
+    "/en/squads/53a2f082/Real-Madrid-Stats": ["/en/players/1840e36d/Thibaut-Courtois"],
+    "/en/squads/206d90db/Barcelona-Stats": ["/en/players/0d9b2d31/Pedri", "/en/players/dea698d9/Philippe-Coutinho"],
+    "/en/squads/054efa67/Bayern-Munich-Stats": ["/en/players/dea698d9/Philippe-Coutinho"],
+}
+
+
+class TestDiscoverPlayers(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dead_letter_file = dead_letter.DEAD_LETTER_FILE
+        dead_letter.DEAD_LETTER_FILE = os.path.join(self.tmp.name, "dead_letter.jsonl")
+
+    def tearDown(self):
+        dead_letter.DEAD_LETTER_FILE = self.dead_letter_file
+        self.tmp.cleanup()
+
+    def test_players_are_unique(self):
+        players = list(
+            discover_players(SQUADS, squads_of=SQUADS.get, players_of=PLAYERS.get, threads=2, maxsize=1)
+        )
+
+        self.assertEqual(
+            sorted(players),
+            [
+                "/en/players/0d9b2d31/Pedri",
+                "/en/players/1840e36d/Thibaut-Courtois",
+                "/en/players/dea698d9/Philippe-Coutinho",
+            ],
+        )
+
+    def test_players_are_yielded_before_discovery_ends(self):
+        first_player = threading.Event()
+
+        def slow_squads_of(league):
+            if league == "/en/comps/20/Bundesliga-Stats":
+                # Only returns once the consumer got a player from the other league
+                self.assertTrue(first_player.wait(5))
+            return SQUADS[league]
+
+        players = discover_players(SQUADS, squads_of=slow_squads_of, players_of=PLAYERS.get, threads=2)
+
+        next(players)
+        first_player.set()
+
+        self.assertEqual(len(list(players)), 2)
+
+    def test_failures_are_dead_lettered(self):
+        def players_of(squad):
+            if squad == "/en/squads/206d90db/Barcelona-Stats":
+                raise AttributeError("'NoneType' object has no attribute 'find_all'")
+            return PLAYERS[squad]
+
+        players = list(discover_players(SQUADS, squads_of=SQUADS.get, players_of=players_of))
+
+        self.assertEqual(len(players), 2)
+        self.assertEqual(
+            [entry["url"] for entry in dead_letter.load()], ["/en/squads/206d90db/Barcelona-Stats"]
+        )
+
+    def test_pages_not_downloaded_are_skipped(self):
+        def players_of(squad):
+            # get_players returns None when the page couldn't be downloaded
+            return None if squad == "/en/squads/206d90db/Barcelona-Stats" else PLAYERS[squad]
+
+        players = list(discover_players(SQUADS, squads_of=SQUADS.get, players_of=players_of))
+
+        self.assertEqual(len(players), 2)
+
+
+class TestExpanding(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.tmp.name, "fbref.sqlite"))
+        self.storage.create_schema([])
+        self.storage.reset_frontier(list(SQUADS))
+
+        patcher = mock.patch.object(storage, "get_storage", return_value=self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_not_downloaded_are_failed(self):
+        squads_of = crawler.expanding(lambda league: SQUADS.get(league) if "La-Liga" in league else None, "squad")
+
+        self.assertEqual(len(squads_of("/en/comps/12/La-Liga-Stats")), 2)
+        self.assertEqual(squads_of("/en/comps/20/Bundesliga-Stats"), [])
+
+        self.assertEqual(self.storage.select_frontier(db.DONE)["league"], ["/en/comps/12/La-Liga-Stats"])
+        self.assertEqual(self.storage.select_frontier(db.FAILED)["league"], ["/en/comps/20/Bundesliga-Stats"])
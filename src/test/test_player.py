@@ -0,0 +1,101 @@
+import os
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from bs4 import BeautifulSoup
+
+from src.scraper.parsing import find_table, make_soup, player_strainer
+from src.scraper.player_info import scrape_info
+from src.scraper.player_stats import scrape_stats
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+PLAYER = "/en/players/0d9b2d31/Pedri"
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class TestPlayerPage(TestCase):
+    def setUp(self):
+        self.soup = BeautifulSoup(load_fixture("player.html"), "html.parser")
+
+    def test_scrape_info(self):
+        info = scrape_info(PLAYER, self.soup)
+
+        self.assertEqual(info["id"], "0d9b2d31")
+        self.assertEqual(info["name"], "Pedri")
+        self.assertEqual(info["height"], 174)
+        self.assertEqual(info["weight"], 60)
+        self.assertEqual(info["dob"], "2002-11-25")
+        self.assertEqual(info["countryob"], "Spain")
+        self.assertEqual(info["club"], "Barcelona")
+
+    def test_scrape_stats(self):
+        stats = scrape_stats(PLAYER, self.soup, ["stats_standard_dom_lg"])
+
+        self.assertEqual(len(stats), 3)
+        self.assertEqual(stats[0].table, "standard")
+        self.assertEqual(stats[0].id, "0d9b2d31")
+        self.assertEqual(stats[0].season, "2019-2020")
+        self.assertEqual(stats[1].team, "Barcelona")
+        self.assertEqual(stats[1].country, "ESP")
+        self.assertEqual(stats[1].get("minutes"), 2661.0)
+        self.assertEqual(stats[1].get("age"), 17.0)
+        self.assertNotIn("matches", stats[1].schema.metrics)
+
+    def test_scrape_stats_missing_table(self):
+        self.assertEqual(scrape_stats(PLAYER, self.soup, ["stats_misc_dom_lg"]), [])
+
+
+class TestRestrictedParse(TestCase):
+    def setUp(self):
+        self.html = load_fixture("player.html")
+        self.soup = BeautifulSoup(self.html, "html.parser")
+        self.tables = ["stats_standard_dom_lg"]
+
+    def test_strainer_keeps_extracted_elements(self):
+        soup = make_soup(self.html, player_strainer(self.tables))
+
+        self.assertEqual(scrape_info(PLAYER, soup), scrape_info(PLAYER, self.soup))
+        self.assertEqual(
+            scrape_stats(PLAYER, soup, self.tables), scrape_stats(PLAYER, self.soup, self.tables)
+        )
+
+    def test_strainer_drops_everything_else(self):
+        soup = make_soup(self.html, player_strainer(self.tables))
+
+        self.assertIsNone(soup.find("div", id="meta"))
+        self.assertEqual(len(soup.find_all("table")), 1)
+
+
+class TestCommentedTables(TestCase):
+    def setUp(self):
+        self.html = load_fixture("player.html")
+        self.tables = ["stats_standard_dom_lg", "stats_shooting_dom_lg"]
+
+    def test_find_commented_table(self):
+        soup = BeautifulSoup(self.html, "html.parser")
+
+        table = find_table(soup, "stats_shooting_dom_lg")
+
+        self.assertEqual(table.attrs["id"], "stats_shooting_dom_lg")
+        self.assertIs(find_table(soup, "stats_shooting_dom_lg"), table)
+        self.assertIsNone(find_table(soup, "stats_misc_dom_lg"))
+
+    def test_scrape_commented_table(self):
+        for soup in (
+            BeautifulSoup(self.html, "html.parser"),
+            make_soup(self.html, player_strainer(self.tables)),
+        ):
+            stats = scrape_stats(PLAYER, soup, self.tables)
+            shooting = [row for row in stats if row.table == "shooting"]
+
+            self.assertEqual(len(stats), 5)
+            self.assertEqual(len(shooting), 2)
+            self.assertEqual(shooting[0].get("shots"), 38.0)
+            self.assertIsNone(shooting[1].get("average_shot_distance"))
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+import src.scraper.profiling as profiling
+
+
+def extract_rows(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+class TestSampledProfiler(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_samples_one_call_out_of_every(self):
+        profiler = profiling.SampledProfiler(3, self.tmp.name)
+
+        results = [profiler.run(extract_rows, 10) for _ in range(7)]
+
+        self.assertEqual(results, [285] * 7)
+        self.assertEqual(profiler.samples, 3)
+
+    def test_nothing_dumped_without_samples(self):
+        profiler = profiling.SampledProfiler(1, self.tmp.name)
+
+        self.assertIsNone(profiler.dump())
+        self.assertIsNone(profiling.merge(self.tmp.name))
+
+    def test_merge_worker_profiles(self):
+        profiler = profiling.SampledProfiler(1, self.tmp.name)
+        profiler.run(extract_rows, 1000)
+        dump = profiler.dump()
+
+        # Profile of a second worker
+        shutil.copy(dump, os.path.join(self.tmp.name, "1.prof"))
+
+        report = profiling.merge(self.tmp.name)
+
+        with open(report) as f:
+            text = f.read()
+        self.assertIn("2 profiled worker(s)", text)
+        self.assertIn("extract_rows", text)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "report.prof")))
+
+        profiling.reset(self.tmp.name)
+        self.assertEqual(os.listdir(self.tmp.name), ["report.txt"])
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from src.scraper.rate_limit import RateLimiter, parse_retry_after
+
+
+class TestRateLimiter(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "ratelimit")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def limiter(self, **kwargs):
+        options = dict(rate=20, min_rate=1, max_rate=40, step=1, burst=1)
+        options.update(kwargs)
+        return RateLimiter(self.path, **options)
+
+    def test_acquire_waits_for_tokens(self):
+        limiter = self.limiter()
+
+        start = time.time()
+        for _ in range(5):
+            limiter.acquire()
+
+        # One token saved up, then one every 1/20s
+        self.assertGreaterEqual(time.time() - start, 4 / 20 - 0.01)
+
+    def test_bucket_is_shared(self):
+        first, second = self.limiter(), self.limiter()
+
+        first.acquire()
+        start = time.time()
+        second.acquire()
+
+        self.assertGreaterEqual(time.time() - start, 1 / 20 - 0.01)
+
+    def test_success_increases_rate(self):
+        limiter = self.limiter()
+        limiter.success()
+
+        self.assertEqual(limiter.current_rate(), 21)
+
+    def test_throttled_halves_rate_once_per_pause(self):
+        limiter = self.limiter()
+
+        limiter.throttled(0.2)
+        limiter.throttled(0.2)
+        self.assertEqual(limiter.current_rate(), 10)
+
+        start = time.time()
+        limiter.acquire()
+        self.assertGreaterEqual(time.time() - start, 0.19)
+
+    def test_rate_is_bounded(self):
+        limiter = self.limiter(rate=1.5)
+
+        limiter.throttled(0)
+        self.assertEqual(limiter.current_rate(), 1)
+
+
+    def test_reset_restores_configured_rate(self):
+        previous = self.limiter()
+        previous.throttled(0)
+        previous.throttled(0)
+        self.assertLess(previous.current_rate(), 20)
+
+        # The next crawl, configured with another rate
+        limiter = self.limiter(rate=5)
+        limiter.reset()
+
+        self.assertEqual(limiter.current_rate(), 5)
+        start = time.time()
+        limiter.acquire()
+        self.assertLess(time.time() - start, 0.05)
+
+
+class TestRetryAfter(TestCase):
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("120"), 120)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
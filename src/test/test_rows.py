@@ -0,0 +1,37 @@
+import pickle
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from src.scraper.rows import StatsRow, StatsSchema, union_metrics
+
+SCHEMA = StatsSchema("standard", ["age", "games", "minutes", "goals"])
+
+CELLS = {"age": "17", "team": "Barcelona", "country": "es ESP", "comp_level": "1. La Liga",
+         "lg_finish": "", "games": "37", "minutes": "2,661", "goals": ""}
+
+
+class TestStatsRow(TestCase):
+    def test_cells_are_parsed_once(self):
+        row = StatsRow.from_cells(SCHEMA, "0d9b2d31", "2020-2021", CELLS)
+
+        self.assertEqual(row.values, (17.0, 37.0, 2661.0, None))
+        self.assertEqual(row.country, "ESP")
+        self.assertIsNone(row.lg_finish)
+        self.assertEqual(row.get("minutes"), 2661.0)
+        self.assertIsNone(row.get("shots"))
+        self.assertEqual(row.key(), ("standard", "0d9b2d31", "2020-2021", "Barcelona"))
+
+    def test_rows_are_compact_and_picklable(self):
+        row = StatsRow.from_cells(SCHEMA, "0d9b2d31", "2020-2021", CELLS)
+
+        self.assertFalse(hasattr(row, "__dict__"))
+        self.assertEqual(pickle.loads(pickle.dumps(row)), row)
+
+    def test_union_metrics(self):
+        other = StatsRow.from_dict({"table": "standard", "id": "0d9b2d31", "season": "2021-2022", "xg": "2.1"})
+
+        self.assertEqual(
+            union_metrics([StatsRow(SCHEMA, "0d9b2d31", "2020-2021"), other]), ["age", "games", "minutes", "goals", "xg"]
+        )
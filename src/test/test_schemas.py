@@ -0,0 +1,114 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+import src.scraper.storage as storage
+from src.scraper.rows import StatsRow
+from src.scraper.schemas import SchemaRegistry, read_schema_file
+from src.scraper.storage import SQLiteStorage
+
+TABLES = [["standard", "age", "team", "country", "comp_level", "lg_finish", "games", "minutes"]]
+
+INFO = {"id": "0d9b2d31", "name": "Pedri", "height": 174, "weight": 60, "club": "Barcelona"}
+
+
+class TestSchemaRegistry(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "schemas.json")
+        self.storage = SQLiteStorage(os.path.join(self.tmp.name, "fbref.sqlite"))
+        self.assertTrue(self.storage.create_schema(TABLES))
+
+        patcher = mock.patch.object(storage, "get_storage", return_value=self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_merge_versions(self):
+        registry = SchemaRegistry(path=self.path)
+
+        self.assertEqual(registry.merge("standard", TABLES[0][1:]), TABLES[0][1:])
+        self.assertEqual(registry.merge("standard", ["games", "goals"]), ["goals"])
+        self.assertEqual(registry.merge("standard", ["goals"]), [])
+
+        self.assertEqual(registry.version("standard"), 2)
+        self.assertEqual(registry.headers(["standard", "shooting"]), [TABLES[0] + ["goals"]])
+
+    def test_save_and_load(self):
+        registry = SchemaRegistry(path=self.path)
+        registry.merge("standard", TABLES[0][1:])
+        self.assertTrue(registry.save())
+
+        # From the database alone
+        os.remove(self.path)
+        self.assertEqual(SchemaRegistry.load(self.path).schemas, {"standard": (1, TABLES[0][1:])})
+
+        # The highest version wins over the local file
+        registry.save()
+        registry.merge("standard", ["goals"])
+        self.assertTrue(self.storage.save_schemas(registry.schemas))
+        self.assertEqual(SchemaRegistry.load(self.path).schemas, {"standard": (2, TABLES[0][1:] + ["goals"])})
+
+    def test_concurrent_versions_are_kept(self):
+        registry = SchemaRegistry(path=self.path)
+        registry.merge("standard", TABLES[0][1:])
+        registry.save()
+
+        # Two workers find a different new column at the same version
+        first, second = SchemaRegistry.load(self.path), SchemaRegistry.load(self.path)
+        first.merge("standard", ["goals"])
+        second.merge("standard", ["assists"])
+        self.assertEqual(first.version("standard"), second.version("standard"))
+
+        self.assertTrue(first.save())
+        self.assertTrue(second.save())
+
+        latest = (3, TABLES[0][1:] + ["goals", "assists"])
+        self.assertEqual(second.schemas["standard"], latest)
+        self.assertEqual(self.storage.load_schemas()["standard"], latest)
+        self.assertEqual(read_schema_file(self.path)["standard"], latest)
+
+        # The first worker's file is not overwritten by an older version
+        first.save()
+        self.assertEqual(read_schema_file(self.path)["standard"], latest)
+
+    def test_observe_migrates_new_columns(self):
+        registry = SchemaRegistry(path=self.path)
+        registry.merge("standard", TABLES[0][1:])
+        registry.save()
+
+        # fbref added a "goals" column to the table
+        stats = [StatsRow.from_dict({
+            "table": "standard", "id": "0d9b2d31", "season": "2021-2022", "age": "18", "team": "Barcelona",
+            "country": "es ESP", "comp_level": "1. La Liga", "games": "22", "minutes": "1,357", "goals": "4",
+        })]
+        registry.observe(stats)
+
+        self.assertEqual(registry.version("standard"), 2)
+        self.assertEqual(SchemaRegistry.load(self.path).version("standard"), 2)
+        self.assertTrue(self.storage.add_players([(INFO, stats)]))
+        self.assertEqual(self.storage.select_stats("0d9b2d31", "standard")[0][-1], 4)
+
+    def test_observe_creates_unknown_tables(self):
+        # Cold start: the seed pages couldn't be downloaded, the registry and the database lack "shooting"
+        stats = [StatsRow.from_dict({
+            "table": "shooting", "id": "0d9b2d31", "season": "2021-2022", "age": "18", "team": "Barcelona",
+            "country": "es ESP", "comp_level": "1. La Liga", "minutes_90s": "15.1", "goals": "4", "shots": "30",
+        })]
+        registry = SchemaRegistry(path=self.path)
+        registry.observe(stats)
+
+        self.assertEqual(registry.version("shooting"), 1)
+        self.assertTrue(self.storage.add_players([(INFO, stats)]))
+        self.assertEqual(self.storage.select_stats("0d9b2d31", "shooting")[0][-3:], (15.1, 4, 30))
+
+    def test_migrate_is_idempotent(self):
+        headers = [TABLES[0] + ["goals"]]
+
+        self.assertTrue(SchemaRegistry(path=self.path).migrate(headers))
+        self.assertTrue(SchemaRegistry(path=self.path).migrate(headers))
@@ -0,0 +1,31 @@
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+from src.scraper.seasons import season_leagues, season_url
+
+
+class TestSeasons(TestCase):
+    def test_season_url(self):
+        self.assertEqual(
+            season_url("/en/comps/9/Premier-League-Stats", 2021),
+            "/en/comps/9/2021-2022/2021-2022-Premier-League-Stats",
+        )
+
+    def test_season_url_needs_current_season_page(self):
+        self.assertRaises(ValueError, season_url, "/en/comps/9/2021-2022/2021-2022-Premier-League-Stats", 2020)
+
+    def test_season_leagues(self):
+        leagues = season_leagues(["/en/comps/9/Premier-League-Stats", "/en/comps/12/La-Liga-Stats"], 2019, 2020)
+
+        self.assertEqual(
+            leagues,
+            [
+                "/en/comps/9/2020-2021/2020-2021-Premier-League-Stats",
+                "/en/comps/12/2020-2021/2020-2021-La-Liga-Stats",
+                "/en/comps/9/2019-2020/2019-2020-Premier-League-Stats",
+                "/en/comps/12/2019-2020/2019-2020-La-Liga-Stats",
+            ],
+        )
+        self.assertRaises(ValueError, season_leagues, ["/en/comps/9/Premier-League-Stats"], 2021, 2020)
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import tempfile
+from unittest import TestCase
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+import src.scraper.database as db
+from src.scraper.rows import StatsRow
+from src.scraper.storage import PostgresStorage, SQLiteStorage
+
+TABLES = [["standard", "age", "team", "country", "comp_level", "lg_finish", "games", "minutes", "goals"]]
+
+INFO = {"id": "0d9b2d31", "name": "Pedri", "height": 174, "weight": 60, "club": "Barcelona"}
+
+STATS = [StatsRow.from_dict(row) for row in [
+    {"table": "standard", "id": "0d9b2d31", "season": "2020-2021", "age": "17", "team": "Barcelona",
+     "country": "es ESP", "comp_level": "1. La Liga", "games": "37", "minutes": "2,661"},
+    {"table": "standard", "id": "0d9b2d31", "season": "2021-2022", "age": "18", "team": "Barcelona",
+     "country": "es ESP", "comp_level": "1. La Liga", "games": "22", "minutes": "1,357", "goals": "4"},
+]]
+
+
+class TestSQLiteStorage(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.tmp.name, "fbref.sqlite"))
+        self.assertTrue(self.storage.create_schema(TABLES))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_and_select_players(self):
+        self.assertTrue(self.storage.add_players([(INFO, STATS)]))
+
+        info = self.storage.select_info("0d9b2d31")
+        stats = self.storage.select_stats("0d9b2d31", "standard")
+
+        self.assertEqual(info[0][0], "0d9b2d31")
+        self.assertEqual(info[0][2], "Pedri")
+        self.assertEqual(len(stats), 2)
+        self.assertEqual(stats[0][:4], ("0d9b2d31", "2020-2021", "Barcelona", "ESP"))
+
+    def test_rows_are_upserted(self):
+        self.storage.add_players([(INFO, STATS)])
+        self.storage.add_players([(dict(INFO, club="Real Madrid"), [STATS[1].replace(minutes=1450.0)])])
+
+        self.assertEqual(self.storage.select_info("0d9b2d31")[0][7], "Real Madrid")
+        self.assertEqual(
+            sorted(row[-2] for row in self.storage.select_stats("0d9b2d31", "standard")), [1450.0, 2661.0]
+        )
+
+    def test_stats_tables_are_typed_and_indexed(self):
+        with sqlite3.connect(os.path.join(self.tmp.name, "fbref.sqlite")) as conn:
+            types = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(standard);")}
+            indexes = {row[1] for row in conn.execute("PRAGMA index_list(standard);")}
+
+        self.assertEqual(types["games"], "SMALLINT")
+        self.assertEqual(types["minutes"], "SMALLINT")
+        self.assertIn("standard_season", indexes)
+        self.assertIn("standard_squad", indexes)
+
+    def test_batch_selects(self):
+        self.storage.add_players([(INFO, STATS)])
+
+        info = self.storage.select_info_many(["0d9b2d31", "1840e36d", "0d9b2d31"])
+        stats = self.storage.select_stats_many(["0d9b2d31", "1840e36d"], "standard")
+
+        self.assertEqual(list(info), ["0d9b2d31"])
+        self.assertEqual(info["0d9b2d31"][2], "Pedri")
+        self.assertEqual(len(stats["0d9b2d31"]), 2)
+        self.assertEqual(stats["1840e36d"], [])
+
+    def test_failed_batch_is_rolled_back(self):
+        orphan = STATS[0].replace(id="1840e36d")
+
+        self.assertFalse(self.storage.add_players([(INFO, [orphan])]))
+        self.assertEqual(self.storage.select_info("0d9b2d31"), [])
+
+    def test_failed_rebuild_keeps_the_table(self):
+        columns = {"id": "VARCHAR(8)", "goals_per90": "FLOAT"}
+        self.assertTrue(self.storage.write_table("standard_career", columns, ["id"], [("0d9b2d31", 0.3)]))
+
+        # The duplicate key fails the rebuild after its first row
+        rows = [("1840e36d", 0.0), ("0d9b2d31", 0.4), ("0d9b2d31", 0.5)]
+        self.assertFalse(self.storage.write_table("standard_career", columns, ["id"], rows))
+
+        with sqlite3.connect(os.path.join(self.tmp.name, "fbref.sqlite")) as conn:
+            self.assertEqual(conn.execute("SELECT * FROM standard_career;").fetchall(), [("0d9b2d31", 0.3)])
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table';")}
+
+        self.assertNotIn("standard_career_new", tables)
+
+        self.assertTrue(self.storage.write_table("standard_career", columns, ["id"], rows[:2]))
+
+    def test_frontier(self):
+        league = "/en/comps/12/La-Liga-Stats"
+        squad = "/en/squads/206d90db/Barcelona-Stats"
+        player = "/en/players/0d9b2d31/Pedri"
+
+        self.storage.reset_frontier([league])
+        self.storage.expand_frontier(league, [squad], "squad")
+        self.storage.expand_frontier(squad, [player], "player")
+
+        self.assertEqual(self.storage.select_frontier(db.PENDING)["player"], [player])
+
+        self.storage.add_players([(INFO, STATS)], done=[player])
+
+        self.assertEqual(self.storage.select_frontier(db.PENDING), {"league": [], "squad": [], "player": []})
+        self.assertEqual(self.storage.select_frontier(db.DONE)["squad"], [squad])
+
+
+class TestPostgresStatements(TestCase):
+    def test_execute_values_statement(self):
+        # No server needed to build the statements
+        storage = PostgresStorage.__new__(PostgresStorage)
+        sql = storage.upsert_sql("info", ["id", "name"], ["id"], "%s")
+
+        self.assertEqual(
+            sql, "INSERT INTO info ( id, name ) VALUES %s ON CONFLICT ( id ) DO UPDATE SET name = excluded.name"
+        )
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
+from dotenv import load_dotenv
+
+load_dotenv(".env.test")
+
+import src.scraper.crawler as crawler
+import src.scraper.dead_letter as dead_letter
+import src.scraper.task_queue as task_queue
+from src.scraper.task_queue import MemoryQueue
+
+LEAGUE = "/en/comps/12/La-Liga-Stats"
+
+SQUADS = {LEAGUE: ["/en/squads/53a2f082/Real-Madrid-Stats", "/en/squads/206d90db/Barcelona-Stats"]}
+
+PLAYERS = {
+    "/en/squads/53a2f082/Real-Madrid-Stats": ["/en/players/1840e36d/Thibaut-Courtois"],
+    "/en/squads/206d90db/Barcelona-Stats": ["/en/players/0d9b2d31/Pedri", "/en/players/1840e36d/Thibaut-Courtois"],
+}
+
+
+def scrape_task(player: str) -> bool:
+    # Runs in a worker process
+    return player != "/en/players/0d9b2d31/Pedri"
+
+
+class TestMemoryQueue(TestCase):
+    def setUp(self):
+        self.tasks = MemoryQueue()
+        self.tasks.reset([LEAGUE])
+
+    def test_urls_are_published_once(self):
+        league = self.tasks.lease("a", 10)
+        self.tasks.complete("a", LEAGUE, SQUADS[LEAGUE], "squad")
+        self.tasks.publish(SQUADS[LEAGUE], "squad")
+
+        self.assertEqual(league, [task_queue.Task(LEAGUE, "league", 1)])
+        self.assertEqual(self.tasks.counts(), {"pending": 2, "leased": 0, "done": 1, "failed": 0})
+
+    def test_leases_are_disjoint(self):
+        self.tasks.publish(PLAYERS["/en/squads/206d90db/Barcelona-Stats"], "player")
+
+        first, second = self.tasks.lease("a", 2), self.tasks.lease("b", 2)
+
+        # Discovery tasks are leased first
+        self.assertEqual([task.kind for task in first], ["league", "player"])
+        self.assertEqual(len(second), 1)
+        self.assertFalse({task.url for task in first} & {task.url for task in second})
+
+    def test_expired_leases_are_requeued(self):
+        self.tasks.lease("a", 1, seconds=0)
+        time.sleep(0.01)
+
+        self.assertEqual(self.tasks.requeue_expired(), (1, []))
+        self.assertEqual(self.tasks.lease("b", 1)[0].attempts, 2)
+
+    def test_expired_lease_is_not_completed_by_its_former_holder(self):
+        self.tasks.lease("a", 1, seconds=0)
+        time.sleep(0.01)
+        self.tasks.requeue_expired()
+        self.tasks.lease("b", 1)
+
+        # The late results of node a are dropped
+        self.assertFalse(self.tasks.complete("a", LEAGUE, SQUADS[LEAGUE], "squad"))
+        self.assertFalse(self.tasks.fail("a", LEAGUE))
+        self.assertEqual(self.tasks.counts(), {"pending": 0, "leased": 1, "done": 0, "failed": 0})
+
+        self.assertTrue(self.tasks.complete("b", LEAGUE, SQUADS[LEAGUE], "squad"))
+        self.assertFalse(self.tasks.fail("a", LEAGUE))
+        self.assertEqual(self.tasks.counts(), {"pending": 2, "leased": 0, "done": 1, "failed": 0})
+
+    def test_heartbeat_keeps_lease(self):
+        self.tasks.lease("a", 1, seconds=0)
+        self.tasks.heartbeat("a", [LEAGUE], seconds=60)
+
+        self.assertEqual(self.tasks.requeue_expired(), (0, []))
+
+    def test_gives_up_after_max_attempts(self):
+        for _ in range(2):
+            self.tasks.lease("a", 1, seconds=0)
+            time.sleep(0.01)
+            requeued, given_up = self.tasks.requeue_expired(max_attempts=2)
+
+        self.assertEqual(given_up, [task_queue.Task(LEAGUE, "league", 2)])
+        self.assertTrue(self.tasks.finished())
+
+
+class TestNode(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dead_letter_file = dead_letter.DEAD_LETTER_FILE
+        dead_letter.DEAD_LETTER_FILE = os.path.join(self.tmp.name, "dead_letter.jsonl")
+
+        self.tasks = MemoryQueue()
+        task_queue.set_queue(self.tasks)
+
+    def tearDown(self):
+        task_queue.set_queue(None)
+        dead_letter.DEAD_LETTER_FILE = self.dead_letter_file
+        self.tmp.cleanup()
+
+    def test_node_processes_all_tasks(self):
+        self.tasks.reset([LEAGUE])
+
+        with mock.patch.object(crawler, "TASK_POLL", 0.05):
+            results = crawler.run_node(
+                node="test", squads_of=SQUADS.get, players_of=PLAYERS.get, scrape_task=scrape_task, processes=2
+            )
+
+        # 1 league, 2 squads and 2 unique players, Pedri failed
+        self.assertEqual(results, {"done": 4, "failed": 1})
+        self.assertEqual(self.tasks.counts(), {"pending": 0, "leased": 0, "done": 4, "failed": 1})
+
+    def test_pages_not_downloaded_fail(self):
+        self.tasks.reset([LEAGUE])
+
+        def players_of(squad):
+            # The Barcelona page couldn't be downloaded
+            return None if squad == "/en/squads/206d90db/Barcelona-Stats" else PLAYERS[squad]
+
+        with mock.patch.object(crawler, "TASK_POLL", 0.05):
+            results = crawler.run_node(
+                node="test", squads_of=SQUADS.get, players_of=players_of, scrape_task=scrape_task, processes=2
+            )
+
+        # 1 league, 1 squad and Courtois done, Barcelona failed
+        self.assertEqual(results, {"done": 3, "failed": 1})
+        self.assertEqual(self.tasks.counts()["failed"], 1)